@@ -1,7 +1,14 @@
 import click
 
 from .post_process.post_process_results_format import post_process_exomiser_results
+from .post_process.raw_result_storage import (
+    catalog_exomiser_results,
+    compact_exomiser_results,
+    convert_exomiser_results_to_ipc,
+)
 from .prepare.create_batch_commands import prepare_exomiser_batch
+from .run.cache_tuning import tune_exomiser_cache
+from .run.runner_benchmark import benchmark_exomiser_runner
 
 
 @click.group()
@@ -11,6 +18,11 @@ def main():
 
 main.add_command(prepare_exomiser_batch)
 main.add_command(post_process_exomiser_results)
+main.add_command(compact_exomiser_results)
+main.add_command(convert_exomiser_results_to_ipc)
+main.add_command(catalog_exomiser_results)
+main.add_command(tune_exomiser_cache)
+main.add_command(benchmark_exomiser_runner)
 
 if __name__ == "__main__":
     main()
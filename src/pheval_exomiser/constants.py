@@ -6,3 +6,4 @@ EXOMISER_YAML_TARGET_DIRECTORY_DOCKER = "/exomiser-yaml-template/"
 EXOMISER_DATA_DIRECTORY_TARGET_DOCKER = "/exomiser-data/"
 INPUT_COMMANDS_TARGET_DIRECTORY_DOCKER = "/exomiser-batch-file/"
 EXOMISER_CONFIG_TARGET_DIRECTORY_DOCKER = "/exomiser-config/"
+GENOME_ASSEMBLY_ALIASES = {"GRCh37": "hg19", "hg19": "hg19", "GRCh38": "hg38", "hg38": "hg38"}
@@ -0,0 +1,75 @@
+import shutil
+import zlib
+from pathlib import Path
+from typing import Dict, List
+
+import polars as pl
+
+
+def sample_partition(sample_id: str, dataset_partitions: int) -> int:
+    """Return the stable dataset partition for a sample id."""
+    return zlib.crc32(sample_id.encode()) % dataset_partitions
+
+
+def _partition_result_files(
+    result_files: List[Path], result_suffix: str, dataset_partitions: int
+) -> Dict[int, List[Path]]:
+    partitioned_result_files = {}
+    for result_file in result_files:
+        sample_id = result_file.name[: -len(result_suffix)]
+        partitioned_result_files.setdefault(
+            sample_partition(sample_id, dataset_partitions), []
+        ).append(result_file)
+    return partitioned_result_files
+
+
+def consolidate_result_type(
+    output_dir: Path, result_type: str, dataset_partitions: int, keep_per_file_results: bool
+) -> None:
+    """
+    Consolidate the per-sample PhEval results of one type into a hive-partitioned Parquet dataset,
+    `pheval_{result_type}_results_dataset/sample_partition=N/part-0.parquet`, with a sample_id column.
+    Each partition is streamed from its per-sample files, so memory is bounded by the partition size.
+    """
+    results_dir = output_dir.joinpath(f"pheval_{result_type}_results")
+    result_suffix = f"-{result_type}_result.parquet"
+    result_files = sorted(results_dir.glob(f"*{result_suffix}"))
+    dataset_dir = output_dir.joinpath(f"pheval_{result_type}_results_dataset")
+    shutil.rmtree(dataset_dir, ignore_errors=True)
+    for partition, partition_result_files in _partition_result_files(
+        result_files, result_suffix, dataset_partitions
+    ).items():
+        partition_dir = dataset_dir.joinpath(f"sample_partition={partition}")
+        partition_dir.mkdir(parents=True)
+        pl.concat(
+            [
+                pl.scan_parquet(result_file).with_columns(
+                    pl.lit(result_file.name[: -len(result_suffix)]).alias("sample_id")
+                )
+                for result_file in partition_result_files
+            ],
+            how="vertical_relaxed",
+        ).sink_parquet(partition_dir.joinpath("part-0.parquet"), compression="zstd")
+    if not keep_per_file_results:
+        for result_file in result_files:
+            result_file.unlink()
+
+
+def consolidate_standardised_results(
+    output_dir: Path,
+    gene_analysis: bool,
+    disease_analysis: bool,
+    variant_analysis: bool,
+    dataset_partitions: int = 16,
+    keep_per_file_results: bool = True,
+) -> None:
+    """Consolidate the standardised results of a run into a partitioned Parquet dataset per result type."""
+    for analysis, result_type in [
+        (gene_analysis, "gene"),
+        (disease_analysis, "disease"),
+        (variant_analysis, "variant"),
+    ]:
+        if analysis:
+            consolidate_result_type(
+                output_dir, result_type, dataset_partitions, keep_per_file_results
+            )
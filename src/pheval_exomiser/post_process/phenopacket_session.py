@@ -0,0 +1,55 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict
+
+from pheval.post_processing.phenopacket_truth_set import PhenopacketTruthSet
+from pheval.utils.file_utils import files_with_suffix
+from pheval.utils.phenopacket_utils import PhenopacketUtil, phenopacket_reader
+
+
+class PhenopacketSession(PhenopacketTruthSet):
+    """
+    Phenopacket truth set for a post-processing run, parsing each phenopacket once.
+    The parsed phenopackets are shared by the gene, variant and disease results,
+    which otherwise each parse the whole phenopacket directory again.
+    """
+
+    def __init__(self, phenopacket_dir: Path):
+        super().__init__(phenopacket_dir)
+        self._phenopacket_utils: Dict[str, PhenopacketUtil] = {}
+        self._lock = threading.Lock()
+
+    def load_all(self, max_workers: int = 1) -> "PhenopacketSession":
+        """Bulk-load every phenopacket in the directory up front, in parallel processes if max_workers > 1."""
+        phenopacket_paths = [
+            phenopacket_path
+            for phenopacket_path in files_with_suffix(self.phenopacket_dir, ".json")
+            if phenopacket_path.stem not in self._phenopacket_utils
+        ]
+        if max_workers > 1 and len(phenopacket_paths) > 1:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                phenopackets = list(
+                    executor.map(
+                        phenopacket_reader,
+                        phenopacket_paths,
+                        chunksize=max(1, len(phenopacket_paths) // (max_workers * 4)),
+                    )
+                )
+        else:
+            phenopackets = [
+                phenopacket_reader(phenopacket_path) for phenopacket_path in phenopacket_paths
+            ]
+        with self._lock:
+            for phenopacket_path, phenopacket in zip(phenopacket_paths, phenopackets):
+                self._phenopacket_utils[phenopacket_path.stem] = PhenopacketUtil(phenopacket)
+        return self
+
+    def _get_phenopacket_util(self, phenopacket_name: str) -> PhenopacketUtil:
+        with self._lock:
+            phenopacket_util = self._phenopacket_utils.get(phenopacket_name)
+        if phenopacket_util is None:
+            phenopacket_util = super()._get_phenopacket_util(phenopacket_name)
+            with self._lock:
+                self._phenopacket_utils[phenopacket_name] = phenopacket_util
+        return phenopacket_util
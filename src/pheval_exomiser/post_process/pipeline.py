@@ -0,0 +1,152 @@
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from pheval.utils.logger import get_logger
+
+from pheval_exomiser.post_process.raw_result_catalog import (
+    COMPLETE,
+    RawResultCatalog,
+    is_complete_raw_result,
+)
+
+PIPELINED_RESULTS_FILE_NAME = "pipelined_post_processed_results.txt"
+
+logger = get_logger()
+
+
+def read_pipelined_results(output_dir: Path) -> Set[str]:
+    """Return the names of raw results already standardised by a pipelined run."""
+    pipelined_results = output_dir.joinpath(PIPELINED_RESULTS_FILE_NAME)
+    if not pipelined_results.exists():
+        return set()
+    with open(pipelined_results) as results:
+        return {line.strip() for line in results if line.strip()}
+
+
+class PipelinedPostProcessor:
+    """
+    Standardise raw Exomiser results in a side worker pool as soon as Exomiser finishes writing them,
+    so post-processing overlaps with the run.
+    The names of standardised raw results are recorded in the output directory so that the
+    post-processing stage only handles what is left. The record of an earlier run is cleared
+    when a run starts, and only results written since are standardised, so the results an earlier run
+    left in a reused raw results directory are left to post-processing, as are results rewritten
+    after they were standardised.
+    """
+
+    def __init__(
+        self,
+        raw_results_dir: Path,
+        result_suffix: str,
+        output_dir: Path,
+        standardise: Callable[[Path], None],
+        max_workers: int = 4,
+        poll_seconds: int = 10,
+    ):
+        self.raw_results_dir = raw_results_dir
+        self.result_suffix = result_suffix
+        self.output_dir = output_dir
+        self.standardise = standardise
+        self.poll_seconds = poll_seconds
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.submitted: Dict[str, Future] = {}
+        self.submitted_versions: Dict[str, Tuple[int, float]] = {}
+        self.started_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+
+    def _record_result(self, raw_result_name: str) -> None:
+        with (
+            self._lock,
+            open(self.output_dir.joinpath(PIPELINED_RESULTS_FILE_NAME), "a") as pipelined_results,
+        ):
+            pipelined_results.write(f"{raw_result_name}\n")
+
+    def _standardise(self, raw_result_path: Path, previous: Optional[Future]) -> None:
+        if previous is not None:
+            wait([previous])
+        self.standardise(raw_result_path)
+        self._record_result(raw_result_path.name)
+
+    def _raw_result_versions(self) -> Tuple[Dict[str, Tuple[int, float]], bool]:
+        """
+        Return the (size, modification time) of each raw result, by file name, looked up in the raw result
+        catalog if it is current, rather than listing the raw results directory, and whether it was.
+        """
+        catalog = RawResultCatalog(self.raw_results_dir)
+        if catalog.is_current():
+            return {
+                entry.path: (entry.size, entry.mtime)
+                for entry in catalog.entries().values()
+                if entry.state == COMPLETE and entry.path.endswith(self.result_suffix)
+            }, True
+        raw_result_versions = {}
+        with os.scandir(self.raw_results_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith(self.result_suffix):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                raw_result_versions[entry.name] = (stat.st_size, stat.st_mtime)
+        return raw_result_versions, False
+
+    def submit_completed_results(self) -> None:
+        """
+        Submit every completed raw result written since the run started to the worker pool, unless it has
+        been submitted already. A result rewritten since it was submitted, i.e., whose size or modification
+        time has changed, is submitted again, once its earlier submission has finished.
+        """
+        if not self.raw_results_dir.exists():
+            return
+        raw_result_versions, catalogued = self._raw_result_versions()
+        for raw_result_name, raw_result_version in sorted(raw_result_versions.items()):
+            if (
+                self.started_at is not None and raw_result_version[1] < self.started_at
+            ) or self.submitted_versions.get(raw_result_name) == raw_result_version:
+                continue
+            raw_result_path = self.raw_results_dir.joinpath(raw_result_name)
+            if catalogued or is_complete_raw_result(raw_result_path):
+                self.submitted_versions[raw_result_name] = raw_result_version
+                self.submitted[raw_result_name] = self.executor.submit(
+                    self._standardise, raw_result_path, self.submitted.get(raw_result_name)
+                )
+
+    def _poll(self) -> None:
+        while not self._stop_event.wait(self.poll_seconds):
+            self.submit_completed_results()
+
+    def failed_results(self) -> List[str]:
+        """Return the names of raw results that failed to be standardised."""
+        return [
+            raw_result_name
+            for raw_result_name, future in self.submitted.items()
+            if future.done() and future.exception() is not None
+        ]
+
+    def __enter__(self) -> "PipelinedPostProcessor":
+        pipelined_results = self.output_dir.joinpath(PIPELINED_RESULTS_FILE_NAME)
+        pipelined_results.write_text("")
+        # the run start is taken from the file system clock, which raw results are stamped by
+        self.started_at = pipelined_results.stat().st_mtime
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop_event.set()
+        self._thread.join()
+        self.submit_completed_results()
+        self.executor.shutdown(wait=True)
+        failed_results = self.failed_results()
+        if failed_results:
+            logger.warning(
+                "Failed pipelined post-processing of %d results, "
+                "these will be retried in post-processing: %s",
+                len(failed_results),
+                ", ".join(failed_results),
+            )
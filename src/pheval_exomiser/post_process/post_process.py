@@ -1,7 +1,26 @@
+from functools import partial
 from pathlib import Path
+from typing import List, Tuple
 
-from pheval_exomiser.post_process.post_process_results_format import create_standardised_results
+from pheval_exomiser.post_process.consolidate import consolidate_standardised_results
+from pheval_exomiser.post_process.pipeline import PipelinedPostProcessor, read_pipelined_results
+from pheval_exomiser.post_process.post_process_results_format import (
+    create_empty_pheval_results,
+    create_rankings,
+    create_standardised_results,
+    standardise_exomiser_result,
+    use_parquet_results,
+)
 from pheval_exomiser.prepare.tool_specific_configuration_options import ExomiserConfigurations
+from pheval_exomiser.tracing import trace_span
+
+
+def additional_rankings(config: ExomiserConfigurations) -> List[Tuple[str, str]]:
+    """Return the additional (score name, sort order) rankings configured for post-processing."""
+    return [
+        (ranking.score_name, ranking.sort_order)
+        for ranking in config.post_process.additional_rankings or []
+    ]
 
 
 def post_process_result_format(
@@ -25,4 +44,71 @@ def post_process_result_format(
         disease_analysis=disease_analysis,
         variant_analysis=variant_analysis,
         exomiser_version=exomiser_version,
+        exclude_result_files=(
+            read_pipelined_results(output_dir) if config.post_process.pipelined else None
+        ),
+        additional_rankings=additional_rankings(config),
+        phenopacket_workers=config.post_process.phenopacket_workers,
+        engine=config.post_process.engine,
+        compact_dtypes=config.post_process.compact_dtypes,
+    )
+    if config.post_process.consolidated_dataset:
+        for ranking in create_rankings(
+            output_dir,
+            config.post_process.score_name,
+            config.post_process.sort_order,
+            additional_rankings(config),
+        ):
+            with trace_span("consolidation", output_dir=str(ranking.output_dir)):
+                consolidate_standardised_results(
+                    output_dir=ranking.output_dir,
+                    gene_analysis=gene_analysis,
+                    disease_analysis=disease_analysis,
+                    variant_analysis=variant_analysis,
+                    dataset_partitions=config.post_process.dataset_partitions,
+                    keep_per_file_results=config.post_process.keep_per_file_results,
+                )
+
+
+def create_pipelined_post_processor(
+    config: ExomiserConfigurations,
+    raw_results_dir: Path,
+    output_dir: Path,
+    phenopacket_dir: Path,
+    variant_analysis: bool,
+    gene_analysis: bool,
+    disease_analysis: bool,
+    exomiser_version: str,
+) -> PipelinedPostProcessor:
+    """Create a post-processor standardising Exomiser results while Exomiser is still running."""
+    rankings = create_rankings(
+        output_dir,
+        config.post_process.score_name,
+        config.post_process.sort_order,
+        additional_rankings(config),
+    )
+    create_empty_pheval_results(
+        rankings=rankings,
+        phenopacket_dir=phenopacket_dir,
+        gene_analysis=gene_analysis,
+        disease_analysis=disease_analysis,
+        variant_analysis=variant_analysis,
+        phenopacket_workers=config.post_process.phenopacket_workers,
+    )
+    use_parquet = use_parquet_results(exomiser_version)
+    return PipelinedPostProcessor(
+        raw_results_dir=raw_results_dir,
+        result_suffix=".parquet" if use_parquet else ".json",
+        output_dir=output_dir,
+        standardise=partial(
+            standardise_exomiser_result,
+            phenopacket_dir=phenopacket_dir,
+            rankings=rankings,
+            gene_analysis=gene_analysis,
+            disease_analysis=disease_analysis,
+            variant_analysis=variant_analysis,
+            use_parquet=use_parquet,
+            compact_dtypes=config.post_process.compact_dtypes,
+        ),
+        max_workers=config.post_process.pipeline_workers,
     )
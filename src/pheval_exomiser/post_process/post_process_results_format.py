@@ -1,19 +1,42 @@
+import shutil
 import uuid
+from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
+from typing import Callable, List, Optional, Set, Tuple
 
 import click
 import polars as pl
 from packaging import version
 from pheval.post_processing.post_processing import (
+    ResultType,
     SortOrder,
+    _get_result_type,
+    executed_results,
     generate_disease_result,
     generate_gene_result,
     generate_variant_result,
 )
-from pheval.utils.file_utils import files_with_suffix
+from pheval.utils.file_utils import all_files
 from pheval.utils.logger import get_logger
 
+from pheval_exomiser.post_process.consolidate import consolidate_standardised_results
+from pheval_exomiser.post_process.phenopacket_session import PhenopacketSession
+from pheval_exomiser.post_process.raw_result_storage import (
+    IPC_SUFFIX,
+    raw_result_files,
+    read_ipc_result,
+    read_json_result,
+    strip_compression_suffix,
+)
+from pheval_exomiser.post_process.vectorised_ranking import (
+    VECTORISED_CHUNK_SIZE,
+    generate_results_by_sample,
+    result_file,
+)
+from pheval_exomiser.profiling import PROFILE_MODES, profile_command
+from pheval_exomiser.tracing import file_size, trace_command, trace_span
+
 EXOMISER_LT_15 = {"combinedScore", "priorityScore", "variantScore", "pValue"}
 EXOMISER_GTE_15 = {"geneCombinedScore", "geneVariantScore", "pValue"}
 
@@ -43,6 +66,92 @@ class ModeOfInheritance(Enum):
     MT = 3
 
 
+MODES_OF_INHERITANCE = pl.Enum(list(ModeOfInheritance.__members__))
+
+VARIANT_KEY_COLUMNS = ["chrom", "start", "end", "ref", "alt"]
+
+
+def compact_scores(results: pl.DataFrame) -> pl.DataFrame:
+    """
+    Hold scores as Float32 if every score round-trips through Float32 exactly,
+    so ranks and written scores are unchanged.
+    """
+    compact_score = results["score"].cast(pl.Float32)
+    if compact_score.cast(pl.Float64).equals(results["score"]):
+        return results.with_columns(compact_score)
+    return results
+
+
+def variant_group_key(moi_enum: pl.Expr) -> pl.Expr:
+    """
+    Return the key variants are grouped by: the gene and score of recessive variants,
+    and the position, alleles and score of other variants, including those without a mode of inheritance.
+    """
+    return (
+        pl.when(moi_enum == 2)
+        .then(pl.format("recessive|{}|{}|{}", pl.col("geneSymbol"), pl.col("score"), moi_enum))
+        .otherwise(
+            pl.format(
+                "dominant|{}|{}|{}|{}|{}|{}",
+                pl.col("chrom"),
+                pl.col("start"),
+                pl.col("end"),
+                pl.col("ref"),
+                pl.col("alt"),
+                pl.col("score"),
+            )
+        )
+    )
+
+
+def grouping_uuid(grouping_id: pl.Expr) -> pl.Expr:
+    """Return the UUID written as the grouping id of variants from their integer grouping id."""
+    return grouping_id.map_elements(
+        lambda i: str(uuid.uuid5(uuid.NAMESPACE_DNS, str(i))), return_dtype=pl.String
+    )
+
+
+def compact_variant_results(variant_results: pl.DataFrame, moi_column: str) -> pl.DataFrame:
+    """
+    Group variant results in compact dtypes: integer grouping ids, the dense rank of the grouping key,
+    held rather than the key string and a UUID per row until they are written as the UUIDs of the default
+    grouping, chromosomes as Categorical, modes of inheritance as an Enum, and scores as Float32 where exact.
+    """
+    return compact_scores(
+        variant_results.with_columns(
+            variant_group_key(
+                pl.col(moi_column).replace_strict(
+                    {name: moi.value for name, moi in ModeOfInheritance.__members__.items()},
+                    return_dtype=pl.Int8,
+                )
+            )
+            .rank("dense")
+            .cast(pl.UInt32)
+            .alias("grouping_id")
+        )
+        .select(VARIANT_KEY_COLUMNS + ["score", moi_column, "grouping_id"])
+        .with_columns(
+            pl.col("chrom").cast(pl.Categorical), pl.col(moi_column).cast(MODES_OF_INHERITANCE)
+        )
+    )
+
+
+def pheval_result_dtypes(results: pl.DataFrame) -> pl.DataFrame:
+    """
+    Cast compact extracted results back to the dtypes of the pheval result schemas, when they are written,
+    with integer grouping ids written as the UUIDs of the default grouping.
+    """
+    return results.with_columns(
+        ([pl.col("chrom").cast(pl.String)] if "chrom" in results.columns else [])
+        + (
+            [grouping_uuid(pl.col("grouping_id"))]
+            if "grouping_id" in results.columns and results["grouping_id"].dtype.is_integer()
+            else []
+        )
+        + [pl.col("score").cast(pl.Float64)]
+    )
+
+
 def check_score_name(score_name: str, version: str):
     """
     Validates the provided score name for compatibility with the specified Exomiser version.
@@ -66,8 +175,8 @@ def check_score_name(score_name: str, version: str):
 
 
 def trim_exomiser_result_filename(exomiser_result_path: Path) -> Path:
-    """Trim suffix appended to Exomiser JSON result path."""
-    return Path(str(exomiser_result_path.name).replace("-exomiser", ""))
+    """Trim suffix appended to Exomiser JSON result path, and any compression suffix."""
+    return Path(strip_compression_suffix(exomiser_result_path.name).replace("-exomiser", ""))
 
 
 def extract_gene_results_from_json(
@@ -130,21 +239,32 @@ def extract_disease_results_from_json(exomiser_json_result: pl.DataFrame) -> pl.
 
 
 def extract_disease_results_from_parquet(exomiser_parquet_result: pl.DataFrame) -> pl.DataFrame:
+    """
+    Extract one disease result per disease identifier, with its best score.
+    Every variant row of a gene repeats the gene's disease matches, so only the distinct gene rows
+    are exploded, keeping the disease results proportional to the number of diseases, not variants.
+    """
     return (
-        exomiser_parquet_result.select(pl.col("diseaseMatches"))
+        exomiser_parquet_result.lazy()
+        .select(["geneSymbol", "ensemblGeneId", "diseaseMatches"])
+        .unique(subset=["geneSymbol", "ensemblGeneId"], keep="first", maintain_order=True)
+        .select(pl.col("diseaseMatches"))
         .explode("diseaseMatches")
         .select(
             pl.col("diseaseMatches").struct.field("diseaseId").alias("disease_identifier"),
             pl.col("diseaseMatches").struct.field("score").alias("score"),
         )
         .drop_nulls()
+        .group_by("disease_identifier", maintain_order=True)
+        .agg(pl.col("score").max())
+        .collect()
     )
 
 
 def extract_variant_results_from_json(
-    exomiser_json_result: pl.DataFrame, score_name: str
+    exomiser_json_result: pl.DataFrame, score_name: str, compact_dtypes: bool = False
 ) -> pl.DataFrame:
-    return (
+    contributing_variants = (
         exomiser_json_result.filter(pl.col("geneScores").is_not_null())
         .select(
             [
@@ -168,47 +288,25 @@ def extract_variant_results_from_json(
                 .fill_null("")
                 .str.strip_chars("<>")
                 .alias("alt"),
-                pl.col("modeOfInheritance")
-                .map_elements(lambda moi: ModeOfInheritance[moi].value, return_dtype=pl.Int8)
-                .alias("moi_enum"),
             ]
         )
+    )
+    if compact_dtypes:
+        return compact_variant_results(contributing_variants, "modeOfInheritance")
+    return (
+        contributing_variants.with_columns(
+            pl.col("modeOfInheritance")
+            .map_elements(lambda moi: ModeOfInheritance[moi].value, return_dtype=pl.Int8)
+            .alias("moi_enum")
+        )
         .with_columns(
             [
                 (pl.col("moi_enum") == 2).alias("is_recessive"),
-                pl.when(pl.col("moi_enum") == 2)
-                .then(
-                    pl.format(
-                        "recessive|{}|{}|{}",
-                        pl.col("geneSymbol"),
-                        pl.col("score"),
-                        pl.col("moi_enum"),
-                    )
-                )
-                .otherwise(
-                    pl.format(
-                        "dominant|{}|{}|{}|{}|{}|{}",
-                        pl.col("chrom"),
-                        pl.col("start"),
-                        pl.col("end"),
-                        pl.col("ref"),
-                        pl.col("alt"),
-                        pl.col("score"),
-                    )
-                )
-                .alias("group_key"),
+                variant_group_key(pl.col("moi_enum")).alias("group_key"),
             ]
         )
         .with_columns(
-            [
-                pl.col("group_key")
-                .rank("dense")
-                .cast(pl.UInt32)
-                .map_elements(
-                    lambda i: str(uuid.uuid5(uuid.NAMESPACE_DNS, str(i))), return_dtype=pl.String
-                )
-                .alias("grouping_id")
-            ]
+            [grouping_uuid(pl.col("group_key").rank("dense").cast(pl.UInt32)).alias("grouping_id")]
         )
         .select(
             ["chrom", "start", "end", "ref", "alt", "score", "modeOfInheritance", "grouping_id"]
@@ -217,11 +315,27 @@ def extract_variant_results_from_json(
 
 
 def extract_variant_results_from_parquet(
-    exomiser_parquet_result: pl.DataFrame, score_name: str
+    exomiser_parquet_result: pl.DataFrame, score_name: str, compact_dtypes: bool = False
 ) -> pl.DataFrame:
     contributing_variant_only = exomiser_parquet_result.filter(
         pl.col("isContributingVariant") == True  # noqa
     )
+    if compact_dtypes:
+        return compact_variant_results(
+            contributing_variant_only.select(
+                [
+                    pl.col("geneSymbol"),
+                    pl.col("contigName").alias("chrom"),
+                    pl.col("start").cast(pl.Int64),
+                    pl.col("end").cast(pl.Int64),
+                    pl.col("ref"),
+                    pl.col("alt"),
+                    pl.col(score_name).alias("score"),
+                    pl.col("moi"),
+                ]
+            ),
+            "moi",
+        )
     return (
         contributing_variant_only.select(
             [
@@ -240,43 +354,351 @@ def extract_variant_results_from_parquet(
         .with_columns(
             [
                 (pl.col("moi_enum") == 2).alias("is_recessive"),
-                pl.when(pl.col("moi_enum") == 2)
-                .then(
-                    pl.format(
-                        "recessive|{}|{}|{}",
-                        pl.col("geneSymbol"),
-                        pl.col("score"),
-                        pl.col("moi_enum"),
-                    )
-                )
-                .otherwise(
-                    pl.format(
-                        "dominant|{}|{}|{}|{}|{}|{}",
-                        pl.col("chrom"),
-                        pl.col("start"),
-                        pl.col("end"),
-                        pl.col("ref"),
-                        pl.col("alt"),
-                        pl.col("score"),
-                    )
-                )
-                .alias("group_key"),
+                variant_group_key(pl.col("moi_enum")).alias("group_key"),
             ]
         )
         .with_columns(
-            [
-                pl.col("group_key")
-                .rank("dense")
-                .cast(pl.UInt32)
-                .map_elements(
-                    lambda i: str(uuid.uuid5(uuid.NAMESPACE_DNS, str(i))), return_dtype=pl.String
-                )
-                .alias("grouping_id")
-            ]
+            [grouping_uuid(pl.col("group_key").rank("dense").cast(pl.UInt32)).alias("grouping_id")]
         )
     )
 
 
+def read_exomiser_result(exomiser_result_path: Path, use_parquet: bool) -> pl.DataFrame:
+    """Read a raw Exomiser Parquet (≥15.0.0) or JSON result, memory-mapping results converted to Arrow IPC."""
+    if exomiser_result_path.name.endswith(IPC_SUFFIX):
+        return read_ipc_result(exomiser_result_path)
+    if use_parquet:
+        return pl.read_parquet(exomiser_result_path)
+    return read_json_result(exomiser_result_path)
+
+
+@dataclass
+class Ranking:
+    """A score and sort order to rank results by, and the output tree its results are written to."""
+
+    score_name: str
+    sort_order: SortOrder
+    output_dir: Path
+
+
+def ranking_output_dir(output_dir: Path, score_name: str, sort_order: str) -> Path:
+    """Return the output tree for an additional ranking of the results."""
+    return output_dir.joinpath(f"{score_name}_{sort_order.lower()}")
+
+
+def create_rankings(
+    output_dir: Path,
+    score_name: str,
+    sort_order: str,
+    additional_rankings: Optional[List[Tuple[str, str]]] = None,
+) -> List[Ranking]:
+    """
+    Return the rankings to post-process results with. The primary ranking is written to the
+    output directory, and each additional (score name, sort order) ranking to its own output tree.
+    """
+    return [Ranking(score_name, parse_sort_order(sort_order), output_dir)] + [
+        Ranking(
+            additional_score_name,
+            parse_sort_order(additional_sort_order),
+            ranking_output_dir(output_dir, additional_score_name, additional_sort_order),
+        )
+        for additional_score_name, additional_sort_order in additional_rankings or []
+    ]
+
+
+def extract_gene_results(
+    exomiser_result: pl.DataFrame, score_name: str, variant_analysis: bool, use_parquet: bool
+) -> pl.DataFrame:
+    """Extract the gene results of a raw Exomiser result."""
+    if use_parquet:
+        return extract_gene_results_from_parquet(exomiser_result, score_name, variant_analysis)
+    return extract_gene_results_from_json(exomiser_result, score_name)
+
+
+def extract_disease_results(exomiser_result: pl.DataFrame, use_parquet: bool) -> pl.DataFrame:
+    """Extract the disease results of a raw Exomiser result."""
+    if use_parquet:
+        return extract_disease_results_from_parquet(exomiser_result)
+    return extract_disease_results_from_json(exomiser_result)
+
+
+def extract_variant_results(
+    exomiser_result: pl.DataFrame, score_name: str, use_parquet: bool, compact_dtypes: bool = False
+) -> pl.DataFrame:
+    """Extract the variant results of a raw Exomiser result, in compact dtypes if compact_dtypes."""
+    if use_parquet:
+        return extract_variant_results_from_parquet(exomiser_result, score_name, compact_dtypes)
+    return extract_variant_results_from_json(exomiser_result, score_name, compact_dtypes)
+
+
+def _generate_result(
+    generate_method: Callable,
+    result_type: ResultType,
+    results: pl.DataFrame,
+    ranking: Ranking,
+    result_path: Path,
+    phenopacket_dir: Path,
+) -> None:
+    """Rank and write the results of one type for a ranking, traced as a ranking_writing span."""
+    with trace_span(
+        "ranking_writing",
+        result_type=result_type.value,
+        rows=results.height,
+        sort_order=ranking.sort_order.name,
+    ) as span:
+        generate_method(
+            results=results,
+            sort_order=ranking.sort_order,
+            output_dir=ranking.output_dir,
+            result_path=result_path,
+            phenopacket_dir=phenopacket_dir,
+        )
+        output_file = result_file(ranking.output_dir, result_type, result_path.stem)
+        span.set_attributes(output_file=str(output_file), output_bytes=file_size(output_file))
+
+
+def standardise_exomiser_result(
+    exomiser_result_path: Path,
+    phenopacket_dir: Path,
+    rankings: List[Ranking],
+    gene_analysis: bool,
+    disease_analysis: bool,
+    variant_analysis: bool,
+    use_parquet: bool,
+    compact_dtypes: bool = False,
+) -> None:
+    """
+    Standardise a single raw Exomiser result into PhEval gene, disease and variant results,
+    reading the raw result once for all rankings.
+    """
+    result_path = trim_exomiser_result_filename(exomiser_result_path)
+    try:
+        with trace_span(
+            "sample",
+            sample_id=result_path.stem,
+            raw_result=str(exomiser_result_path),
+            raw_result_bytes=file_size(exomiser_result_path),
+        ) as sample_span:
+            with trace_span("read_raw_result"):
+                exomiser_result = read_exomiser_result(exomiser_result_path, use_parquet)
+            sample_span.set_attribute("raw_result_rows", exomiser_result.height)
+            if disease_analysis:
+                with trace_span("extraction", result_type=ResultType.DISEASE.value) as span:
+                    disease_results = extract_disease_results(exomiser_result, use_parquet)
+                    span.set_attribute("rows", disease_results.height)
+            for ranking in rankings:
+                if gene_analysis:
+                    with trace_span(
+                        "extraction",
+                        result_type=ResultType.GENE.value,
+                        score_name=ranking.score_name,
+                    ) as span:
+                        gene_results = extract_gene_results(
+                            exomiser_result, ranking.score_name, variant_analysis, use_parquet
+                        )
+                        span.set_attribute("rows", gene_results.height)
+                    _generate_result(
+                        generate_gene_result,
+                        ResultType.GENE,
+                        gene_results,
+                        ranking,
+                        result_path,
+                        phenopacket_dir,
+                    )
+                if disease_analysis:
+                    _generate_result(
+                        generate_disease_result,
+                        ResultType.DISEASE,
+                        disease_results,
+                        ranking,
+                        result_path,
+                        phenopacket_dir,
+                    )
+                if variant_analysis:
+                    with trace_span(
+                        "extraction",
+                        result_type=ResultType.VARIANT.value,
+                        score_name=ranking.score_name,
+                    ) as span:
+                        variant_results = extract_variant_results(
+                            exomiser_result, ranking.score_name, use_parquet, compact_dtypes
+                        )
+                        span.set_attribute("rows", variant_results.height)
+                    _generate_result(
+                        generate_variant_result,
+                        ResultType.VARIANT,
+                        pheval_result_dtypes(variant_results),
+                        ranking,
+                        result_path,
+                        phenopacket_dir,
+                    )
+    except Exception:
+        logger.exception("Failed processing Exomiser result file: %s", exomiser_result_path)
+        raise
+
+
+def standardise_exomiser_results_vectorised(
+    exomiser_result_paths: List[Path],
+    rankings: List[Ranking],
+    gene_analysis: bool,
+    disease_analysis: bool,
+    variant_analysis: bool,
+    use_parquet: bool,
+    chunk_size: int = VECTORISED_CHUNK_SIZE,
+    compact_dtypes: bool = False,
+) -> None:
+    """
+    Standardise raw Exomiser results with the vectorised engine. The extracted results of a chunk of
+    samples are concatenated with a sample id and ranked, classified and written in one pass per result
+    type and ranking, instead of one small DataFrame at a time. Empty results must have been written first.
+    """
+    for chunk_start in range(0, len(exomiser_result_paths), chunk_size):
+        sample_ids = []
+        extracted_results = {
+            (result_type, ranking_index): []
+            for result_type in _result_types(gene_analysis, disease_analysis, variant_analysis)
+            for ranking_index in range(len(rankings))
+        }
+        chunk_end = chunk_start + chunk_size
+        for exomiser_result_path in exomiser_result_paths[chunk_start:chunk_end]:
+            sample_id = trim_exomiser_result_filename(exomiser_result_path).stem
+            try:
+                with trace_span(
+                    "sample",
+                    sample_id=sample_id,
+                    raw_result=str(exomiser_result_path),
+                    raw_result_bytes=file_size(exomiser_result_path),
+                ) as sample_span:
+                    with trace_span("read_raw_result"):
+                        exomiser_result = read_exomiser_result(exomiser_result_path, use_parquet)
+                    sample_span.set_attribute("raw_result_rows", exomiser_result.height)
+                    with trace_span("extraction"):
+                        disease_results = (
+                            extract_disease_results(exomiser_result, use_parquet)
+                            if disease_analysis
+                            else None
+                        )
+                        for ranking_index, ranking in enumerate(rankings):
+                            if gene_analysis:
+                                extracted_results[(ResultType.GENE, ranking_index)].append(
+                                    extract_gene_results(
+                                        exomiser_result,
+                                        ranking.score_name,
+                                        variant_analysis,
+                                        use_parquet,
+                                    )
+                                )
+                            if disease_analysis:
+                                extracted_results[(ResultType.DISEASE, ranking_index)].append(
+                                    disease_results
+                                )
+                            if variant_analysis:
+                                extracted_results[(ResultType.VARIANT, ranking_index)].append(
+                                    extract_variant_results(
+                                        exomiser_result,
+                                        ranking.score_name,
+                                        use_parquet,
+                                        compact_dtypes,
+                                    )
+                                )
+            except Exception:
+                logger.exception("Failed processing Exomiser result file: %s", exomiser_result_path)
+                raise
+            sample_ids.append(sample_id)
+        if not sample_ids:
+            continue
+        for (result_type, ranking_index), results in extracted_results.items():
+            with trace_span(
+                "ranking_writing",
+                result_type=result_type.value,
+                samples=len(sample_ids),
+                rows=sum(sample_results.height for sample_results in results),
+                sort_order=rankings[ranking_index].sort_order.name,
+            ):
+                generate_results_by_sample(
+                    [pheval_result_dtypes(sample_results) for sample_results in results],
+                    sample_ids,
+                    result_type,
+                    rankings[ranking_index].sort_order,
+                    rankings[ranking_index].output_dir,
+                )
+
+
+def _result_types(
+    gene_analysis: bool, disease_analysis: bool, variant_analysis: bool
+) -> List[ResultType]:
+    return [
+        result_type
+        for analysis, result_type in [
+            (gene_analysis, ResultType.GENE),
+            (disease_analysis, ResultType.DISEASE),
+            (variant_analysis, ResultType.VARIANT),
+        ]
+        if analysis
+    ]
+
+
+def create_empty_pheval_results(
+    rankings: List[Ranking],
+    phenopacket_dir: Path,
+    gene_analysis: bool,
+    disease_analysis: bool,
+    variant_analysis: bool,
+    phenopacket_workers: int = 1,
+) -> None:
+    """
+    Write the empty PhEval results for every phenopacket up front, into the output tree of each ranking.
+    pheval writes these once per process on the first generated result of each type, which is neither
+    safe to race from several post-processing workers nor done for more than one output tree.
+    Each phenopacket is parsed once for all result types, bulk-loaded by phenopacket_workers processes.
+    """
+    result_types = _result_types(gene_analysis, disease_analysis, variant_analysis)
+    if not result_types:
+        return
+    with trace_span("phenopacket_parsing", phenopacket_dir=str(phenopacket_dir)):
+        phenopacket_session = PhenopacketSession(phenopacket_dir).load_all(phenopacket_workers)
+    phenopacket_files = all_files(phenopacket_dir)
+    for result_type in result_types:
+        results_dir_name = f"pheval_{result_type.value}_results"
+        for ranking in rankings:
+            ranking.output_dir.joinpath(results_dir_name).mkdir(parents=True, exist_ok=True)
+        logger.info(
+            "Writing classified results for %d phenopackets to %s",
+            len(phenopacket_files),
+            rankings[0].output_dir.joinpath(results_dir_name),
+        )
+        classify_method, write_method = _get_result_type(result_type, phenopacket_session)
+        with trace_span("classified_results", result_type=result_type.value):
+            for phenopacket_file in phenopacket_files:
+                write_method(
+                    classify_method(phenopacket_file.stem),
+                    rankings[0].output_dir.joinpath(
+                        results_dir_name,
+                        f"{phenopacket_file.stem}-{result_type.value}_result.parquet",
+                    ),
+                )
+        executed_results.add(result_type)
+        for ranking in rankings[1:]:
+            for empty_result in (
+                rankings[0]
+                .output_dir.joinpath(results_dir_name)
+                .glob(f"*-{result_type.value}_result.parquet")
+            ):
+                shutil.copyfile(
+                    empty_result, ranking.output_dir.joinpath(results_dir_name, empty_result.name)
+                )
+
+
+def use_parquet_results(exomiser_version: str) -> bool:
+    """Return whether raw results for an Exomiser version are post-processed from Parquet."""
+    return version.parse(exomiser_version) >= version.parse("15.0.0")
+
+
+def parse_sort_order(sort_order: str) -> SortOrder:
+    """Return the SortOrder for an ascending/descending sort order string."""
+    return SortOrder.ASCENDING if sort_order.lower() == "ascending" else SortOrder.DESCENDING
+
+
 def create_standardised_results(
     result_dir: Path,
     output_dir: Path,
@@ -287,62 +709,55 @@ def create_standardised_results(
     disease_analysis: bool,
     variant_analysis: bool,
     exomiser_version: str,
+    exclude_result_files: Optional[Set[str]] = None,
+    additional_rankings: Optional[List[Tuple[str, str]]] = None,
+    phenopacket_workers: int = 1,
+    engine: str = "per_file",
+    compact_dtypes: bool = False,
 ):
-    sort_order = SortOrder.ASCENDING if sort_order.lower() == "ascending" else SortOrder.DESCENDING
-    use_parquet = True if version.parse(exomiser_version) >= version.parse("15.0.0") else False
-    result_files = (
-        files_with_suffix(result_dir, ".parquet")
-        if use_parquet
-        else files_with_suffix(result_dir, ".json")
-    )
-    for exomiser_result_path in result_files:
-        try:
-            if use_parquet:
-                exomiser_result = pl.read_parquet(exomiser_result_path)
-            else:
-                exomiser_result = pl.read_json(exomiser_result_path, infer_schema_length=None)
-            if gene_analysis:
-                gene_results = (
-                    extract_gene_results_from_parquet(exomiser_result, score_name, variant_analysis)
-                    if use_parquet
-                    else extract_gene_results_from_json(exomiser_result, score_name)
-                )
-                generate_gene_result(
-                    results=gene_results,
-                    sort_order=sort_order,
-                    output_dir=output_dir,
-                    result_path=trim_exomiser_result_filename(exomiser_result_path),
-                    phenopacket_dir=phenopacket_dir,
-                )
-            if disease_analysis:
-                disease_results = (
-                    extract_disease_results_from_parquet(exomiser_result)
-                    if use_parquet
-                    else extract_disease_results_from_json(exomiser_result)
-                )
-                generate_disease_result(
-                    results=disease_results,
-                    sort_order=sort_order,
-                    output_dir=output_dir,
-                    result_path=trim_exomiser_result_filename(exomiser_result_path),
-                    phenopacket_dir=phenopacket_dir,
-                )
-            if variant_analysis:
-                variant_results = (
-                    extract_variant_results_from_parquet(exomiser_result, score_name)
-                    if use_parquet
-                    else extract_variant_results_from_json(exomiser_result, score_name)
-                )
-                generate_variant_result(
-                    results=variant_results,
-                    sort_order=sort_order,
-                    output_dir=output_dir,
-                    result_path=trim_exomiser_result_filename(exomiser_result_path),
-                    phenopacket_dir=phenopacket_dir,
-                )
-        except Exception:
-            logger.exception("Failed processing Exomiser result file: %s", exomiser_result_path)
-            raise
+    use_parquet = use_parquet_results(exomiser_version)
+    rankings = create_rankings(output_dir, score_name, sort_order, additional_rankings)
+    if exclude_result_files:
+        # empty results were written before the excluded results were standardised,
+        # and must not overwrite them
+        executed_results.update(_result_types(gene_analysis, disease_analysis, variant_analysis))
+    else:
+        create_empty_pheval_results(
+            rankings,
+            phenopacket_dir,
+            gene_analysis,
+            disease_analysis,
+            variant_analysis,
+            phenopacket_workers,
+        )
+    exomiser_result_paths = [
+        exomiser_result_path
+        for exomiser_result_path in raw_result_files(result_dir, use_parquet)
+        if not exclude_result_files
+        or strip_compression_suffix(exomiser_result_path.name) not in exclude_result_files
+    ]
+    if engine == "vectorised":
+        standardise_exomiser_results_vectorised(
+            exomiser_result_paths=exomiser_result_paths,
+            rankings=rankings,
+            gene_analysis=gene_analysis,
+            disease_analysis=disease_analysis,
+            variant_analysis=variant_analysis,
+            use_parquet=use_parquet,
+            compact_dtypes=compact_dtypes,
+        )
+        return
+    for exomiser_result_path in exomiser_result_paths:
+        standardise_exomiser_result(
+            exomiser_result_path=exomiser_result_path,
+            phenopacket_dir=phenopacket_dir,
+            rankings=rankings,
+            gene_analysis=gene_analysis,
+            disease_analysis=disease_analysis,
+            variant_analysis=variant_analysis,
+            use_parquet=use_parquet,
+            compact_dtypes=compact_dtypes,
+        )
 
 
 @click.command()
@@ -386,6 +801,16 @@ def create_standardised_results(
     default="descending",
     show_default=True,
 )
+@click.option(
+    "--additional-ranking",
+    "-a",
+    "additional_rankings",
+    multiple=True,
+    type=(click.Choice(ALL_SCORE_NAMES), click.Choice(["ascending", "descending"])),
+    metavar="SCORE_NAME SORT_ORDER",
+    help="Additional score name and sort order to rank results by, "
+    "written to OUTPUT_DIR/SCORE_NAME_SORT_ORDER. Can be specified multiple times.",
+)
 @click.option(
     "--gene-analysis/--no-gene-analysis",
     type=bool,
@@ -412,42 +837,114 @@ def create_standardised_results(
     default="15.0.0",
     show_default=True,
 )
+@click.option(
+    "--engine",
+    type=click.Choice(["per_file", "vectorised"]),
+    default="per_file",
+    show_default=True,
+    help="Rank each result file on its own, or the results of many samples in one vectorised pass.",
+)
+@click.option(
+    "--compact-dtypes/--no-compact-dtypes",
+    type=bool,
+    default=False,
+    show_default=True,
+    help="Hold extracted variant results in compact dtypes until they are written, to reduce memory.",
+)
+@click.option(
+    "--phenopacket-workers",
+    type=int,
+    default=1,
+    show_default=True,
+    help="Number of processes bulk-loading the phenopackets, parsed once for all result types.",
+)
+@click.option(
+    "--consolidated-dataset/--no-consolidated-dataset",
+    type=bool,
+    default=False,
+    help="Also write each result type as a partitioned Parquet dataset with a sample_id column.",
+)
+@click.option(
+    "--dataset-partitions",
+    type=int,
+    default=16,
+    show_default=True,
+    help="Number of sample partitions in a consolidated dataset.",
+)
+@click.option(
+    "--keep-per-file-results/--no-keep-per-file-results",
+    type=bool,
+    default=True,
+    show_default=True,
+    help="Keep the per-sample result files alongside a consolidated dataset.",
+)
+@click.option(
+    "--profile",
+    type=click.Choice(PROFILE_MODES),
+    is_flag=False,
+    flag_value="timers",
+    default=None,
+    help="Time each post-processing step, optionally with cProfile dumps, "
+    "writing profile_summary.tsv to the output directory [default: PHEVAL_EXOMISER_PROFILE].",
+)
+@click.option(
+    "--trace-file",
+    type=Path,
+    default=None,
+    metavar="PATH",
+    help="Record spans for the command, each sample, extraction and write to a JSONL trace file.",
+)
 def post_process_exomiser_results(
     output_dir: Path,
     results_dir: Path,
     phenopacket_dir: Path,
     score_name: str,
     sort_order: str,
+    additional_rankings: Tuple[Tuple[str, str], ...],
     gene_analysis: bool,
     variant_analysis: bool,
     disease_analysis: bool,
     version: str,
+    engine: str,
+    compact_dtypes: bool,
+    phenopacket_workers: int,
+    consolidated_dataset: bool,
+    dataset_partitions: int,
+    keep_per_file_results: bool,
+    profile: Optional[str],
+    trace_file: Optional[Path],
 ):
     """Post-process Exomiser json results into PhEval gene and variant outputs."""
-    (
-        output_dir.joinpath("pheval_gene_results").mkdir(parents=True, exist_ok=True)
-        if gene_analysis
-        else None
-    )
-    (
-        output_dir.joinpath("pheval_variant_results").mkdir(parents=True, exist_ok=True)
-        if variant_analysis
-        else None
-    )
-    (
-        output_dir.joinpath("pheval_disease_results").mkdir(parents=True, exist_ok=True)
-        if disease_analysis
-        else None
-    )
     check_score_name(score_name, version)
-    create_standardised_results(
-        result_dir=results_dir,
-        output_dir=output_dir,
-        phenopacket_dir=phenopacket_dir,
-        score_name=score_name,
-        sort_order=sort_order,
-        variant_analysis=variant_analysis,
-        gene_analysis=gene_analysis,
-        disease_analysis=disease_analysis,
-        exomiser_version=version,
-    )
+    for additional_score_name, _ in additional_rankings:
+        check_score_name(additional_score_name, version)
+    with (
+        profile_command("post_process", output_dir, profile),
+        trace_command("post_process", trace_file, exomiser_version=version, engine=engine),
+    ):
+        create_standardised_results(
+            result_dir=results_dir,
+            output_dir=output_dir,
+            phenopacket_dir=phenopacket_dir,
+            score_name=score_name,
+            sort_order=sort_order,
+            variant_analysis=variant_analysis,
+            gene_analysis=gene_analysis,
+            disease_analysis=disease_analysis,
+            exomiser_version=version,
+            additional_rankings=list(additional_rankings),
+            phenopacket_workers=phenopacket_workers,
+            engine=engine,
+            compact_dtypes=compact_dtypes,
+        )
+        if consolidated_dataset:
+            for ranking in create_rankings(output_dir, score_name, sort_order, additional_rankings):
+                with trace_span("consolidation", output_dir=str(ranking.output_dir)):
+                    consolidate_standardised_results(
+                        output_dir=ranking.output_dir,
+                        gene_analysis=gene_analysis,
+                        disease_analysis=disease_analysis,
+                        variant_analysis=variant_analysis,
+                        dataset_partitions=dataset_partitions,
+                        keep_per_file_results=keep_per_file_results,
+                    )
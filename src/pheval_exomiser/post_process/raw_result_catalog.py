@@ -0,0 +1,215 @@
+import os
+import tempfile
+import threading
+from dataclasses import astuple, dataclass, fields
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import polars as pl
+
+RAW_RESULT_CATALOG_FILE_NAME = "raw_result_catalog.tsv"
+
+COMPLETE = "complete"
+INCOMPLETE = "incomplete"
+MISSING = "missing"
+
+PARQUET_MAGIC = b"PAR1"
+
+
+def is_complete_raw_result(raw_result_path: Path) -> bool:
+    """
+    Return whether Exomiser has finished writing a raw result.
+    A Parquet file is complete once its footer magic is present;
+    a JSON file once it ends with the closing bracket of its top-level array or object.
+    """
+    try:
+        with open(raw_result_path, "rb") as raw_result:
+            raw_result.seek(0, os.SEEK_END)
+            size = raw_result.tell()
+            if raw_result_path.name.endswith(".parquet"):
+                if size < 2 * len(PARQUET_MAGIC) + 4:
+                    return False
+                raw_result.seek(-len(PARQUET_MAGIC), os.SEEK_END)
+                return raw_result.read() == PARQUET_MAGIC
+            raw_result.seek(max(size - 64, 0))
+            return raw_result.read().rstrip()[-1:] in (b"]", b"}")
+    except OSError:
+        return False
+
+
+def file_system_time(directory: Path) -> float:
+    """
+    Return the current time of the clock the files of a directory are stamped by, which for
+    a network filesystem is the server's, by stamping a temporary file in it.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=directory, prefix=".clock-") as clock:
+        return os.fstat(clock.fileno()).st_mtime
+
+
+def raw_result_sample_id(raw_result: str) -> str:
+    """Return the sample id of a raw result, the phenopacket stem Exomiser named it after."""
+    return raw_result[: raw_result.rindex("-exomiser")] if "-exomiser" in raw_result else raw_result
+
+
+def raw_result_rows(raw_result_path: Path) -> Optional[int]:
+    """
+    Return the number of rows of a Parquet or Arrow IPC raw result, read from its footer,
+    or None for a JSON result, which would have to be parsed to count them.
+    """
+    try:
+        if raw_result_path.name.endswith(".parquet"):
+            return pl.scan_parquet(raw_result_path).select(pl.len()).collect().item()
+        if raw_result_path.name.endswith(".arrow"):
+            return pl.scan_ipc(raw_result_path).select(pl.len()).collect().item()
+    except (OSError, pl.exceptions.PolarsError):
+        pass
+    return None
+
+
+@dataclass
+class RawResultEntry:
+    """
+    A raw result in the catalog, keyed by the file name Exomiser wrote it as.
+    path is the file name holding it now, which differs once it is compressed or converted to Arrow IPC.
+    """
+
+    raw_result: str
+    path: str
+    sample_id: str
+    size: int
+    mtime: float
+    rows: Optional[int]
+    state: str
+
+    def line(self) -> str:
+        return "\t".join("" if value is None else str(value) for value in astuple(self)) + "\n"
+
+    @classmethod
+    def from_line(cls, line: str) -> Optional["RawResultEntry"]:
+        """Parse a catalog line, or return None for a line cut short by a concurrent append."""
+        values = line.rstrip("\n").split("\t")
+        if not line.endswith("\n") or len(values) != len(fields(cls)):
+            return None
+        raw_result, path, sample_id, size, mtime, rows, state = values
+        return cls(
+            raw_result, path, sample_id, int(size), float(mtime), int(rows) if rows else None, state
+        )
+
+
+def catalog_raw_result(
+    raw_results_dir: Path,
+    raw_result: str,
+    path: Optional[str] = None,
+    known_entry: Optional[RawResultEntry] = None,
+) -> RawResultEntry:
+    """
+    Stat a raw result and return its catalog entry. A result as written by Exomiser is complete once
+    is_complete_raw_result says so, while compressed or converted results are always complete,
+    as they are replaced atomically. The known entry is returned if the file has not changed since.
+    """
+    path = path or raw_result
+    try:
+        stat = raw_results_dir.joinpath(path).stat()
+    except OSError:
+        return RawResultEntry(
+            raw_result, path, raw_result_sample_id(raw_result), 0, 0.0, None, MISSING
+        )
+    if (
+        known_entry is not None
+        and known_entry.state == COMPLETE
+        and (known_entry.path, known_entry.size, known_entry.mtime)
+        == (path, stat.st_size, stat.st_mtime)
+    ):
+        return known_entry
+    complete = path != raw_result or is_complete_raw_result(raw_results_dir.joinpath(path))
+    return RawResultEntry(
+        raw_result=raw_result,
+        path=path,
+        sample_id=raw_result_sample_id(raw_result),
+        size=stat.st_size,
+        mtime=stat.st_mtime,
+        rows=raw_result_rows(raw_results_dir.joinpath(path)) if complete else None,
+        state=COMPLETE if complete else INCOMPLETE,
+    )
+
+
+_CATALOG_HEADER = "\t".join(field.name for field in fields(RawResultEntry)) + "\n"
+
+
+class RawResultCatalog:
+    """
+    Append-only catalog of the raw results in a raw results directory, kept in the directory itself,
+    holding the path, sample id, size, modification time, row count and completion state of each result.
+    It is maintained as results are produced, so later stages look results up in it instead of listing
+    and statting a directory that can hold hundreds of thousands of files.
+    A later line for a raw result supersedes the earlier ones. The catalog is only current while
+    it is at least as recent as the directory: files added to or removed from the directory since,
+    e.g., by a run not maintaining it or by hand, make the directory newer.
+    """
+
+    def __init__(self, raw_results_dir: Path):
+        self.raw_results_dir = raw_results_dir
+        self.path = raw_results_dir.joinpath(RAW_RESULT_CATALOG_FILE_NAME)
+        self._lock = threading.Lock()
+
+    def entries(self) -> Dict[str, RawResultEntry]:
+        """Return the latest entry of each catalogued raw result, by raw result file name."""
+        entries = {}
+        if not self.path.exists():
+            return entries
+        with open(self.path) as catalog:
+            next(catalog, None)
+            for line in catalog:
+                entry = RawResultEntry.from_line(line)
+                if entry is not None:
+                    entries[entry.raw_result] = entry
+        return entries
+
+    def record(self, entries: Iterable[RawResultEntry]) -> None:
+        """Append entries to the catalog at once; a reader racing the append skips any line cut short."""
+        lines = "".join(entry.line() for entry in entries)
+        if not lines:
+            return
+        with self._lock:
+            self.raw_results_dir.mkdir(parents=True, exist_ok=True)
+            header = "" if self.path.exists() else _CATALOG_HEADER
+            with open(self.path, "a") as catalog:
+                catalog.write(header + lines)
+
+    def rewrite(self, entries: Iterable[RawResultEntry]) -> None:
+        """Atomically replace the catalog with the given entries."""
+        tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+        with open(tmp_path, "w") as catalog:
+            catalog.write(_CATALOG_HEADER)
+            catalog.writelines(entry.line() for entry in entries)
+        os.replace(tmp_path, self.path)
+        self.mark_current()
+
+    def is_current(self) -> bool:
+        """Return whether the catalog exists and is at least as recent as its directory."""
+        try:
+            return self.path.stat().st_mtime_ns >= self.raw_results_dir.stat().st_mtime_ns
+        except OSError:
+            return False
+
+    def mark_current(self) -> None:
+        """
+        Mark the catalog as current, once every change to the directory since it was last
+        written - such as removing the run's temporary directories - is known to be catalogued.
+        """
+        if self.path.exists():
+            os.utime(self.path)
+
+    def remove(self) -> None:
+        """Remove the catalog, so the directory is listed."""
+        self.path.unlink(missing_ok=True)
+
+
+def read_raw_result_catalog(raw_results_dir: Path) -> Optional[Dict[str, RawResultEntry]]:
+    """
+    Return the catalogued raw results of a directory, or None if it must be listed instead,
+    as it has no catalog or has changed since the catalog was written.
+    """
+    catalog = RawResultCatalog(raw_results_dir)
+    return catalog.entries() if catalog.is_current() else None
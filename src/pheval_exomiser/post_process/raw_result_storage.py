@@ -0,0 +1,330 @@
+import gzip
+import io
+import os
+from pathlib import Path
+from typing import BinaryIO, List
+
+import click
+import polars as pl
+
+from pheval_exomiser.post_process.raw_result_catalog import (
+    COMPLETE,
+    RawResultCatalog,
+    RawResultEntry,
+    catalog_raw_result,
+    read_raw_result_catalog,
+)
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstd compaction is optional
+    zstandard = None
+
+COMPRESSED_JSON_SUFFIXES = {".gz": "gzip", ".zst": "zstd"}
+
+COMPACTION_MANIFEST_FILE_NAME = "compaction_manifest.tsv"
+
+IPC_SUFFIX = ".arrow"
+
+
+def strip_compression_suffix(raw_result_name: str) -> str:
+    """Return a raw result file name without any compression or Arrow IPC conversion suffix."""
+    if raw_result_name.endswith(IPC_SUFFIX):
+        return raw_result_name[: -len(IPC_SUFFIX)]
+    for suffix in COMPRESSED_JSON_SUFFIXES:
+        if raw_result_name.endswith(f".json{suffix}"):
+            return raw_result_name[: -len(suffix)]
+    return raw_result_name
+
+
+def current_raw_result(raw_result_paths: List[Path]) -> Path:
+    """
+    Return the file to read a raw result from, of its original and its Arrow IPC conversion:
+    the conversion, unless the original has been rewritten since, e.g., by rerunning Exomiser.
+    """
+    originals = sorted(path for path in raw_result_paths if not path.name.endswith(IPC_SUFFIX))
+    conversions = [path for path in raw_result_paths if path.name.endswith(IPC_SUFFIX)]
+    if not conversions:
+        return originals[0]
+    if originals and conversions[0].stat().st_mtime_ns < max(
+        original.stat().st_mtime_ns for original in originals
+    ):
+        return originals[0]
+    return conversions[0]
+
+
+def raw_result_files(result_dir: Path, use_parquet: bool) -> List[Path]:
+    """
+    Return the sorted raw Parquet or JSON results in a directory,
+    including JSON results compressed by compact_raw_results.
+    A result converted to Arrow IPC by convert_raw_results_to_ipc is returned instead of its original,
+    unless the original is newer.
+    The complete results of the directory's raw result catalog are returned without listing it, if it has one.
+    """
+    suffixes = (
+        (".parquet",)
+        if use_parquet
+        else (".json",) + tuple(f".json{suffix}" for suffix in COMPRESSED_JSON_SUFFIXES)
+    )
+    ipc_suffix = f"{'.parquet' if use_parquet else '.json'}{IPC_SUFFIX}"
+    catalog = read_raw_result_catalog(result_dir)
+    if catalog is not None:
+        return sorted(
+            result_dir.joinpath(entry.path)
+            for entry in catalog.values()
+            if entry.state == COMPLETE and entry.path.endswith(suffixes + (ipc_suffix,))
+        )
+    raw_results = {}
+    for file_path in result_dir.iterdir():
+        if file_path.name.endswith(suffixes + (ipc_suffix,)):
+            raw_results.setdefault(strip_compression_suffix(file_path.name), []).append(file_path)
+    return sorted(current_raw_result(raw_result_paths) for raw_result_paths in raw_results.values())
+
+
+def _zstandard_module():
+    if zstandard is None:
+        raise click.UsageError(
+            "zstd compression requires the zstandard package, "
+            "installed with the zstd extra: pip install 'pheval_exomiser[zstd]'"
+        )
+    return zstandard
+
+
+def open_raw_result(raw_result_path: Path) -> BinaryIO:
+    """Open a raw result for binary reading, decompressing gzip or zstd compressed JSON."""
+    if raw_result_path.name.endswith(".gz"):
+        return gzip.open(raw_result_path, "rb")
+    if raw_result_path.name.endswith(".zst"):
+        return _zstandard_module().ZstdDecompressor().stream_reader(open(raw_result_path, "rb"))
+    return open(raw_result_path, "rb")
+
+
+def read_json_result(raw_result_path: Path) -> pl.DataFrame:
+    """Read a raw Exomiser JSON result, which may be compressed."""
+    if strip_compression_suffix(raw_result_path.name) == raw_result_path.name:
+        return pl.read_json(raw_result_path, infer_schema_length=None)
+    with open_raw_result(raw_result_path) as raw_result:
+        return pl.read_json(io.BytesIO(raw_result.read()), infer_schema_length=None)
+
+
+def read_ipc_result(raw_result_path: Path) -> pl.DataFrame:
+    """
+    Read a raw result converted to Arrow IPC. The file is memory-mapped, so its buffers are shared
+    through the page cache by every worker reading it, and selecting columns from it does not copy them.
+    """
+    return pl.read_ipc(raw_result_path, memory_map=True, rechunk=False)
+
+
+def _compress_json(raw_result_path: Path, codec: str) -> Path:
+    suffix = next(suffix for suffix, name in COMPRESSED_JSON_SUFFIXES.items() if name == codec)
+    compressed_path = raw_result_path.with_name(f"{raw_result_path.name}{suffix}")
+    tmp_path = compressed_path.with_name(f".{compressed_path.name}.tmp")
+    with open(raw_result_path, "rb") as raw_result:
+        if codec == "gzip":
+            with gzip.open(tmp_path, "wb") as compressed:
+                compressed.writelines(raw_result)
+        else:
+            with open(tmp_path, "wb") as compressed:
+                _zstandard_module().ZstdCompressor().copy_stream(raw_result, compressed)
+    os.replace(tmp_path, compressed_path)
+    raw_result_path.unlink()
+    return compressed_path
+
+
+def _recompress_parquet(raw_result_path: Path, compression_level: int) -> Path:
+    tmp_path = raw_result_path.with_name(f".{raw_result_path.name}.tmp")
+    pl.read_parquet(raw_result_path).write_parquet(
+        tmp_path, compression="zstd", compression_level=compression_level
+    )
+    if tmp_path.stat().st_size < raw_result_path.stat().st_size:
+        os.replace(tmp_path, raw_result_path)
+    else:
+        tmp_path.unlink()
+    return raw_result_path
+
+
+def compact_raw_results(
+    raw_results_dir: Path, codec: str = "gzip", parquet_compression_level: int = 10
+) -> None:
+    """
+    Compress raw JSON results with gzip or zstd and recompress raw Parquet results with zstd,
+    recording each file's original and compacted size in a manifest in the raw results directory.
+    Files are replaced atomically, so an interrupted compaction can be rerun.
+    The results to compact are looked up in the raw result catalog, if there is one, which is updated
+    with the compacted files.
+    """
+    catalog = read_raw_result_catalog(raw_results_dir)
+    raw_result_paths = (
+        sorted(
+            raw_results_dir.joinpath(entry.path)
+            for entry in catalog.values()
+            if entry.state == COMPLETE
+        )
+        if catalog is not None
+        else sorted(raw_results_dir.iterdir())
+    )
+    compacted_entries = []
+    manifest_path = raw_results_dir.joinpath(COMPACTION_MANIFEST_FILE_NAME)
+    write_header = not manifest_path.exists()
+    with open(manifest_path, "a") as manifest:
+        if write_header:
+            manifest.write(
+                "original_file\tcompacted_file\tcodec\toriginal_bytes\tcompacted_bytes\n"
+            )
+        for raw_result_path in raw_result_paths:
+            if raw_result_path.name.endswith(".json"):
+                raw_result_codec = codec
+            elif raw_result_path.name.endswith(".parquet"):
+                raw_result_codec = f"parquet-zstd-{parquet_compression_level}"
+            else:
+                continue
+            original_bytes = raw_result_path.stat().st_size
+            compacted_path = (
+                _compress_json(raw_result_path, codec)
+                if raw_result_path.name.endswith(".json")
+                else _recompress_parquet(raw_result_path, parquet_compression_level)
+            )
+            manifest.write(
+                f"{raw_result_path.name}\t{compacted_path.name}\t{raw_result_codec}\t"
+                f"{original_bytes}\t{compacted_path.stat().st_size}\n"
+            )
+            if catalog is not None:
+                compacted_entries.append(
+                    catalog_raw_result(
+                        raw_results_dir,
+                        strip_compression_suffix(compacted_path.name),
+                        compacted_path.name,
+                    )
+                )
+    RawResultCatalog(raw_results_dir).record(compacted_entries)
+
+
+def convert_raw_results_to_ipc(raw_results_dir: Path, remove_original: bool = False) -> List[Path]:
+    """
+    Convert raw Parquet and (compressed) JSON results to uncompressed Arrow IPC files,
+    which post-processing reads memory-mapped instead of decoding each result onto the heap.
+    Results already converted are skipped, unless their original has been rewritten since,
+    and files are replaced atomically.
+    The raw result catalog, if there is one, is updated with the converted files.
+    Returns the converted files.
+    """
+    has_catalog = read_raw_result_catalog(raw_results_dir) is not None
+    converted_paths = []
+    for raw_result_path in raw_result_files(raw_results_dir, True) + raw_result_files(
+        raw_results_dir, False
+    ):
+        if raw_result_path.name.endswith(IPC_SUFFIX):
+            continue
+        ipc_path = raw_result_path.with_name(
+            f"{strip_compression_suffix(raw_result_path.name)}{IPC_SUFFIX}"
+        )
+        tmp_path = ipc_path.with_name(f".{ipc_path.name}.tmp")
+        raw_result = (
+            pl.read_parquet(raw_result_path)
+            if raw_result_path.name.endswith(".parquet")
+            else read_json_result(raw_result_path)
+        )
+        raw_result.write_ipc(tmp_path, compression="uncompressed")
+        os.replace(tmp_path, ipc_path)
+        if remove_original:
+            raw_result_path.unlink()
+        converted_paths.append(ipc_path)
+    if has_catalog:
+        RawResultCatalog(raw_results_dir).record(
+            catalog_raw_result(
+                raw_results_dir, strip_compression_suffix(ipc_path.name), ipc_path.name
+            )
+            for ipc_path in converted_paths
+        )
+    return converted_paths
+
+
+def catalog_raw_results(raw_results_dir: Path) -> List[RawResultEntry]:
+    """
+    List a raw results directory once to write a raw result catalog of its Parquet and (compressed) JSON
+    results, replacing any existing catalog, for results not produced by a run maintaining one.
+    A result converted to Arrow IPC is catalogued instead of its original, unless the original is newer.
+    Returns the catalogued results.
+    """
+    suffixes = (".parquet", ".json", IPC_SUFFIX) + tuple(
+        f".json{suffix}" for suffix in COMPRESSED_JSON_SUFFIXES
+    )
+    raw_results = {}
+    with os.scandir(raw_results_dir) as entries:
+        for entry in entries:
+            if entry.name.endswith(suffixes):
+                raw_results.setdefault(strip_compression_suffix(entry.name), []).append(
+                    Path(entry.path)
+                )
+    catalog_entries = [
+        catalog_raw_result(raw_results_dir, raw_result_name, current_raw_result(paths).name)
+        for raw_result_name, paths in sorted(raw_results.items())
+    ]
+    RawResultCatalog(raw_results_dir).rewrite(catalog_entries)
+    return catalog_entries
+
+
+@click.command()
+@click.option(
+    "--results-dir",
+    "-R",
+    required=True,
+    metavar="DIRECTORY",
+    help="Full path to Exomiser raw results directory to be compacted.",
+    type=Path,
+)
+@click.option(
+    "--codec",
+    "-c",
+    help="Compression codec for raw JSON results.",
+    type=click.Choice(["gzip", "zstd"]),
+    default="gzip",
+    show_default=True,
+)
+@click.option(
+    "--parquet-compression-level",
+    "-l",
+    help="zstd compression level for recompressing raw Parquet results.",
+    type=int,
+    default=10,
+    show_default=True,
+)
+def compact_exomiser_results(results_dir: Path, codec: str, parquet_compression_level: int):
+    """Compress raw Exomiser results in place, readable by post-process-exomiser-results."""
+    compact_raw_results(results_dir, codec, parquet_compression_level)
+
+
+@click.command()
+@click.option(
+    "--results-dir",
+    "-R",
+    required=True,
+    metavar="DIRECTORY",
+    help="Full path to Exomiser raw results directory to be converted.",
+    type=Path,
+)
+@click.option(
+    "--remove-original/--keep-original",
+    default=False,
+    show_default=True,
+    help="Remove each raw result once it is converted.",
+)
+def convert_exomiser_results_to_ipc(results_dir: Path, remove_original: bool):
+    """Convert raw Exomiser results to Arrow IPC, memory-mapped by post-process-exomiser-results."""
+    converted_paths = convert_raw_results_to_ipc(results_dir, remove_original)
+    print(f"Converted {len(converted_paths)} raw results to Arrow IPC.")
+
+
+@click.command()
+@click.option(
+    "--results-dir",
+    "-R",
+    required=True,
+    metavar="DIRECTORY",
+    help="Full path to Exomiser raw results directory to be catalogued.",
+    type=Path,
+)
+def catalog_exomiser_results(results_dir: Path):
+    """Catalog raw Exomiser results, looked up by post-process-exomiser-results instead of listing them."""
+    catalog_entries = catalog_raw_results(results_dir)
+    print(f"Catalogued {len(catalog_entries)} raw results.")
@@ -0,0 +1,235 @@
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import polars as pl
+from pheval.post_processing.mondo_mapping import map_disease_id
+from pheval.post_processing.post_processing import ResultType, SortOrder, mondo_mapping_table
+from pheval.post_processing.validate_result_format import ResultSchema
+
+SAMPLE_ID = "sample_id"
+
+VECTORISED_CHUNK_SIZE = 256
+
+RESULT_COLUMNS = {
+    ResultType.GENE: ["rank", "score", "gene_symbol", "gene_identifier", "true_positive"],
+    ResultType.VARIANT: [
+        "rank",
+        "score",
+        "chrom",
+        "start",
+        "end",
+        "ref",
+        "alt",
+        "variant_id",
+        "true_positive",
+    ],
+    ResultType.DISEASE: [
+        "rank",
+        "score",
+        "disease_identifier",
+        "mondo_identifier",
+        "true_positive",
+    ],
+}
+
+RESULT_SCHEMAS = {
+    ResultType.GENE: ResultSchema.GENE_RESULT_SCHEMA,
+    ResultType.VARIANT: ResultSchema.VARIANT_RESULT_SCHEMA,
+    ResultType.DISEASE: ResultSchema.DISEASE_RESULT_SCHEMA,
+}
+
+VARIANT_KEY = ["chrom", "start", "end", "ref", "alt"]
+
+
+def result_file(output_dir: Path, result_type: ResultType, sample_id: str) -> Path:
+    """Return the standardised result file of a sample."""
+    return output_dir.joinpath(
+        f"pheval_{result_type.value}_results", f"{sample_id}-{result_type.value}_result.parquet"
+    )
+
+
+def pheval_sample_order(results: pl.DataFrame, sort_order: SortOrder) -> pl.DataFrame:
+    """
+    Sort the results of a single sample by score exactly as pheval does, so that tied scores are in its order,
+    which depends on how polars sorts the score column, e.g., whether it is flagged as sorted.
+    """
+    return results.sort("score", descending=sort_order == SortOrder.DESCENDING)
+
+
+def rank_results_by_sample(results: pl.DataFrame, sort_order: SortOrder) -> pl.DataFrame:
+    """
+    Rank the results of many samples at once, as pheval ranks the results of a single sample:
+    equal scores share the lowest rank, and results sharing a grouping_id or mondo_identifier
+    are not penalised for each other. The sort is stable, so the results of each sample must already be
+    in pheval's order, by pheval_sample_order, for tied scores to end up in it.
+    """
+    sort_descending = sort_order == SortOrder.DESCENDING
+    group_by = [
+        column for column in ["grouping_id", "mondo_identifier"] if column in results.columns
+    ]
+    results = results.sort(
+        [SAMPLE_ID, "score"], descending=[False, sort_descending], maintain_order=True
+    )
+    if group_by:
+        return results.with_columns(
+            pl.struct(["score"] + group_by)
+            .rank(method="dense", descending=sort_descending)
+            .over(SAMPLE_ID)
+            .cast(pl.Int32)
+            .alias("min_rank")
+        ).with_columns(pl.col("min_rank").max().over([SAMPLE_ID, "score"]).alias("rank"))
+    return results.with_columns(
+        pl.col("score").rank(method="max", descending=sort_descending).over(SAMPLE_ID).alias("rank")
+    )
+
+
+def _keys(results: pl.DataFrame, columns: List[str]) -> pl.Series:
+    return results.select(pl.struct([SAMPLE_ID] + columns)).to_series()
+
+
+def _is_in(results: pl.DataFrame, columns: List[str]) -> pl.Expr:
+    return pl.struct([SAMPLE_ID] + columns).is_in(_keys(results, columns).implode())
+
+
+def classify_gene_results(
+    ranked_results: pl.DataFrame, classified_results: pl.DataFrame
+) -> pl.DataFrame:
+    """Mark ranked gene results as true positives, and return them with the unranked classified genes."""
+    return pl.concat(
+        [
+            ranked_results.with_columns(
+                (
+                    (_is_in(classified_results, ["gene_symbol"]) & (pl.col("gene_symbol") != ""))
+                    | (
+                        _is_in(classified_results, ["gene_identifier"])
+                        & (pl.col("gene_identifier") != "")
+                    )
+                ).alias("true_positive")
+            ),
+            classified_results.filter(~_is_in(ranked_results, ["gene_symbol"])),
+        ],
+        how="diagonal_relaxed",
+    )
+
+
+def classify_variant_results(
+    ranked_results: pl.DataFrame, classified_results: pl.DataFrame
+) -> pl.DataFrame:
+    """Mark ranked variant results as true positives, and return them with the unranked classified variants."""
+    ranked_results = ranked_results.with_columns(
+        pl.concat_str(["chrom", "start", "ref", "alt"], separator="-").alias("variant_id")
+    )
+    return pl.concat(
+        [
+            ranked_results.with_columns(
+                _is_in(classified_results, VARIANT_KEY).alias("true_positive")
+            ),
+            classified_results.filter(~_is_in(ranked_results, VARIANT_KEY)),
+        ],
+        how="diagonal_relaxed",
+    )
+
+
+@lru_cache(maxsize=None)
+def _mondo_identifier(disease_identifier: str) -> str:
+    return map_disease_id(disease_identifier, mondo_mapping_table)
+
+
+def classify_disease_results(
+    ranked_results: pl.DataFrame, classified_results: pl.DataFrame
+) -> pl.DataFrame:
+    """
+    Map ranked disease results to MONDO, mapping each distinct disease once,
+    mark them as true positives, and return them with the unranked classified diseases.
+    """
+    disease_identifiers = ranked_results["disease_identifier"].unique().to_list()
+    ranked_results = ranked_results.with_columns(
+        pl.col("disease_identifier")
+        .replace_strict(
+            disease_identifiers,
+            [_mondo_identifier(disease_identifier) for disease_identifier in disease_identifiers],
+            return_dtype=pl.String,
+        )
+        .alias("mondo_identifier")
+    )
+    return pl.concat(
+        [
+            ranked_results.with_columns(
+                _is_in(classified_results, ["mondo_identifier"]).alias("true_positive")
+            ),
+            classified_results.filter(~_is_in(ranked_results, ["mondo_identifier"])),
+        ],
+        how="diagonal_relaxed",
+    )
+
+
+CLASSIFY_METHODS: Dict[ResultType, Callable[[pl.DataFrame, pl.DataFrame], pl.DataFrame]] = {
+    ResultType.GENE: classify_gene_results,
+    ResultType.VARIANT: classify_variant_results,
+    ResultType.DISEASE: classify_disease_results,
+}
+
+
+def read_classified_results(
+    output_dir: Path, result_type: ResultType, sample_ids: List[str]
+) -> pl.DataFrame:
+    """Read the empty (classified) results of samples, written before ranking, with a sample id column."""
+    return pl.concat(
+        [
+            pl.read_parquet(result_file(output_dir, result_type, sample_id)).with_columns(
+                pl.lit(sample_id).alias(SAMPLE_ID)
+            )
+            for sample_id in sample_ids
+        ],
+        how="diagonal_relaxed",
+    )
+
+
+def write_sample_results(
+    results: pl.DataFrame, output_dir: Path, result_type: ResultType, sample_ids: List[str]
+) -> None:
+    """Write the standardised results of each sample to its own file, as pheval does."""
+    sample_results = results.partition_by(SAMPLE_ID, as_dict=True, maintain_order=True)
+    empty_results = results.clear()
+    for sample_id in sample_ids:
+        sample_results.get((sample_id,), empty_results).select(
+            RESULT_COLUMNS[result_type]
+        ).write_parquet(result_file(output_dir, result_type, sample_id), compression="zstd")
+
+
+def generate_results_by_sample(
+    results: List[pl.DataFrame],
+    sample_ids: List[str],
+    result_type: ResultType,
+    sort_order: SortOrder,
+    output_dir: Path,
+) -> None:
+    """
+    Rank, classify and write the results of many samples in one vectorised pass.
+    Each sample's results are validated against the pheval result schema, and the written files match
+    those of pheval's generate_{result_type}_result.
+    """
+    for sample_results in results:
+        RESULT_SCHEMAS[result_type].validate(sample_results)
+    ranked_results = rank_results_by_sample(
+        pl.concat(
+            [
+                pheval_sample_order(sample_results, sort_order).with_columns(
+                    pl.lit(sample_id).alias(SAMPLE_ID)
+                )
+                for sample_results, sample_id in zip(results, sample_ids)
+            ],
+            how="diagonal_relaxed",
+        ),
+        sort_order,
+    )
+    classified_results = read_classified_results(output_dir, result_type, sample_ids)
+    write_sample_results(
+        CLASSIFY_METHODS[result_type](ranked_results, classified_results)
+        .with_columns(pl.col("rank").cast(pl.Int64))
+        .select([SAMPLE_ID] + RESULT_COLUMNS[result_type]),
+        output_dir,
+        result_type,
+        sample_ids,
+    )
@@ -1,22 +1,36 @@
+import os
 import tempfile
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
 import click
 from packaging import version
 from phenopackets import Family, Phenopacket
 from pheval.prepare.custom_exceptions import MutuallyExclusiveOptionError
 from pheval.utils.file_utils import all_files, files_with_suffix
+from pheval.utils.logger import get_logger
 from pheval.utils.phenopacket_utils import PhenopacketUtil, phenopacket_reader
 
 from pheval_exomiser.constants import (
     EXOMISER_YAML_TARGET_DIRECTORY_DOCKER,
+    GENOME_ASSEMBLY_ALIASES,
     OUTPUT_OPTIONS_TARGET_DIRECTORY_DOCKER,
     PHENOPACKET_TARGET_DIRECTORY_DOCKER,
     RAW_RESULTS_TARGET_DIRECTORY_DOCKER,
     VCF_TARGET_DIRECTORY_DOCKER,
 )
+from pheval_exomiser.prepare.phenopacket_index import PhenopacketIndex
+from pheval_exomiser.prepare.runtime_history import (
+    analysis_key,
+    balance_batches,
+    estimate_runtimes,
+    read_recorded_runtimes,
+)
+from pheval_exomiser.profiling import PROFILE_MODES, profile_command
+from pheval_exomiser.tracing import trace_command, trace_span
+
+logger = get_logger()
 
 
 @dataclass
@@ -33,6 +47,52 @@ class ExomiserCommandLineArguments:
     output_formats: Optional[List[str]] = None
 
 
+@dataclass
+class VcfDirectoryIndex:
+    """Index of a VCF directory, scanned once per prepare run, to resolve each sample's VCF against."""
+
+    vcf_dir: Path
+    exists: bool
+    vcf_files: Dict[str, Path] = field(default_factory=dict)
+    missing: List[Tuple[Path, str]] = field(default_factory=list)
+
+    @classmethod
+    def scan(cls, vcf_dir: Path) -> "VcfDirectoryIndex":
+        """Scan a VCF directory into a name to path index."""
+        if not vcf_dir.is_dir():
+            return cls(vcf_dir=vcf_dir, exists=False)
+        with os.scandir(vcf_dir) as entries:
+            return cls(
+                vcf_dir=vcf_dir,
+                exists=True,
+                vcf_files={entry.name: vcf_dir.joinpath(entry.name) for entry in entries},
+            )
+
+    def resolve(self, phenopacket_path: Path, vcf_name: str) -> Path:
+        """
+        Return the indexed path of a VCF, also matching a gzipped or uncompressed copy of it.
+        VCFs not in the directory are recorded as missing.
+        """
+        for candidate_name in [vcf_name, f"{vcf_name}.gz", vcf_name.removesuffix(".gz")]:
+            if candidate_name in self.vcf_files:
+                return self.vcf_files[candidate_name]
+        self.missing.append((phenopacket_path, vcf_name))
+        return self.vcf_dir.joinpath(vcf_name)
+
+    def report_missing(self) -> None:
+        """Log every VCF referenced by a phenopacket that is not in the VCF directory."""
+        if self.missing:
+            logger.warning(
+                "%d VCF files referenced by phenopackets were not found in %s:\n%s",
+                len(self.missing),
+                self.vcf_dir,
+                "\n".join(
+                    f"{phenopacket_path.name}: {vcf_name}"
+                    for phenopacket_path, vcf_name in self.missing
+                ),
+            )
+
+
 def get_all_files_from_output_opt_directory(output_options_dir: Path) -> List[Path] or None:
     """Obtain all output options files if directory is specified - otherwise returns none."""
     return None if output_options_dir is None else all_files(output_options_dir)
@@ -52,6 +112,7 @@ class CommandCreator:
         raw_results_dir: Path or None,
         analysis_yaml: Path or None,
         output_formats: List[str] or None,
+        vcf_directory_index: VcfDirectoryIndex or None = None,
     ):
         self.environment = environment
         self.phenopacket_path = phenopacket_path
@@ -62,6 +123,7 @@ class CommandCreator:
         self.results_dir = raw_results_dir
         self.analysis_yaml = analysis_yaml
         self.output_formats = output_formats
+        self.vcf_directory_index = vcf_directory_index
 
     def assign_output_options_file(self) -> Path or None:
         """Return the path of a single output option yaml if specified,
@@ -104,10 +166,21 @@ class CommandCreator:
         raise ValueError(f"Unknown environment: {self.environment}")
 
     def add_variant_analysis_arguments(self, vcf_dir: Path) -> ExomiserCommandLineArguments:
-        if vcf_dir.exists():
+        vcf_dir_exists = (
+            vcf_dir.exists()
+            if self.vcf_directory_index is None
+            else self.vcf_directory_index.exists
+        )
+        if vcf_dir_exists:
             vcf_file_data = PhenopacketUtil(self.phenopacket).vcf_file_data(
                 self.phenopacket_path, vcf_dir
             )
+            if self.vcf_directory_index is not None:
+                vcf_file_data.uri = str(
+                    self.vcf_directory_index.resolve(
+                        self.phenopacket_path, Path(vcf_file_data.uri).name
+                    )
+                )
         else:
             vcf_file_data = next(
                 file
@@ -166,13 +239,36 @@ def create_command_arguments(
     output_options_file: Path or None = None,
     analysis_yaml: Path or None = None,
     output_formats: List[str] or None = None,
+    phenopacket_index: Path or None = None,
 ) -> List[ExomiserCommandLineArguments]:
-    """Return a list of Exomiser command line arguments for a directory of phenopackets."""
-    phenopacket_paths = files_with_suffix(phenopacket_dir, ".json")
+    """
+    Return a list of Exomiser command line arguments for a directory of phenopackets.
+    If a phenopacket index is given, phenopacket metadata is read from (and kept up to date in)
+    the index instead of reparsing every phenopacket.
+    """
+    with trace_span(
+        "phenopacket_parsing",
+        phenopacket_dir=str(phenopacket_dir),
+        phenopacket_index=str(phenopacket_index) if phenopacket_index else None,
+    ) as span:
+        if phenopacket_index is None:
+            phenopackets = [
+                (phenopacket_path, phenopacket_reader(phenopacket_path))
+                for phenopacket_path in files_with_suffix(phenopacket_dir, ".json")
+            ]
+        else:
+            with PhenopacketIndex(phenopacket_index) as index:
+                phenopackets = [
+                    (Path(metadata.path), metadata.vcf_phenopacket())
+                    for metadata in index.update(phenopacket_dir)
+                ]
+        span.set_attribute("phenopackets", len(phenopackets))
     commands = []
     output_option_dir_files = get_all_files_from_output_opt_directory(output_options_dir)
-    for phenopacket_path in phenopacket_paths:
-        phenopacket = phenopacket_reader(phenopacket_path)
+    vcf_directory_index = (
+        VcfDirectoryIndex.scan(vcf_dir) if phenotype_only and vcf_dir is not None else None
+    )
+    for phenopacket_path, phenopacket in phenopackets:
         commands.append(
             CommandCreator(
                 environment,
@@ -184,11 +280,63 @@ def create_command_arguments(
                 results_dir,
                 analysis_yaml,
                 output_formats,
+                vcf_directory_index,
             ).add_command_line_arguments(vcf_dir)
         )
+    if vcf_directory_index is not None:
+        vcf_directory_index.report_missing()
     return commands
 
 
+def normalise_genome_assembly(genome_assembly: str) -> str:
+    """Return the Exomiser genome build name (hg19/hg38) for a phenopacket genome assembly."""
+    return GENOME_ASSEMBLY_ALIASES.get(genome_assembly, genome_assembly)
+
+
+def group_command_arguments_by_assembly(
+    command_arguments_list: List[ExomiserCommandLineArguments],
+) -> Dict[str, List[ExomiserCommandLineArguments]]:
+    """Group command line arguments by the normalised genome assembly of their VCF."""
+    grouped_command_arguments = {}
+    for command_arguments in command_arguments_list:
+        grouped_command_arguments.setdefault(
+            normalise_genome_assembly(command_arguments.vcf_assembly), []
+        ).append(command_arguments)
+    return grouped_command_arguments
+
+
+def batch_file_assembly(batch_file: Path) -> Optional[str]:
+    """
+    Return the genome build shared by every command in a batch file,
+    or None if the batch has no assembly or mixes assemblies.
+    """
+    assemblies = set()
+    with open(batch_file) as batch:
+        for line in batch:
+            arguments = line.split()
+            if "--assembly" not in arguments:
+                return None
+            assemblies.add(normalise_genome_assembly(arguments[arguments.index("--assembly") + 1]))
+    return assemblies.pop() if len(assemblies) == 1 else None
+
+
+def batch_file_sort_key(batch_file: Path) -> Tuple[str, int]:
+    """Return the key ordering batch files by prefix and then batch number, so batch 2 comes before batch 10."""
+    batch_prefix, _, batch_number = batch_file.stem.rpartition("-")
+    return (batch_prefix, int(batch_number)) if batch_number.isdigit() else (batch_file.stem, 0)
+
+
+def batch_file_output_filenames(batch_file: Path) -> List[str]:
+    """Return the Exomiser output file name of every command in a batch file."""
+    output_filenames = []
+    with open(batch_file) as batch:
+        for line in batch:
+            arguments = line.split()
+            if "--output-filename" in arguments:
+                output_filenames.append(arguments[arguments.index("--output-filename") + 1])
+    return output_filenames
+
+
 class CommandsWriter:
     """Write a command to file."""
 
@@ -333,6 +481,27 @@ class BatchFileWriter:
         )
         self.write_commands(commands_writer)
 
+    def write_balanced_batch_files(self, max_jobs: int, estimates: List[float]) -> None:
+        """
+        Write the commands to batch files of at most max_jobs commands (one batch file if max_jobs is 0)
+        with equal estimated runtimes, longest first.
+        """
+        batches = balance_batches(self.command_arguments_list, estimates, max_jobs)
+        for batch_number, batch in enumerate(batches, start=1):
+            batch_file_name = (
+                f"{self.batch_prefix}-exomiser-batch.txt"
+                if max_jobs == 0
+                else f"{self.batch_prefix}-exomiser-batch-{batch_number}.txt"
+            )
+            commands_writer = CommandsWriter(
+                Path(self.output_dir).joinpath(batch_file_name),
+                self.variant_analysis,
+                self.exomiser_version,
+            )
+            for command_arguments in batch:
+                commands_writer.write_local_commands(command_arguments)
+            commands_writer.close()
+
     def create_split_batch_files(self, max_jobs: int) -> None:
         """Split temp file into separate batch files, dependent on the number of max jobs allocated to each file."""
         temp_file_name = self.write_temp_file()
@@ -355,6 +524,82 @@ class BatchFileWriter:
         Path(temp_file_name).unlink()
 
 
+def apply_debug_output_formats(
+    command_arguments: List[ExomiserCommandLineArguments],
+    debug_samples: List[str] or None,
+    debug_output_formats: List[str] or None,
+) -> None:
+    """Set the output formats of the samples named in debug_samples (by phenopacket file stem)."""
+    for sample_command_arguments in command_arguments:
+        if debug_samples and sample_command_arguments.sample.stem in debug_samples:
+            sample_command_arguments.output_formats = debug_output_formats
+
+
+def command_input_size(command_arguments: ExomiserCommandLineArguments) -> int:
+    """Return the size in bytes of a command's VCF, or of its phenopacket for a phenotype-only command."""
+    try:
+        return Path(command_arguments.vcf_file or command_arguments.sample).stat().st_size
+    except OSError:
+        return 0
+
+
+def write_batch_files(
+    command_arguments: List[ExomiserCommandLineArguments],
+    variant_analysis: bool,
+    output_dir: Path,
+    batch_prefix: str,
+    max_jobs: int,
+    exomiser_version: str,
+    recorded_runtimes: Optional[Dict[str, float]] = None,
+) -> None:
+    """
+    Write Exomiser batch files, with variant analysis samples batched by genome assembly.
+    Given the recorded runtimes of samples, samples are ordered longest first into batches of
+    equal estimated runtime, rather than in directory order.
+    """
+    with trace_span(
+        "batch_writing",
+        samples=len(command_arguments),
+        max_jobs=max_jobs,
+        batch_prefix=batch_prefix,
+    ):
+        grouped_command_arguments = (
+            group_command_arguments_by_assembly(command_arguments)
+            if variant_analysis
+            else {None: command_arguments}
+        )
+        for genome_assembly, assembly_command_arguments in grouped_command_arguments.items():
+            assembly_batch_prefix = (
+                batch_prefix if genome_assembly is None else f"{batch_prefix}-{genome_assembly}"
+            )
+            batch_file_writer = BatchFileWriter(
+                assembly_command_arguments,
+                variant_analysis,
+                output_dir,
+                assembly_batch_prefix,
+                exomiser_version,
+            )
+            if recorded_runtimes is not None:
+                batch_file_writer.write_balanced_batch_files(
+                    max_jobs,
+                    estimate_runtimes(
+                        [
+                            sample_command_arguments.sample.stem
+                            for sample_command_arguments in assembly_command_arguments
+                        ],
+                        [
+                            command_input_size(sample_command_arguments)
+                            for sample_command_arguments in assembly_command_arguments
+                        ],
+                        recorded_runtimes,
+                    ),
+                )
+            elif max_jobs == 0:
+                batch_file_writer.write_all_commands()
+            else:
+                batch_file_writer.create_split_batch_files(max_jobs)
+
+
 def create_batch_file(
     environment: str,
     analysis: Path,
@@ -369,8 +614,16 @@ def create_batch_file(
     output_options_dir: Path = None,
     output_options_file: Path = None,
     output_formats: List[str] = None,
+    debug_samples: List[str] = None,
+    debug_output_formats: List[str] = None,
+    phenopacket_index: Path = None,
+    runtime_history: Path = None,
 ) -> None:
-    """Create Exomiser batch files."""
+    """
+    Create Exomiser batch files, with variant analysis samples batched by genome assembly.
+    Samples named in debug_samples (by phenopacket file stem) are written with debug_output_formats.
+    With a runtime history, samples are batched by their recorded or estimated runtimes.
+    """
     command_arguments = create_command_arguments(
         environment,
         phenopacket_dir,
@@ -381,19 +634,17 @@ def create_batch_file(
         output_options_file,
         analysis,
         output_formats,
+        phenopacket_index,
     )
-    (
-        BatchFileWriter(
-            command_arguments, variant_analysis, output_dir, batch_prefix, exomiser_version
-        ).write_all_commands()
-        if max_jobs == 0
-        else BatchFileWriter(
-            command_arguments,
-            variant_analysis,
-            output_dir,
-            batch_prefix,
-            exomiser_version,
-        ).create_split_batch_files(max_jobs)
+    apply_debug_output_formats(command_arguments, debug_samples, debug_output_formats)
+    write_batch_files(
+        command_arguments,
+        variant_analysis,
+        output_dir,
+        batch_prefix,
+        max_jobs,
+        exomiser_version,
+        read_recorded_runtimes(runtime_history, exomiser_version, analysis_key(analysis)),
     )
 
 
@@ -504,6 +755,37 @@ def create_batch_file(
     multiple=True,
     help="One or more output formats (e.g., --output-format vcf --output-format json).",
 )
+@click.option(
+    "--phenopacket-index",
+    required=False,
+    metavar="FILE",
+    type=Path,
+    help="Path to a phenopacket metadata index, created if missing and updated incrementally.",
+)
+@click.option(
+    "--runtime-history",
+    required=False,
+    metavar="FILE",
+    type=Path,
+    help="Path to a sample runtime history, used to batch samples longest first "
+    "into batches of equal estimated runtime.",
+)
+@click.option(
+    "--profile",
+    type=click.Choice(PROFILE_MODES),
+    is_flag=False,
+    flag_value="timers",
+    default=None,
+    help="Time each preparation step, optionally with cProfile dumps, "
+    "writing profile_summary.tsv to the output directory [default: PHEVAL_EXOMISER_PROFILE].",
+)
+@click.option(
+    "--trace-file",
+    required=False,
+    metavar="PATH",
+    type=Path,
+    help="Record spans for phenopacket parsing and batch writing to a JSONL trace file.",
+)
 def prepare_exomiser_batch(
     environment: str,
     analysis_yaml: Path,
@@ -518,21 +800,33 @@ def prepare_exomiser_batch(
     output_options_dir: Path = None,
     output_options_file: Path = None,
     output_formats: List[str] = None,
+    phenopacket_index: Path = None,
+    runtime_history: Path = None,
+    profile: str = None,
+    trace_file: Path = None,
 ):
     """Generate Exomiser batch files."""
     Path(output_dir).joinpath("tool_input_commands").mkdir(exist_ok=True)
-    create_batch_file(
-        environment=environment,
-        analysis=analysis_yaml,
-        phenopacket_dir=phenopacket_dir,
-        vcf_dir=vcf_dir,
-        output_dir=output_dir,
-        results_dir=results_dir,
-        batch_prefix=batch_prefix,
-        max_jobs=max_jobs,
-        variant_analysis=variant_analysis,
-        output_options_dir=output_options_dir,
-        output_options_file=output_options_file,
-        output_formats=list(output_formats),
-        exomiser_version=exomiser_version,
-    )
+    with (
+        profile_command("prepare_batch", output_dir, profile),
+        trace_command(
+            "prepare_batch", trace_file, exomiser_version=exomiser_version, max_jobs=max_jobs
+        ),
+    ):
+        create_batch_file(
+            environment=environment,
+            analysis=analysis_yaml,
+            phenopacket_dir=phenopacket_dir,
+            vcf_dir=vcf_dir,
+            output_dir=output_dir,
+            results_dir=results_dir,
+            batch_prefix=batch_prefix,
+            max_jobs=max_jobs,
+            variant_analysis=variant_analysis,
+            output_options_dir=output_options_dir,
+            output_options_file=output_options_file,
+            output_formats=list(output_formats),
+            exomiser_version=exomiser_version,
+            phenopacket_index=phenopacket_index,
+            runtime_history=runtime_history,
+        )
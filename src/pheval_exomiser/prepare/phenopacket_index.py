@@ -0,0 +1,143 @@
+import hashlib
+import os
+import sqlite3
+from dataclasses import astuple, dataclass
+from pathlib import Path
+from typing import List, Optional
+
+from phenopackets import File, Phenopacket
+from pheval.utils.phenopacket_utils import PhenopacketUtil, phenopacket_reader
+
+
+@dataclass
+class PhenopacketMetadata:
+    """Metadata of a phenopacket needed to prepare its Exomiser command."""
+
+    path: str
+    mtime_ns: int
+    size: int
+    sha256: str
+    vcf_uri: Optional[str]
+    vcf_assembly: Optional[str]
+    vcf_file_format: Optional[str]
+    hpo_count: int
+
+    def vcf_phenopacket(self) -> Phenopacket:
+        """Return a phenopacket holding only the indexed VCF file, so it can be resolved without reparsing."""
+        if self.vcf_uri is None:
+            return Phenopacket()
+        return Phenopacket(
+            files=[
+                File(
+                    uri=self.vcf_uri,
+                    file_attributes={
+                        "fileFormat": self.vcf_file_format,
+                        "genomeAssembly": self.vcf_assembly,
+                    },
+                )
+            ]
+        )
+
+
+def _sha256(phenopacket_path: Path) -> str:
+    with open(phenopacket_path, "rb") as phenopacket_file:
+        return hashlib.sha256(phenopacket_file.read()).hexdigest()
+
+
+def read_phenopacket_metadata(
+    phenopacket_path: Path, mtime_ns: int, size: int, sha256: str
+) -> PhenopacketMetadata:
+    """Parse a phenopacket and return its metadata."""
+    phenopacket_util = PhenopacketUtil(phenopacket_reader(phenopacket_path))
+    vcf_file = next(
+        (file for file in phenopacket_util.files() if file.file_attributes["fileFormat"] == "vcf"),
+        None,
+    )
+    return PhenopacketMetadata(
+        path=str(phenopacket_path),
+        mtime_ns=mtime_ns,
+        size=size,
+        sha256=sha256,
+        vcf_uri=vcf_file.uri if vcf_file else None,
+        vcf_assembly=vcf_file.file_attributes["genomeAssembly"] if vcf_file else None,
+        vcf_file_format=vcf_file.file_attributes["fileFormat"] if vcf_file else None,
+        hpo_count=len(phenopacket_util.observed_phenotypic_features()),
+    )
+
+
+class PhenopacketIndex:
+    """
+    Persistent SQLite index of phenopacket metadata.
+    Phenopackets are only reparsed when their modification time or size has changed and
+    their content hash no longer matches the indexed one.
+    """
+
+    def __init__(self, index_path: Path):
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(index_path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS phenopacket_metadata ("
+            "path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, sha256 TEXT, "
+            "vcf_uri TEXT, vcf_assembly TEXT, vcf_file_format TEXT, hpo_count INTEGER)"
+        )
+
+    def _indexed_metadata(self, phenopacket_dir: Path) -> dict[str, PhenopacketMetadata]:
+        prefix = f"{phenopacket_dir}{os.sep}"
+        rows = self.connection.execute(
+            "SELECT * FROM phenopacket_metadata WHERE substr(path, 1, ?) = ?",
+            (len(prefix), prefix),
+        )
+        return {
+            row[0]: PhenopacketMetadata(*row)
+            for row in rows
+            if Path(row[0]).parent == phenopacket_dir
+        }
+
+    def update(self, phenopacket_dir: Path) -> List[PhenopacketMetadata]:
+        """
+        Bring the index up to date with the phenopackets in a directory and
+        return their metadata, sorted by path.
+        """
+        phenopacket_dir = phenopacket_dir.resolve()
+        indexed_metadata = self._indexed_metadata(phenopacket_dir)
+        phenopacket_metadata = []
+        with os.scandir(phenopacket_dir) as entries:
+            phenopacket_entries = sorted(
+                (entry for entry in entries if entry.name.endswith(".json")),
+                key=lambda entry: entry.path,
+            )
+        for entry in phenopacket_entries:
+            stat = entry.stat()
+            metadata = indexed_metadata.pop(entry.path, None)
+            if metadata is None or (metadata.mtime_ns, metadata.size) != (
+                stat.st_mtime_ns,
+                stat.st_size,
+            ):
+                sha256 = _sha256(Path(entry.path))
+                if metadata is not None and metadata.sha256 == sha256:
+                    metadata.mtime_ns, metadata.size = stat.st_mtime_ns, stat.st_size
+                else:
+                    metadata = read_phenopacket_metadata(
+                        Path(entry.path), stat.st_mtime_ns, stat.st_size, sha256
+                    )
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO phenopacket_metadata VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    astuple(metadata),
+                )
+            phenopacket_metadata.append(metadata)
+        self.connection.executemany(
+            "DELETE FROM phenopacket_metadata WHERE path = ?",
+            [(removed_path,) for removed_path in indexed_metadata],
+        )
+        self.connection.commit()
+        return phenopacket_metadata
+
+    def close(self) -> None:
+        """Close the index."""
+        self.connection.close()
+
+    def __enter__(self) -> "PhenopacketIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,140 @@
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PLACEHOLDER_PATTERN = re.compile(r"\$\{([^}]+)}")
+
+GENOME_ASSEMBLIES = ["hg19", "hg38"]
+
+
+@dataclass(frozen=True)
+class PreflightProblem:
+    """A path referenced by an application.properties file that Exomiser would fail to open."""
+
+    properties_file: str
+    property_name: str
+    path: str
+    reason: str
+
+
+class PreflightValidationError(Exception):
+    """Raised when paths referenced by application.properties are missing or unreadable."""
+
+    def __init__(self, problems: List[PreflightProblem]):
+        self.problems = problems
+        super().__init__(
+            f"{len(problems)} paths referenced by application.properties failed preflight:\n"
+            + "\n".join(
+                f"  {problem.properties_file}: {problem.property_name}={problem.path} "
+                f"({problem.reason})"
+                for problem in problems
+            )
+        )
+
+
+def read_application_properties(properties_file: Path) -> Dict[str, str]:
+    """Read the key=value pairs of an application.properties file."""
+    properties = {}
+    with open(properties_file) as application_properties:
+        for line in application_properties:
+            line = line.strip()
+            if line and not line.startswith("#") and "=" in line:
+                key, value = line.split("=", 1)
+                properties[key.strip()] = value.strip()
+    return properties
+
+
+def resolve_placeholders(value: str, properties: Dict[str, str]) -> str:
+    """Resolve ${property} placeholders in a property value, leaving unknown placeholders in place."""
+    for _ in range(len(properties) + 1):
+        resolved_value = PLACEHOLDER_PATTERN.sub(
+            lambda match: properties.get(match.group(1), match.group(0)), value
+        )
+        if resolved_value == value:
+            break
+        value = resolved_value
+    return value
+
+
+def path_problem(path: Path, directory: bool = False) -> Optional[str]:
+    """Return why a path cannot be opened by Exomiser, or None if it can."""
+    if PLACEHOLDER_PATTERN.search(str(path)):
+        return "unresolved placeholder"
+    if not path.exists():
+        return "does not exist"
+    if directory and not path.is_dir():
+        return "is not a directory"
+    if not directory and not path.is_file():
+        return "is not a file"
+    if not os.access(path, os.R_OK | (os.X_OK if directory else 0)):
+        return "is not readable"
+    return None
+
+
+def preflight_application_properties(
+    properties_file: Path, data_directory: Optional[Path] = None
+) -> List[PreflightProblem]:
+    """
+    Return the problems with every path an application.properties file references:
+    the data directory, the data-version directory of each genome assembly and of the phenotype data,
+    and every *-path property.
+    A data_directory overrides exomiser.data-directory, e.g. for a docker mount target.
+    Relative paths are resolved against the data-version directory of their genome assembly.
+    """
+    properties = read_application_properties(properties_file)
+    if data_directory is not None:
+        properties["exomiser.data-directory"] = str(data_directory)
+    resolved_properties = {
+        key: resolve_placeholders(value, properties) for key, value in properties.items()
+    }
+    exomiser_data_directory = Path(resolved_properties.get("exomiser.data-directory", "."))
+    checked_paths = [("exomiser.data-directory", exomiser_data_directory, True)]
+    assembly_data_directories = {}
+    for data_type in GENOME_ASSEMBLIES + ["phenotype"]:
+        data_version = resolved_properties.get(f"exomiser.{data_type}.data-version")
+        if data_version is not None:
+            assembly_data_directories[data_type] = exomiser_data_directory.joinpath(
+                f"{data_version}_{data_type}"
+            )
+            checked_paths.append(
+                (
+                    f"exomiser.{data_type}.data-version",
+                    assembly_data_directories[data_type],
+                    True,
+                )
+            )
+    for key, value in resolved_properties.items():
+        if not key.endswith("-path"):
+            continue
+        path = Path(value)
+        if not path.is_absolute():
+            genome_assembly = key.split(".")[1] if key.count(".") >= 2 else None
+            path = assembly_data_directories.get(genome_assembly, exomiser_data_directory).joinpath(
+                path
+            )
+        checked_paths.append((key, path, False))
+    return [
+        PreflightProblem(properties_file.name, key, str(path), problem)
+        for key, path, directory in checked_paths
+        if (problem := path_problem(path, directory)) is not None
+    ]
+
+
+def validate_application_properties(input_dir: Path, environment: str) -> None:
+    """
+    Check every path referenced by the application.properties files in the input directory
+    before any JVM is started, raising a single PreflightValidationError listing every problem.
+    In docker, the data directory mount target is checked as the input directory it is mounted from.
+    """
+    data_directory = input_dir if environment.lower() == "docker" else None
+    problems = []
+    for properties_file in sorted(input_dir.glob("application*.properties")):
+        for problem in preflight_application_properties(properties_file, data_directory):
+            if (problem.property_name, problem.path) not in {
+                (reported.property_name, reported.path) for reported in problems
+            }:
+                problems.append(problem)
+    if problems:
+        raise PreflightValidationError(problems)
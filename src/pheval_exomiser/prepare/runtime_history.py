@@ -0,0 +1,150 @@
+import hashlib
+import heapq
+import math
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, TypeVar
+
+from pheval.utils.logger import get_logger
+
+logger = get_logger()
+
+T = TypeVar("T")
+
+PHENOTYPE_ONLY_ANALYSIS = "phenotype_only"
+
+
+def analysis_key(analysis_yaml: Optional[Path]) -> str:
+    """Return the key of an analysis in the runtime history: the hash of the analysis YAML, or the preset."""
+    if analysis_yaml is None:
+        return PHENOTYPE_ONLY_ANALYSIS
+    with open(analysis_yaml, "rb") as analysis:
+        return hashlib.sha256(analysis.read()).hexdigest()
+
+
+class RuntimeHistory:
+    """
+    Persistent SQLite history of the time Exomiser took on each sample, by Exomiser version and analysis.
+    A sample's recorded runtime is the mean of its previous recorded runtime and its latest one,
+    so it follows changes in the data or the machine without being thrown by a single slow run.
+    """
+
+    def __init__(self, history_path: Path):
+        history_path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(history_path, timeout=60)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS sample_runtime ("
+            "sample TEXT, exomiser_version TEXT, analysis TEXT, seconds REAL, runs INTEGER, "
+            "updated_at REAL, PRIMARY KEY (sample, exomiser_version, analysis))"
+        )
+
+    def record(self, runtimes: Dict[str, float], exomiser_version: str, analysis: str) -> None:
+        """Record the runtimes of samples, by sample name."""
+        updated_at = time.time()
+        self.connection.executemany(
+            "INSERT INTO sample_runtime VALUES (?, ?, ?, ?, 1, ?) "
+            "ON CONFLICT (sample, exomiser_version, analysis) DO UPDATE SET "
+            "seconds = (seconds + excluded.seconds) / 2, runs = runs + 1, "
+            "updated_at = excluded.updated_at",
+            [
+                (sample, exomiser_version, analysis, seconds, updated_at)
+                for sample, seconds in runtimes.items()
+            ],
+        )
+        self.connection.commit()
+
+    def runtimes(self, exomiser_version: str, analysis: str) -> Dict[str, float]:
+        """Return the recorded runtime of every sample run with an Exomiser version and analysis."""
+        return dict(
+            self.connection.execute(
+                "SELECT sample, seconds FROM sample_runtime "
+                "WHERE exomiser_version = ? AND analysis = ?",
+                (exomiser_version, analysis),
+            )
+        )
+
+    def close(self) -> None:
+        """Close the history."""
+        self.connection.close()
+
+    def __enter__(self) -> "RuntimeHistory":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def read_recorded_runtimes(
+    history_path: Optional[Path], exomiser_version: str, analysis: str
+) -> Optional[Dict[str, float]]:
+    """Return the recorded sample runtimes of an Exomiser version and analysis, or None without a history."""
+    if history_path is None:
+        return None
+    with RuntimeHistory(history_path) as history:
+        return history.runtimes(exomiser_version, analysis)
+
+
+def record_runtimes(
+    history_path: Path, exomiser_version: str, analysis: str, runtimes: Dict[str, float]
+) -> None:
+    """Record sample runtimes to a history, warning rather than failing the run if it cannot be written."""
+    if not runtimes:
+        return
+    try:
+        with RuntimeHistory(history_path) as history:
+            history.record(runtimes, exomiser_version, analysis)
+    except sqlite3.Error as error:
+        logger.warning(f"Could not record sample runtimes to {history_path}: {error}")
+
+
+def estimate_runtimes(
+    samples: List[str], input_sizes: List[int], recorded_runtimes: Dict[str, float]
+) -> List[float]:
+    """
+    Return the estimated runtime of each sample: its recorded runtime, or, for a sample without history,
+    its input size (VCF, or phenopacket for phenotype-only runs) at the mean seconds per byte of the
+    samples with history. Without any history, the estimates are the input sizes, which still order
+    and balance the samples relative to each other.
+    """
+    recorded = [
+        (recorded_runtimes[sample], input_size)
+        for sample, input_size in zip(samples, input_sizes)
+        if sample in recorded_runtimes
+    ]
+    recorded_bytes = sum(input_size for _, input_size in recorded)
+    seconds_per_byte = (
+        sum(seconds for seconds, _ in recorded) / recorded_bytes if recorded_bytes else 1.0
+    )
+    return [
+        recorded_runtimes.get(sample, input_size * seconds_per_byte)
+        for sample, input_size in zip(samples, input_sizes)
+    ]
+
+
+def balance_batches(items: List[T], estimates: List[float], max_jobs: int) -> List[List[T]]:
+    """
+    Split items into batches of at most max_jobs items (one batch if max_jobs is 0) with estimated
+    runtimes as equal as possible: items are taken longest first and each is added to the batch
+    with the least estimated time that still has room. Each batch is ordered longest first,
+    and the batches are returned longest first.
+    """
+    ordered = sorted(zip(estimates, range(len(items))), key=lambda item: -item[0])
+    if max_jobs == 0 or len(items) <= max_jobs:
+        return [[items[index] for _, index in ordered]] if items else []
+    batch_count = math.ceil(len(items) / max_jobs)
+    batches: List[List[int]] = [[] for _ in range(batch_count)]
+    batch_seconds = [0.0] * batch_count
+    open_batches = [(0.0, batch_index) for batch_index in range(batch_count)]
+    for estimate, index in ordered:
+        seconds, batch_index = heapq.heappop(open_batches)
+        batches[batch_index].append(index)
+        batch_seconds[batch_index] = seconds + estimate
+        if len(batches[batch_index]) < max_jobs:
+            heapq.heappush(open_batches, (batch_seconds[batch_index], batch_index))
+    return [
+        [items[index] for index in batches[batch_index]]
+        for batch_index in sorted(
+            range(batch_count), key=lambda batch_index: -batch_seconds[batch_index]
+        )
+    ]
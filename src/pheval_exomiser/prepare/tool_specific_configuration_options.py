@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import List, Optional, Union
+from typing import List, Literal, Optional, Union
 
 from pydantic import BaseModel, Field
 
@@ -33,16 +33,67 @@ class ApplicationProperties(BaseModel):
     cache_caffeine_spec: Optional[int] = Field(None)
 
 
+class RankingConfiguration(BaseModel):
+    """
+    Class for defining an additional ranking of post-processed results.
+    Args:
+        score_name (str): Name of score to extract from results.
+        sort_order (str): Order to sort results
+    """
+
+    score_name: str = Field(...)
+    sort_order: str = Field(...)
+
+
 class PostProcessing(BaseModel):
     """
     Class for defining the post-processing configurations.
     Args:
         score_name (str): Name of score to extract from results.
         sort_order (str): Order to sort results
+        additional_rankings (List(RankingConfiguration)): Further score names and sort orders to rank
+            results by, each written to its own output tree while reading every raw result once
+        engine (str): Either per_file, ranking each result file with pheval,
+            or vectorised, ranking the results of many samples in one pass
+        compact_dtypes (bool): Hold extracted variant results in compact dtypes until they are written
+        phenopacket_workers (int): Number of processes bulk-loading the phenopackets,
+            parsed once for all result types
+        pipelined (bool): Standardise raw results as they are written, while Exomiser is running
+        pipeline_workers (int): Number of workers standardising raw results in a pipelined run
+        consolidated_dataset (bool): Also write each result type as a partitioned Parquet dataset
+        dataset_partitions (int): Number of sample partitions in a consolidated dataset
+        keep_per_file_results (bool): Keep the per-sample result files alongside a consolidated dataset
     """
 
     score_name: str = Field(...)
     sort_order: str = Field(...)
+    additional_rankings: Optional[List[RankingConfiguration]] = Field(None)
+    engine: Optional[Literal["per_file", "vectorised"]] = Field("per_file")
+    compact_dtypes: Optional[bool] = Field(False)
+    phenopacket_workers: Optional[int] = Field(1)
+    pipelined: Optional[bool] = Field(False)
+    pipeline_workers: Optional[int] = Field(4)
+    consolidated_dataset: Optional[bool] = Field(False)
+    dataset_partitions: Optional[int] = Field(16)
+    keep_per_file_results: Optional[bool] = Field(True)
+
+
+class SweepVersion(BaseModel):
+    """
+    Class for defining an Exomiser version to run in a multi-version sweep.
+    Args:
+        version (str): Exomiser version
+        exomiser_software_directory (Path): Directory name for the Exomiser software directory of the version
+        score_name (str): Name of score to extract from the results of the version,
+            if different from the post_process score_name
+        application_properties (ApplicationProperties): application.properties configurations of the version,
+            if different from the application_properties, e.g., for a data release of its own
+    """
+
+    version: str = Field(...)
+    exomiser_software_directory: Path = Field(...)
+    score_name: Optional[str] = Field(None)
+    application_properties: Optional[ApplicationProperties] = Field(None)
 
 
 class ExomiserConfigurations(BaseModel):
@@ -54,15 +105,60 @@ class ExomiserConfigurations(BaseModel):
         exomiser_software_directory (Path): Directory name for Exomiser software directory
         analysis_configuration_file (Path): The file name of the analysis configuration file located in the input_dir
         max_jobs (int): Maximum number of jobs to run in a batch
+        exomiser_workers (int): Maximum number of Exomiser processes or containers running batch files at once
+        straggler_factor (float): Speculatively rerun the remaining samples of a batch on an idle worker once it
+            has run this many times longer than expected from the run's seconds per sample so far, keeping
+            whichever run finishes first. 0 disables speculation.
+        exomiser_heap (str): Maximum JVM heap of local Exomiser processes, as given to -Xmx
+        max_exomiser_heap (str): Heap up to which a local batch running out of memory is retried with double the heap,
+            before its remaining samples are split into smaller batches instead
+        oom_retries (int): Maximum number of times the remaining samples of a batch running out of memory are retried
         application_properties (ApplicationProperties): application.properties configurations
         output_formats: List(str): List of raw output formats.
+        output_policy (str): Either configured, writing the output_formats, or benchmark,
+            writing only the machine-readable format post-processing consumes
+        debug_samples (List(str)): Phenopacket file stems that keep the configured output_formats
+            under the benchmark output policy
         post_process (PostProcessing): Post-processing configurations
+        class_data_sharing (bool): Start local Exomiser runs from a JVM class data sharing archive
+        status_refresh_seconds (int): Interval for refreshing the run status line and JSON status file
+        compact_raw_results (str): Compress raw results after the run with gzip or zstd, if specified
+        phenopacket_index (Path): File name of a phenopacket metadata index in the input_dir,
+            used instead of reparsing every phenopacket when preparing batch files
+        runtime_history (Path): File name of a sample runtime history in the input_dir, recorded by every run
+            and used to batch samples longest first into batches of equal estimated runtime
+        raw_result_catalog (bool): Maintain a catalog of the raw results as they are produced, which
+            post-processing looks results up in instead of listing the raw results directory
+        preflight (bool): Check every path referenced by application.properties before running Exomiser
+        sweep (List(SweepVersion)): Exomiser versions to run on the same corpus, instead of the runner version,
+            sharing one preparation pass
+        sweep_workers (int): Maximum number of Exomiser processes running at once across the versions of a sweep,
+            each version running up to exomiser_workers of them
+        trace (bool): Record spans of each runner stage, batch, sample, extraction and write
+            to exomiser_trace.jsonl in the output directory
     """
 
     environment: str = Field(...)
     exomiser_software_directory: Path = Field(...)
     analysis_configuration_file: Union[Path | None] = Field(...)
     max_jobs: int = Field(...)
+    exomiser_workers: Optional[int] = Field(1)
+    straggler_factor: Optional[float] = Field(2.0)
+    exomiser_heap: Optional[str] = Field("4g")
+    max_exomiser_heap: Optional[str] = Field("16g")
+    oom_retries: Optional[int] = Field(2)
     application_properties: ApplicationProperties = Field(...)
     output_formats: Optional[List[str]] = Field(None)
+    output_policy: Optional[Literal["configured", "benchmark"]] = Field("configured")
+    debug_samples: Optional[List[str]] = Field(None)
     post_process: PostProcessing = Field(...)
+    class_data_sharing: Optional[bool] = Field(False)
+    status_refresh_seconds: Optional[int] = Field(30)
+    compact_raw_results: Optional[Literal["gzip", "zstd"]] = Field(None)
+    phenopacket_index: Optional[Path] = Field(None)
+    runtime_history: Optional[Path] = Field(None)
+    raw_result_catalog: Optional[bool] = Field(True)
+    preflight: Optional[bool] = Field(True)
+    sweep: Optional[List[SweepVersion]] = Field(None)
+    sweep_workers: Optional[int] = Field(1)
+    trace: Optional[bool] = Field(False)
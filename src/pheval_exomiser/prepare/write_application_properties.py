@@ -1,15 +1,41 @@
 import inspect
 from pathlib import Path
+from typing import Optional
 
 from pheval_exomiser.constants import EXOMISER_DATA_DIRECTORY_TARGET_DOCKER
 from pheval_exomiser.prepare.tool_specific_configuration_options import ExomiserConfigurations
 
 
+def application_properties_file_name(genome_assembly: Optional[str] = None) -> str:
+    """Return the application.properties file name, optionally restricted to a single genome assembly."""
+    return (
+        "application.properties"
+        if genome_assembly is None
+        else f"application-{genome_assembly}.properties"
+    )
+
+
 class ExomiserConfigurationFileWriter:
-    def __init__(self, input_dir: Path, configurations: ExomiserConfigurations):
+    def __init__(
+        self,
+        input_dir: Path,
+        configurations: ExomiserConfigurations,
+        genome_assembly: Optional[str] = None,
+        properties_dir: Optional[Path] = None,
+    ):
         self.input_dir = input_dir
         self.configurations = configurations
-        self.application_properties = open(input_dir.joinpath("application.properties"), "w")
+        self.genome_assembly = genome_assembly
+        self.application_properties = open(
+            Path(properties_dir or input_dir).joinpath(
+                application_properties_file_name(genome_assembly)
+            ),
+            "w",
+        )
+
+    def _configures_assembly(self, genome_assembly: str) -> bool:
+        """Return whether properties for the given genome assembly should be written."""
+        return self.genome_assembly is None or self.genome_assembly == genome_assembly
 
     def write_remm_version(self) -> None:
         """Write the remm version to application.properties file."""
@@ -36,6 +62,8 @@ class ExomiserConfigurationFileWriter:
 
     def write_exomiser_hg19_data_version(self) -> None:
         """Write the hg19 data version to application.properties file."""
+        if not self._configures_assembly("hg19"):
+            return
         if self.configurations.application_properties.hg19_data_version is not None:
             self.application_properties.write(
                 f"exomiser.hg19.data-version={self.configurations.application_properties.hg19_data_version}\n"
@@ -43,6 +71,8 @@ class ExomiserConfigurationFileWriter:
 
     def write_exomiser_hg19_cadd_snv_path(self) -> None:
         """Write the hg19 cadd snv path to application.properties file."""
+        if not self._configures_assembly("hg19"):
+            return
         if (
             self.configurations.application_properties.cadd_version is not None
             and self.configurations.application_properties.hg19_data_version is not None
@@ -55,6 +85,8 @@ class ExomiserConfigurationFileWriter:
 
     def write_exomiser_hg19_cadd_indel_path(self) -> None:
         """Write the hg19 cadd indel path to application.properties file."""
+        if not self._configures_assembly("hg19"):
+            return
         if (
             self.configurations.application_properties.cadd_version is not None
             and self.configurations.application_properties.hg19_data_version is not None
@@ -67,6 +99,8 @@ class ExomiserConfigurationFileWriter:
 
     def write_exomiser_hg19_remm_path(self) -> None:
         """Write the hg19 remm path to application.properties file."""
+        if not self._configures_assembly("hg19"):
+            return
         if (
             self.configurations.application_properties.remm_version is not None
             and self.configurations.application_properties.hg19_data_version is not None
@@ -78,6 +112,8 @@ class ExomiserConfigurationFileWriter:
 
     def write_exomiser_hg19_local_frequency_path(self) -> None:
         """Write the hg19 local frequency path to application.properties file."""
+        if not self._configures_assembly("hg19"):
+            return
         if self.configurations.application_properties.hg19_local_frequency_path is not None:
             self.application_properties.write(
                 f"exomiser.hg19.local-frequency-path="
@@ -87,6 +123,8 @@ class ExomiserConfigurationFileWriter:
 
     def write_exomiser_hg38_data_version(self) -> None:
         """Write the hg38 data version to application.properties file."""
+        if not self._configures_assembly("hg38"):
+            return
         if self.configurations.application_properties.hg38_data_version is not None:
             self.application_properties.write(
                 f"exomiser.hg38.data-version={self.configurations.application_properties.hg38_data_version}\n"
@@ -94,6 +132,8 @@ class ExomiserConfigurationFileWriter:
 
     def write_exomiser_hg38_cadd_snv_path(self) -> None:
         """Write the hg38 cadd snv path to application.properties file."""
+        if not self._configures_assembly("hg38"):
+            return
         if (
             self.configurations.application_properties.cadd_version is not None
             and self.configurations.application_properties.hg38_data_version is not None
@@ -106,6 +146,8 @@ class ExomiserConfigurationFileWriter:
 
     def write_exomiser_hg38_cadd_indel_path(self) -> None:
         """Write the hg38 cadd indel path to application.properties file."""
+        if not self._configures_assembly("hg38"):
+            return
         if (
             self.configurations.application_properties.cadd_version is not None
             and self.configurations.application_properties.hg38_data_version is not None
@@ -118,6 +160,8 @@ class ExomiserConfigurationFileWriter:
 
     def write_exomiser_hg38_remm_path(self) -> None:
         """Write the hg38 remm path to application.properties file."""
+        if not self._configures_assembly("hg38"):
+            return
         if (
             self.configurations.application_properties.remm_version is not None
             and self.configurations.application_properties.hg38_data_version is not None
@@ -129,6 +173,8 @@ class ExomiserConfigurationFileWriter:
 
     def write_exomiser_hg38_local_frequency_path(self) -> None:
         """Write the hg38 local frequency path to application.properties file."""
+        if not self._configures_assembly("hg38"):
+            return
         if self.configurations.application_properties.hg38_local_frequency_path is not None:
             self.application_properties.write(
                 f"exomiser.hg38.local-frequency-path="
@@ -144,6 +190,8 @@ class ExomiserConfigurationFileWriter:
 
     def write_hg19_white_list_path(self) -> None:
         """Write the hg19 whitelist path to application.properties file."""
+        if not self._configures_assembly("hg19"):
+            return
         if self.configurations.application_properties.hg19_whitelist_path is not None:
             self.application_properties.write(
                 f"exomiser.hg19.variant-white-list-path="
@@ -152,6 +200,8 @@ class ExomiserConfigurationFileWriter:
 
     def write_hg38_white_list_path(self) -> None:
         """Write the hg38 whitelist path to application.properties file."""
+        if not self._configures_assembly("hg38"):
+            return
         if self.configurations.application_properties.hg38_whitelist_path is not None:
             self.application_properties.write(
                 f"exomiser.hg38.variant-white-list-path="
@@ -177,6 +227,42 @@ class ExomiserConfigurationFileWriter:
         """Write the application.properties file."""
         methods = inspect.getmembers(self, predicate=inspect.ismethod)
         for name, method in methods:
-            if name != "write_application_properties" and name != "__init__":
+            if name.startswith("write_") and name != "write_application_properties":
                 method()
         self.application_properties.close()
+
+
+def write_assembly_application_properties(
+    input_dir: Path, configurations: ExomiserConfigurations, properties_dir: Optional[Path] = None
+) -> None:
+    """
+    Write an application.properties file for each configured genome assembly,
+    so that a batch of single-assembly samples only opens the data for that build.
+    The files are written to properties_dir, by default the input directory, where the file of an assembly
+    no longer configured is removed, so that its batches are not run with the data of an earlier configuration.
+    """
+    for genome_assembly, data_version in [
+        ("hg19", configurations.application_properties.hg19_data_version),
+        ("hg38", configurations.application_properties.hg38_data_version),
+    ]:
+        if data_version is not None:
+            ExomiserConfigurationFileWriter(
+                input_dir=input_dir,
+                configurations=configurations,
+                genome_assembly=genome_assembly,
+                properties_dir=properties_dir,
+            ).write_application_properties()
+        else:
+            Path(properties_dir or input_dir).joinpath(
+                application_properties_file_name(genome_assembly)
+            ).unlink(missing_ok=True)
+
+
+def write_all_application_properties(
+    input_dir: Path, configurations: ExomiserConfigurations, properties_dir: Optional[Path] = None
+) -> None:
+    """Write the application.properties file and those of each configured genome assembly to properties_dir."""
+    ExomiserConfigurationFileWriter(
+        input_dir=input_dir, configurations=configurations, properties_dir=properties_dir
+    ).write_application_properties()
+    write_assembly_application_properties(input_dir, configurations, properties_dir)
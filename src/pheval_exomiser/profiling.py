@@ -0,0 +1,156 @@
+import cProfile
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+PROFILE_ENVIRONMENT_VARIABLE = "PHEVAL_EXOMISER_PROFILE"
+
+PROFILE_MODES = ["timers", "cprofile"]
+
+PROFILE_SUMMARY_FILE_NAME = "profile_summary.tsv"
+
+PROFILE_DUMP_DIR_NAME = "profiles"
+
+
+@dataclass
+class StageTiming:
+    """Accumulated wall time of a profiled stage."""
+
+    calls: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.calls += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+
+class StageProfiler:
+    """
+    Time named stages and their sub-steps, a sub-step being recorded as <stage>/<sub-step>.
+    Sub-steps run in worker threads are recorded under their own name.
+    With the cprofile mode, each top-level stage of the main thread is also profiled with cProfile
+    and dumped to profiles/<stage>.prof in the output directory.
+    """
+
+    def __init__(self, mode: str, output_dir: Path):
+        self.mode = mode
+        self.output_dir = Path(output_dir)
+        self.timings: Dict[str, StageTiming] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self) -> List[str]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a stage, nested under the stage open in the current thread."""
+        stack = self._stack()
+        stage_name = "/".join(stack + [name])
+        profile = (
+            cProfile.Profile()
+            if self.mode == "cprofile"
+            and not stack
+            and threading.current_thread() is threading.main_thread()
+            else None
+        )
+        stack.append(name)
+        if profile is not None:
+            profile.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+                dump_dir = self.output_dir.joinpath(PROFILE_DUMP_DIR_NAME)
+                dump_dir.mkdir(parents=True, exist_ok=True)
+                profile.dump_stats(dump_dir.joinpath(f"{name}.prof"))
+            stack.pop()
+            with self._lock:
+                self.timings.setdefault(stage_name, StageTiming()).add(seconds)
+
+    def write_summary(self) -> Path:
+        """Write the timings of every stage, in the order they were first entered, to a TSV file."""
+        summary_path = self.output_dir.joinpath(PROFILE_SUMMARY_FILE_NAME)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            timings = list(self.timings.items())
+        with open(summary_path, "w") as summary:
+            summary.write("stage\tcalls\ttotal_seconds\tmean_seconds\tmax_seconds\n")
+            for stage_name, timing in timings:
+                summary.write(
+                    f"{stage_name}\t{timing.calls}\t{timing.total_seconds:.3f}\t"
+                    f"{timing.total_seconds / timing.calls:.3f}\t{timing.max_seconds:.3f}\n"
+                )
+        return summary_path
+
+
+_profiler: Optional[StageProfiler] = None
+
+
+def profile_mode(mode: Optional[str] = None) -> Optional[str]:
+    """
+    Return the profiling mode requested by a --profile option or, failing that,
+    the PHEVAL_EXOMISER_PROFILE environment variable (timers, cprofile, or 1 for timers).
+    """
+    mode = mode or os.environ.get(PROFILE_ENVIRONMENT_VARIABLE, "").strip().lower()
+    if not mode or mode in {"0", "false", "off"}:
+        return None
+    if mode in {"1", "true", "on"}:
+        return "timers"
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profiling mode {mode}, expected one of {PROFILE_MODES}.")
+    return mode
+
+
+def enable_profiling(mode: str, output_dir: Path) -> StageProfiler:
+    """Enable profiling, reusing the active profiler if it writes to the same output directory."""
+    global _profiler
+    if _profiler is None or _profiler.output_dir != Path(output_dir) or _profiler.mode != mode:
+        _profiler = StageProfiler(mode, output_dir)
+    return _profiler
+
+
+def disable_profiling() -> None:
+    """Disable profiling; profile_stage becomes a no-op."""
+    global _profiler
+    _profiler = None
+
+
+@contextmanager
+def profile_stage(name: str) -> Iterator[None]:
+    """Time a stage or sub-step if profiling is enabled."""
+    if _profiler is None:
+        yield
+    else:
+        with _profiler.stage(name):
+            yield
+
+
+@contextmanager
+def profile_command(name: str, output_dir: Path, mode: Optional[str] = None) -> Iterator[None]:
+    """
+    Profile a runner stage or command as a top-level stage if profiling is requested,
+    writing the summary table to the output directory when it finishes.
+    Runner stages writing to the same output directory share one summary table.
+    """
+    mode = profile_mode(mode)
+    if mode is None:
+        yield
+        return
+    profiler = enable_profiling(mode, output_dir)
+    try:
+        with profiler.stage(name):
+            yield
+    finally:
+        print(f"...writing profile summary to {profiler.write_summary()}...")
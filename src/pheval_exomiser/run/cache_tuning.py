@@ -0,0 +1,395 @@
+import os
+import re
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import List, Optional
+
+import click
+import polars as pl
+from pheval.config_parser import parse_input_dir_config
+from pheval.utils.logger import get_logger
+
+from pheval_exomiser.prepare.tool_specific_configuration_options import ExomiserConfigurations
+from pheval_exomiser.prepare.write_application_properties import application_properties_file_name
+from pheval_exomiser.run.exomiser_command import DEFAULT_HEAP, create_local_exomiser_command
+from pheval_exomiser.run.run import find_exomiser_jar, local_jvm_options
+
+CACHE_TUNING_RESULTS_FILE_NAME = "cache_tuning_results.tsv"
+
+logger = get_logger()
+
+
+@dataclass
+class CacheTrial:
+    """Throughput and peak memory of running a sample subset with one cache setting."""
+
+    cache_type: str
+    maximum_size: Optional[int]
+    samples: int
+    wall_seconds: float
+    samples_per_minute: float
+    peak_rss_mb: Optional[float]
+    exit_code: int
+
+
+def cache_settings(cache_types: List[str], maximum_sizes: List[int]) -> List[tuple]:
+    """Return the (cache type, maximumSize) settings to trial; maximumSize only applies to caffeine."""
+    return [
+        (cache_type, maximum_size)
+        for cache_type in cache_types
+        for maximum_size in (maximum_sizes if cache_type == "caffeine" else [None])
+    ]
+
+
+def select_sample_commands(batch_file: Path, sample_size: int) -> List[str]:
+    """Return up to sample_size commands spread evenly through a batch file."""
+    with open(batch_file) as batch:
+        commands = [line for line in batch if line.strip()]
+    if len(commands) <= sample_size:
+        return commands
+    step = len(commands) / sample_size
+    return [commands[int(i * step)] for i in range(sample_size)]
+
+
+def write_trial_batch_file(commands: List[str], trial_dir: Path) -> Path:
+    """Write the sample commands to a batch file, with their results redirected to the trial directory."""
+    trial_batch_file = trial_dir.joinpath("cache-tuning-batch.txt")
+    with open(trial_batch_file, "w") as batch:
+        for command in commands:
+            arguments = command.split()
+            if "--output-directory" in arguments:
+                arguments[arguments.index("--output-directory") + 1] = str(trial_dir)
+            batch.write(" ".join(arguments) + "\n")
+    return trial_batch_file
+
+
+def write_trial_application_properties(
+    application_properties: Path, trial_dir: Path, cache_type: str, maximum_size: Optional[int]
+) -> Path:
+    """Write a copy of application.properties with the cache settings of a trial."""
+    trial_application_properties = trial_dir.joinpath(application_properties_file_name())
+    with open(application_properties) as properties:
+        lines = [line for line in properties if not line.startswith("spring.cache.")]
+    lines.append(f"spring.cache.type={cache_type}\n")
+    if maximum_size is not None:
+        lines.append(f"spring.cache.caffeine.spec=maximumSize={maximum_size}\n")
+    trial_application_properties.write_text("".join(lines))
+    return trial_application_properties
+
+
+def peak_rss_mb(ru_maxrss: int) -> float:
+    """Return a process's peak RSS in MB from its ru_maxrss, which is in bytes on macOS and in KB elsewhere."""
+    return ru_maxrss / 1024**2 if sys.platform == "darwin" else ru_maxrss / 1024
+
+
+def wait_for_trial(process: subprocess.Popen) -> Optional[float]:
+    """
+    Wait for a trial's JVM to exit, returning its peak RSS in MB,
+    or None where os.wait4 is not available to read it (e.g., on Windows).
+    """
+    if not hasattr(os, "wait4"):
+        process.wait()
+        return None
+    _, status, rusage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return peak_rss_mb(rusage.ru_maxrss)
+
+
+def run_cache_trial(
+    exomiser_version: str,
+    exomiser_jar_file_path: Path,
+    application_properties: Path,
+    commands: List[str],
+    trial_dir: Path,
+    cache_type: str,
+    maximum_size: Optional[int],
+    jvm_options: Optional[List[str]] = None,
+    heap: Optional[str] = DEFAULT_HEAP,
+) -> CacheTrial:
+    """
+    Run the sample commands with a cache setting, measuring wall time and, where possible, the JVM's peak RSS.
+    The JVM is started as a real run's is, with the same extra JVM options and heap.
+    """
+    trial_dir.mkdir(parents=True, exist_ok=True)
+    batch_file = write_trial_batch_file(commands, trial_dir)
+    trial_application_properties = write_trial_application_properties(
+        application_properties, trial_dir, cache_type, maximum_size
+    )
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        create_local_exomiser_command(
+            exomiser_version,
+            exomiser_jar_file_path,
+            batch_file,
+            trial_application_properties,
+            jvm_options,
+            heap,
+        ),
+        shell=False,
+        cwd=trial_dir,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    trial_peak_rss_mb = wait_for_trial(process)
+    wall_seconds = time.perf_counter() - start
+    return CacheTrial(
+        cache_type=cache_type,
+        maximum_size=maximum_size,
+        samples=len(commands),
+        wall_seconds=wall_seconds,
+        samples_per_minute=len(commands) / (wall_seconds / 60) if wall_seconds else 0.0,
+        peak_rss_mb=trial_peak_rss_mb,
+        exit_code=process.returncode,
+    )
+
+
+def recommend_cache_setting(
+    trials: List[CacheTrial], workers: int, memory_budget_mb: float
+) -> Optional[CacheTrial]:
+    """
+    Return the successful trial with the highest throughput whose peak memory, multiplied by the
+    number of concurrent workers, fits the memory budget. If no trial fits, the successful trial
+    with the lowest peak memory is returned. A trial whose peak memory could not be measured is
+    assumed to fit.
+    """
+    successful_trials = [trial for trial in trials if trial.exit_code == 0]
+    if not successful_trials:
+        return None
+    fitting_trials = [
+        trial
+        for trial in successful_trials
+        if trial.peak_rss_mb is None or trial.peak_rss_mb * workers <= memory_budget_mb
+    ]
+    if not fitting_trials:
+        logger.warning(
+            "No cache setting fits %d workers in %.0f MB, recommending the smallest.",
+            workers,
+            memory_budget_mb,
+        )
+        return min(successful_trials, key=lambda trial: trial.peak_rss_mb)
+    return max(
+        fitting_trials, key=lambda trial: (trial.samples_per_minute, -(trial.peak_rss_mb or 0.0))
+    )
+
+
+def apply_cache_setting(config_file: Path, trial: CacheTrial) -> None:
+    """Write a cache setting into the application_properties of a config.yaml, keeping its comments."""
+    config = config_file.read_text()
+    config = re.sub(
+        r"^(\s*cache_type:)[^\n#]*", rf"\g<1> {trial.cache_type}", config, flags=re.MULTILINE
+    )
+    config = re.sub(
+        r"^(\s*cache_caffeine_spec:)[^\n#]*",
+        rf"\g<1> {'' if trial.maximum_size is None else trial.maximum_size}",
+        config,
+        flags=re.MULTILINE,
+    )
+    config_file.write_text(config)
+
+
+def total_memory_mb() -> Optional[float]:
+    """Return the physical memory of this machine in MB, or None where os.sysconf cannot read it (e.g., on Windows)."""
+    if not hasattr(os, "sysconf"):
+        return None
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 1024**2
+
+
+def tune_cache(
+    input_dir: Path,
+    batch_file: Path,
+    output_dir: Path,
+    cache_types: List[str],
+    maximum_sizes: List[int],
+    sample_size: int,
+    workers: Optional[int],
+    memory_budget_mb: float,
+    warm_up: bool = True,
+    heap: Optional[str] = None,
+) -> Optional[CacheTrial]:
+    """
+    Run a sample subset of a batch file under each cache setting, record the trials to a TSV file in the
+    output directory, and return the recommended setting.
+    Trials run with the heap and JVM options of a real run, and are recommended for as many workers as
+    a real run uses; workers and heap default to the exomiser_workers and exomiser_heap of the config.yaml.
+    With warm_up, the subset is first run once with the first setting and discarded, so that the first
+    trial does not pay alone for reading the Exomiser data into the page cache.
+    """
+    input_dir_config = parse_input_dir_config(input_dir)
+    config = ExomiserConfigurations.parse_obj(input_dir_config.tool_specific_configuration_options)
+    exomiser_jar_file_path = Path(input_dir).joinpath(
+        find_exomiser_jar(Path(input_dir), config.exomiser_software_directory)
+    )
+    jvm_options = local_jvm_options(
+        input_dir, config, input_dir_config.tool_version, exomiser_jar_file_path
+    )
+    heap = heap or config.exomiser_heap or DEFAULT_HEAP
+    commands = select_sample_commands(batch_file, sample_size)
+    settings = cache_settings(cache_types, maximum_sizes)
+    if warm_up and settings:
+        print("...running warm-up trial...")
+        run_cache_trial(
+            input_dir_config.tool_version,
+            exomiser_jar_file_path,
+            input_dir.joinpath(application_properties_file_name()),
+            commands,
+            output_dir.joinpath("warm-up"),
+            *settings[0],
+            jvm_options,
+            heap,
+        )
+    trials = []
+    for cache_type, maximum_size in settings:
+        print(f"...running cache trial {cache_type} {maximum_size or ''}...")
+        trials.append(
+            run_cache_trial(
+                input_dir_config.tool_version,
+                exomiser_jar_file_path,
+                input_dir.joinpath(application_properties_file_name()),
+                commands,
+                output_dir.joinpath(f"{cache_type}-{maximum_size or 0}"),
+                cache_type,
+                maximum_size,
+                jvm_options,
+                heap,
+            )
+        )
+    pl.DataFrame([asdict(trial) for trial in trials]).write_csv(
+        output_dir.joinpath(CACHE_TUNING_RESULTS_FILE_NAME), separator="\t"
+    )
+    return recommend_cache_setting(
+        trials, workers or config.exomiser_workers or 1, memory_budget_mb
+    )
+
+
+@click.command()
+@click.option(
+    "--input-dir",
+    "-i",
+    required=True,
+    metavar="DIRECTORY",
+    help="PhEval input directory, with the config.yaml, application.properties and Exomiser software.",
+    type=Path,
+)
+@click.option(
+    "--batch-file",
+    "-b",
+    required=True,
+    metavar="FILE",
+    help="Prepared Exomiser batch file to draw the sample subset from.",
+    type=Path,
+)
+@click.option(
+    "--output-dir",
+    "-o",
+    required=True,
+    metavar="DIRECTORY",
+    help="Directory to write trial results to.",
+    type=Path,
+)
+@click.option(
+    "--cache-type",
+    "-c",
+    "cache_types",
+    multiple=True,
+    type=click.Choice(["none", "simple", "caffeine"]),
+    default=["none", "caffeine"],
+    show_default=True,
+    help="Cache types to trial.",
+)
+@click.option(
+    "--maximum-size",
+    "-m",
+    "maximum_sizes",
+    multiple=True,
+    type=int,
+    default=[10000, 60000, 200000],
+    show_default=True,
+    help="Caffeine maximumSize values to trial.",
+)
+@click.option(
+    "--sample-size",
+    "-n",
+    type=int,
+    default=20,
+    show_default=True,
+    help="Number of samples, spread through the batch file, to run in each trial.",
+)
+@click.option(
+    "--workers",
+    "-w",
+    type=int,
+    default=None,
+    help="Number of Exomiser processes that will run concurrently [default: exomiser_workers of the config.yaml].",
+)
+@click.option(
+    "--heap",
+    type=str,
+    default=None,
+    help="Maximum heap of each trial's JVM, e.g., 8g [default: exomiser_heap of the config.yaml].",
+)
+@click.option(
+    "--memory-budget",
+    type=float,
+    default=None,
+    help="Memory budget in MB for all workers [default: physical memory].",
+)
+@click.option(
+    "--warm-up/--no-warm-up",
+    default=True,
+    show_default=True,
+    help="Run the sample subset once, discarded, before the trials, so every trial runs on a warm page cache.",
+)
+@click.option(
+    "--apply/--no-apply",
+    default=False,
+    help="Write the recommended setting into the input directory config.yaml.",
+)
+def tune_exomiser_cache(
+    input_dir: Path,
+    batch_file: Path,
+    output_dir: Path,
+    cache_types: List[str],
+    maximum_sizes: List[int],
+    sample_size: int,
+    workers: Optional[int],
+    heap: Optional[str],
+    memory_budget: Optional[float],
+    warm_up: bool,
+    apply: bool,
+):
+    """Trial Exomiser cache settings on a sample subset and recommend the best one."""
+    memory_budget_mb = memory_budget or total_memory_mb()
+    if memory_budget_mb is None:
+        raise click.UsageError(
+            "Physical memory cannot be read on this platform, set --memory-budget."
+        )
+    output_dir.mkdir(parents=True, exist_ok=True)
+    recommended_trial = tune_cache(
+        input_dir=input_dir,
+        batch_file=batch_file,
+        output_dir=output_dir,
+        cache_types=list(cache_types),
+        maximum_sizes=list(maximum_sizes),
+        sample_size=sample_size,
+        workers=workers,
+        memory_budget_mb=memory_budget_mb,
+        warm_up=warm_up,
+        heap=heap,
+    )
+    if recommended_trial is None:
+        raise click.ClickException("Every cache trial failed, see the trial directories.")
+    print(
+        f"Recommended cache_type: {recommended_trial.cache_type}, "
+        f"cache_caffeine_spec: {recommended_trial.maximum_size or ''} "
+        f"({recommended_trial.samples_per_minute:.1f} samples/min, "
+        + (
+            "unknown peak RSS)"
+            if recommended_trial.peak_rss_mb is None
+            else f"{recommended_trial.peak_rss_mb:.0f} MB peak RSS)"
+        )
+    )
+    if apply:
+        apply_cache_setting(input_dir.joinpath("config.yaml"), recommended_trial)
@@ -0,0 +1,120 @@
+import json
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from pheval_exomiser.prepare.create_batch_commands import (
+    CommandsWriter,
+    ExomiserCommandLineArguments,
+)
+from pheval_exomiser.run.exomiser_command import create_local_exomiser_command
+
+CLASS_DATA_SHARING_TRAINING_SAMPLE = Path(__file__).parent.joinpath(
+    "resources", "class_data_sharing_training_sample.json"
+)
+
+
+def class_data_sharing_archive_path(exomiser_jar_file_path: Path) -> Path:
+    """Return the AppCDS archive path for an Exomiser jar, named after the jar (and so its version)."""
+    return Path(exomiser_jar_file_path).with_suffix(".jsa")
+
+
+def jvm_supports_dynamic_archive() -> bool:
+    """Return whether the java on the PATH supports dynamic AppCDS archives (JDK 13+)."""
+    try:
+        jvm_flags = subprocess.run(
+            ["java", "-XX:+PrintFlagsFinal", "-version"],
+            capture_output=True,
+            text=True,
+            shell=False,
+        )
+    except OSError:
+        return False
+    return jvm_flags.returncode == 0 and "ArchiveClassesAtExit" in jvm_flags.stdout
+
+
+def class_data_sharing_jvm_options(archive: Optional[Path]) -> List[str]:
+    """
+    Return the JVM options to start Exomiser from an AppCDS archive.
+    -Xshare:auto lets the JVM silently fall back to normal class loading if the archive is unusable.
+    """
+    return [] if archive is None else [f"-XX:SharedArchiveFile={archive}", "-Xshare:auto"]
+
+
+def write_training_batch_file(training_dir: Path, exomiser_version: str) -> Path:
+    """Write a single phenotype-only command for the bundled training sample to a batch file."""
+    training_batch_file = training_dir.joinpath("class-data-sharing-training-batch.txt")
+    commands_writer = CommandsWriter(training_batch_file, False, exomiser_version)
+    commands_writer.write_local_commands(
+        ExomiserCommandLineArguments(
+            sample=CLASS_DATA_SHARING_TRAINING_SAMPLE,
+            raw_results_dir=training_dir,
+            output_formats=["JSON"],
+        )
+    )
+    commands_writer.close()
+    return training_batch_file
+
+
+def _timed_run(command: List) -> float:
+    """Run a command and return its wall time in seconds."""
+    start = time.perf_counter()
+    subprocess.run(command, shell=False, capture_output=True)
+    return time.perf_counter() - start
+
+
+def create_class_data_sharing_archive(
+    exomiser_version: str,
+    exomiser_jar_file_path: Path,
+    application_properties: Path,
+) -> Optional[Path]:
+    """
+    Create an AppCDS archive for the Exomiser jar, once per jar, from a training run on a bundled sample.
+    The training run is timed without the archive, while dumping it and with it, and the timings are
+    recorded alongside the archive.
+    Returns None, so Exomiser is started without an archive, if the JVM does not support dynamic archives
+    or the archive could not be created.
+    """
+    archive = class_data_sharing_archive_path(exomiser_jar_file_path)
+    if archive.exists():
+        return archive
+    if not jvm_supports_dynamic_archive():
+        print("...JVM does not support class data sharing archives, running without...")
+        return None
+    print("...creating class data sharing archive...")
+    with tempfile.TemporaryDirectory() as training_dir:
+        training_batch_file = write_training_batch_file(Path(training_dir), exomiser_version)
+
+        def training_command(jvm_options: List[str]) -> List:
+            return create_local_exomiser_command(
+                exomiser_version,
+                exomiser_jar_file_path,
+                training_batch_file,
+                application_properties,
+                jvm_options,
+            )
+
+        baseline_seconds = _timed_run(training_command([]))
+        dump_seconds = _timed_run(training_command([f"-XX:ArchiveClassesAtExit={archive}"]))
+        if not archive.exists():
+            print("...failed to create class data sharing archive, running without...")
+            return None
+        archived_seconds = _timed_run(training_command(class_data_sharing_jvm_options(archive)))
+    with open(archive.with_suffix(".jsa.json"), "w") as timings:
+        json.dump(
+            {
+                "exomiser_jar": str(exomiser_jar_file_path),
+                "baseline_seconds": baseline_seconds,
+                "dump_seconds": dump_seconds,
+                "archived_seconds": archived_seconds,
+            },
+            timings,
+            indent=2,
+        )
+    print(
+        f"...training run took {baseline_seconds:.1f}s without and "
+        f"{archived_seconds:.1f}s with the class data sharing archive..."
+    )
+    return archive
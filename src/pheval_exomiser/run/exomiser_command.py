@@ -0,0 +1,42 @@
+from pathlib import Path
+from typing import List, Optional
+
+from packaging import version
+
+DEFAULT_HEAP = "4g"
+
+
+def create_local_exomiser_command(
+    exomiser_version: str,
+    exomiser_jar_file_path: Path,
+    batch_file: Path,
+    application_properties: Path,
+    jvm_options: Optional[List[str]] = None,
+    heap: Optional[str] = DEFAULT_HEAP,
+) -> List[str]:
+    """
+    Create the java command to run an Exomiser batch file locally, with DEFAULT_HEAP if no heap is given,
+    exiting as soon as the JVM runs out of memory rather than carrying on in a broken state.
+    """
+    jvm_options = [f"-Xmx{heap or DEFAULT_HEAP}", "-XX:+ExitOnOutOfMemoryError"] + (
+        jvm_options or []
+    )
+    if version.parse(exomiser_version) < version.parse("15.0.0"):
+        return [
+            "java",
+            *jvm_options,
+            "-jar",
+            exomiser_jar_file_path,
+            "--batch",
+            batch_file,
+            f"--spring.config.location={application_properties}",
+        ]
+    return [
+        "java",
+        *jvm_options,
+        f"-Dspring.config.location={str(application_properties)}",
+        "-jar",
+        exomiser_jar_file_path,
+        "batch",
+        batch_file,
+    ]
@@ -0,0 +1,360 @@
+"""
+A stand-in for the Exomiser jar, for benchmarking the runner without Exomiser or its data.
+It is invoked with the arguments run_exomiser_local passes to java, runs every command of the batch file
+according to a cost model, and writes synthetic raw results in the requested output formats.
+"""
+
+import json
+import os
+import random
+import sys
+import time
+import zlib
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import polars as pl
+
+from pheval_exomiser.run.oom_recovery import OUT_OF_MEMORY_PATTERN, heap_megabytes
+
+FAKE_EXOMISER_COST_MODEL_VARIABLE = "PHEVAL_EXOMISER_FAKE_COST_MODEL"
+
+FAKE_EXOMISER_MODULE = "pheval_exomiser.run.fake_exomiser"
+
+CHROMOSOMES = [str(chromosome) for chromosome in range(1, 23)] + ["X"]
+
+BASES = ["A", "C", "G", "T"]
+
+
+@dataclass
+class CostModel:
+    """
+    Time taken and results written by the stand-in.
+    Each batch pays startup_seconds once, as a JVM loading the Exomiser data does,
+    and each sample pays sample_seconds plus seconds_per_vcf_mb for every MB of its VCF,
+    varied by up to +/- jitter (a fraction of the cost), deterministically per sample and seed.
+    A fraction straggler_rate of batch runs, as on a degraded node, are straggler_slowdown times slower,
+    drawn per batch file name and directory so that a rerun of a batch's samples from another directory
+    is drawn anew. Each sample run in a batch retains heap_mb_per_sample MB, and a batch runs out of memory,
+    exiting as Exomiser does with -XX:+ExitOnOutOfMemoryError, once that exceeds its -Xmx heap.
+    """
+
+    startup_seconds: float = 1.0
+    sample_seconds: float = 0.1
+    seconds_per_vcf_mb: float = 0.0
+    jitter: float = 0.0
+    genes: int = 50
+    variants_per_gene: int = 2
+    seed: int = 0
+    straggler_rate: float = 0.0
+    straggler_slowdown: float = 10.0
+    heap_mb_per_sample: float = 0.0
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_environment(cls) -> "CostModel":
+        """Return the cost model in the PHEVAL_EXOMISER_FAKE_COST_MODEL variable, or the default one."""
+        cost_model = os.environ.get(FAKE_EXOMISER_COST_MODEL_VARIABLE)
+        return cls(**json.loads(cost_model)) if cost_model else cls()
+
+    def sample_cost(self, sample_name: str, vcf_bytes: int) -> float:
+        """Return the seconds spent analysing a sample."""
+        seconds = self.sample_seconds + self.seconds_per_vcf_mb * vcf_bytes / 1024**2
+        return max(
+            0.0, seconds * (1 + self.jitter * sample_random(sample_name, self.seed).uniform(-1, 1))
+        )
+
+    def batch_slowdown(self, batch_file: Path) -> float:
+        """Return how many times slower than the cost model a run of a batch file is."""
+        batch_run = f"{batch_file.absolute().parent.name}/{batch_file.name}"
+        straggler = sample_random(batch_run, self.seed).random() < self.straggler_rate
+        return self.straggler_slowdown if straggler else 1.0
+
+
+def sample_random(sample_name: str, seed: int) -> random.Random:
+    """Return a random generator seeded by a sample, so a sample always gets the same results."""
+    return random.Random(zlib.crc32(sample_name.encode()) ^ seed)
+
+
+def parse_java_arguments(arguments: List[str]) -> Tuple[Path, bool]:
+    """
+    Return the batch file of an Exomiser java command, and whether it uses the command line of
+    Exomiser < 15.0.0 (--batch FILE) rather than the batch subcommand. JVM options are ignored.
+    """
+    if "--batch" in arguments:
+        return Path(arguments[arguments.index("--batch") + 1]), True
+    if "batch" in arguments:
+        return Path(arguments[arguments.index("batch") + 1]), False
+    raise ValueError(f"No batch file in Exomiser arguments: {' '.join(arguments)}")
+
+
+def java_heap_megabytes(arguments: List[str]) -> Optional[float]:
+    """Return the maximum heap in MB set by the -Xmx option of a java command, if any."""
+    heaps = [argument.removeprefix("-Xmx") for argument in arguments if argument.startswith("-Xmx")]
+    return heap_megabytes(heaps[-1]) if heaps else None
+
+
+def parse_batch_command(command: str) -> Dict[str, str]:
+    """Return the options of a batch file command, by option name without the leading dashes."""
+    arguments = command.split()
+    return {
+        argument[2:]: arguments[index + 1]
+        for index, argument in enumerate(arguments[:-1])
+        if argument.startswith("--")
+    }
+
+
+def causative_genes(sample: Path) -> List[Dict]:
+    """
+    Return the interpreted genes of a phenopacket (or of the proband of a family), with the VCF record
+    of their variant if there is one, so the synthetic results contain the diagnosed genes.
+    """
+    with open(sample) as phenopacket_file:
+        phenopacket = json.load(phenopacket_file)
+    phenopacket = phenopacket.get("proband", phenopacket)
+    genes = []
+    for interpretation in phenopacket.get("interpretations", []):
+        for genomic_interpretation in interpretation.get("diagnosis", {}).get(
+            "genomicInterpretations", []
+        ):
+            variation_descriptor = genomic_interpretation.get("variantInterpretation", {}).get(
+                "variationDescriptor", {}
+            )
+            gene = genomic_interpretation.get("gene") or variation_descriptor.get("geneContext")
+            if gene:
+                genes.append(
+                    {
+                        "symbol": gene.get("symbol", ""),
+                        "identifier": gene.get("valueId", ""),
+                        "vcf_record": variation_descriptor.get("vcfRecord"),
+                    }
+                )
+    return genes
+
+
+def synthetic_variants(gene: Dict, rng: random.Random, cost_model: CostModel) -> List[Dict]:
+    """Return the contributing variants of a gene: its diagnosed variant, or random ones."""
+    vcf_record = gene["vcf_record"]
+    if vcf_record:
+        variants = [
+            {
+                "contigName": str(vcf_record.get("chrom", "1")).removeprefix("chr"),
+                "start": int(vcf_record.get("pos", 1)),
+                "ref": vcf_record.get("ref", "A"),
+                "alt": vcf_record.get("alt", "T"),
+            }
+        ]
+    else:
+        variants = [
+            {
+                "contigName": rng.choice(CHROMOSOMES),
+                "start": rng.randint(1, 100_000_000),
+                "ref": rng.choice(BASES),
+                "alt": rng.choice(BASES),
+            }
+            for _ in range(cost_model.variants_per_gene)
+        ]
+    for variant in variants:
+        variant["end"] = variant["start"] + len(variant["ref"]) - 1
+    return variants
+
+
+def synthetic_genes(sample: Path, variant_analysis: bool, cost_model: CostModel) -> List[Dict]:
+    """
+    Return the ranked gene results of a sample: cost_model.genes synthetic genes with decreasing scores,
+    with the diagnosed genes of the phenopacket placed at random ranks, each with its contributing variants.
+    """
+    rng = sample_random(sample.stem, cost_model.seed)
+    genes = [
+        {"symbol": f"FAKE{index}", "identifier": f"ENSG{index:011d}", "vcf_record": None}
+        for index in range(1, cost_model.genes + 1)
+    ]
+    for gene in causative_genes(sample) if sample.exists() else []:
+        genes.insert(rng.randint(0, len(genes)), gene)
+    scores = sorted((rng.random() for _ in genes), reverse=True)
+    for gene, score in zip(genes, scores):
+        gene["combined_score"] = score
+        gene["priority_score"] = min(1.0, score + rng.random() * 0.1)
+        gene["variant_score"] = rng.random() if variant_analysis else 0.0
+        gene["p_value"] = 1.0 - score
+        gene["recessive"] = rng.random() < 0.3
+        gene["diseases"] = [
+            {"diseaseId": f"OMIM:{rng.randint(100000, 999999)}", "score": rng.random() * score}
+            for _ in range(rng.randint(0, 2))
+        ]
+        gene["variants"] = synthetic_variants(gene, rng, cost_model) if variant_analysis else []
+    return genes
+
+
+def write_parquet_result(genes: List[Dict], variant_analysis: bool, output_path: Path) -> None:
+    """Write genes as an Exomiser ≥ 15.0.0 Parquet result, one row per variant, or per gene without variants."""
+    rows = [
+        {
+            "rank": rank,
+            "contigName": variant.get("contigName"),
+            "start": variant.get("start"),
+            "end": variant.get("end"),
+            "ref": variant.get("ref"),
+            "alt": variant.get("alt"),
+            "geneSymbol": gene["symbol"],
+            "ensemblGeneId": gene["identifier"],
+            "moi": "AR" if gene["recessive"] else "AD",
+            "pValue": gene["p_value"],
+            "geneCombinedScore": gene["combined_score"],
+            "genePhenotypeScore": gene["priority_score"],
+            "geneVariantScore": gene["variant_score"],
+            "variantScore": gene["variant_score"],
+            "isContributingVariant": variant_analysis,
+            "diseaseMatches": gene["diseases"],
+        }
+        for rank, gene in enumerate(genes, start=1)
+        for variant in gene["variants"] or [{}]
+    ]
+    pl.DataFrame(
+        rows,
+        schema={
+            "rank": pl.Int32,
+            "contigName": pl.String,
+            "start": pl.Int32,
+            "end": pl.Int32,
+            "ref": pl.String,
+            "alt": pl.String,
+            "geneSymbol": pl.String,
+            "ensemblGeneId": pl.String,
+            "moi": pl.String,
+            "pValue": pl.Float64,
+            "geneCombinedScore": pl.Float64,
+            "genePhenotypeScore": pl.Float64,
+            "geneVariantScore": pl.Float64,
+            "variantScore": pl.Float64,
+            "isContributingVariant": pl.Boolean,
+            "diseaseMatches": pl.List(pl.Struct({"diseaseId": pl.String, "score": pl.Float64})),
+        },
+    ).write_parquet(output_path)
+
+
+def write_json_result(genes: List[Dict], output_path: Path) -> None:
+    """Write genes as an Exomiser < 15.0.0 JSON result, one object per gene."""
+    with open(output_path, "w") as json_result:
+        json.dump(
+            [
+                {
+                    "geneSymbol": gene["symbol"],
+                    "geneIdentifier": {"geneId": gene["identifier"], "geneSymbol": gene["symbol"]},
+                    "combinedScore": gene["combined_score"],
+                    "priorityScore": gene["priority_score"],
+                    "variantScore": gene["variant_score"],
+                    "pValue": gene["p_value"],
+                    "priorityResults": {
+                        "HIPHIVE_PRIORITY": {
+                            "diseaseMatches": [
+                                {
+                                    "model": {"diseaseId": disease["diseaseId"]},
+                                    "score": disease["score"],
+                                }
+                                for disease in gene["diseases"]
+                            ]
+                        }
+                    },
+                    "geneScores": [
+                        {
+                            "modeOfInheritance": (
+                                "AUTOSOMAL_RECESSIVE" if gene["recessive"] else "AUTOSOMAL_DOMINANT"
+                            ),
+                            "combinedScore": gene["combined_score"],
+                            "contributingVariants": gene["variants"],
+                        }
+                    ],
+                }
+                for gene in genes
+            ],
+            json_result,
+        )
+
+
+def run_command(
+    command: str, legacy_command_line: bool, cost_model: CostModel, slowdown: float = 1.0
+) -> None:
+    """Run a single batch file command: wait for the cost of its sample, times slowdown, and write its results."""
+    options = parse_batch_command(command)
+    sample = Path(options["sample"])
+    vcf = Path(options["vcf"]) if "vcf" in options else None
+    vcf_bytes = vcf.stat().st_size if vcf is not None and vcf.exists() else 0
+    time.sleep(cost_model.sample_cost(sample.stem, vcf_bytes) * slowdown)
+    output_dir = Path(options.get("output-directory", "results"))
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_formats = options.get("output-format", "JSON" if legacy_command_line else "PARQUET")
+    genes = synthetic_genes(sample, vcf is not None, cost_model)
+    output_filename = options.get("output-filename", f"{sample.stem}-exomiser")
+    for output_format in output_formats.split(","):
+        if output_format == "PARQUET":
+            write_parquet_result(
+                genes, vcf is not None, output_dir.joinpath(f"{output_filename}.parquet")
+            )
+        elif output_format == "JSON":
+            write_json_result(genes, output_dir.joinpath(f"{output_filename}.json"))
+
+
+class SimulatedOutOfMemoryError(Exception):
+    """The stand-in running out of its heap."""
+
+
+def run_batch(
+    batch_file: Path,
+    legacy_command_line: bool,
+    cost_model: CostModel,
+    heap_mb: Optional[float] = None,
+) -> None:
+    """
+    Run every command of a batch file, after the startup cost of the batch,
+    raising SimulatedOutOfMemoryError once the heap the samples retain exceeds heap_mb.
+    """
+    slowdown = cost_model.batch_slowdown(batch_file)
+    time.sleep(cost_model.startup_seconds)
+    with open(batch_file) as batch:
+        commands = [command for command in batch if command.strip()]
+    for samples_run, command in enumerate(commands, start=1):
+        if heap_mb is not None and samples_run * cost_model.heap_mb_per_sample > heap_mb:
+            raise SimulatedOutOfMemoryError(f"Java heap space ({heap_mb:.0f} MB)")
+        run_command(command, legacy_command_line, cost_model, slowdown)
+
+
+def write_java_shim(bin_dir: Path, cost_model: CostModel) -> Path:
+    """
+    Write a `java` executable to bin_dir that runs the stand-in with a cost model,
+    so that with bin_dir first on the PATH, run_exomiser_local runs the stand-in instead of Exomiser.
+    The executable is a shell script, so this is POSIX-only: on Windows, CreateProcess only finds `java.exe`.
+    """
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    java = bin_dir.joinpath("java")
+    java.write_text(
+        "#!/bin/sh\n"
+        f"export PYTHONPATH='{Path(__file__).parents[2]}'${{PYTHONPATH:+:$PYTHONPATH}}\n"
+        f"export {FAKE_EXOMISER_COST_MODEL_VARIABLE}='{cost_model.to_json()}'\n"
+        f"exec '{sys.executable}' -m {FAKE_EXOMISER_MODULE} \"$@\"\n"
+    )
+    java.chmod(0o755)
+    return java
+
+
+def main(arguments: Optional[List[str]] = None) -> int:
+    arguments = sys.argv[1:] if arguments is None else arguments
+    batch_file, legacy_command_line = parse_java_arguments(arguments)
+    try:
+        run_batch(
+            batch_file,
+            legacy_command_line,
+            CostModel.from_environment(),
+            java_heap_megabytes(arguments),
+        )
+    except SimulatedOutOfMemoryError as error:
+        print(f'Exception in thread "main" {OUT_OF_MEMORY_PATTERN}: {error}', file=sys.stderr)
+        return 3
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,327 @@
+import json
+import os
+import statistics
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from pheval_exomiser.post_process.raw_result_catalog import (
+    COMPLETE,
+    MISSING,
+    RawResultCatalog,
+    catalog_raw_result,
+    file_system_time,
+)
+from pheval_exomiser.prepare.create_batch_commands import batch_file_output_filenames
+
+RUN_STATUS_FILE_NAME = "exomiser_run_status.json"
+
+
+@dataclass
+class BatchProgress:
+    """Track the progress of a single batch file, run by one worker, or more while it is speculatively rerun."""
+
+    batch_file: Path
+    output_filenames: List[str]
+    completed: int = 0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    speculated: bool = False
+    escalations: List[Dict] = field(default_factory=list)
+
+    @property
+    def state(self) -> str:
+        if self.finished_at is not None:
+            return "finished"
+        return "pending" if self.started_at is None else "running"
+
+    def busy_seconds(self, now: float) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or now) - self.started_at
+
+    def sample_runtimes(self, raw_results_dir: Path, result_suffix: str) -> Dict[str, float]:
+        """
+        Return the runtime of each sample of the batch, by sample name, as the time between its result
+        and the previous result of the batch. The first result is skipped, as its time includes starting the JVM.
+        """
+        finished_at = []
+        for output_filename in self.output_filenames:
+            try:
+                modified_at = (
+                    raw_results_dir.joinpath(f"{output_filename}{result_suffix}").stat().st_mtime
+                )
+            except OSError:
+                continue
+            if self.started_at is None or modified_at >= self.started_at:
+                finished_at.append((modified_at, output_filename))
+        finished_at.sort()
+        return {
+            output_filename.removesuffix("-exomiser"): modified_at - previous_modified_at
+            for (previous_modified_at, _), (modified_at, output_filename) in zip(
+                finished_at, finished_at[1:]
+            )
+        }
+
+
+@dataclass
+class RunStatus:
+    """Snapshot of the progress of an Exomiser run."""
+
+    started_at: str
+    updated_at: str
+    elapsed_seconds: float
+    total_samples: int
+    completed_samples: int
+    samples_per_minute: float
+    eta_seconds: Optional[float]
+    workers: int
+    busy_workers: int
+    utilisation: float
+    batches: List[Dict] = field(default_factory=list)
+
+    def status_line(self) -> str:
+        """Return a compact, single-line summary of the run status."""
+        eta = (
+            "unknown"
+            if self.eta_seconds is None
+            else time.strftime("%H:%M:%S", time.gmtime(self.eta_seconds))
+        )
+        return (
+            f"[exomiser] {self.completed_samples}/{self.total_samples} samples | "
+            f"{self.samples_per_minute:.1f} samples/min | ETA {eta} | "
+            f"{self.busy_workers}/{self.workers} workers busy"
+        )
+
+
+class RunMonitor:
+    """
+    Monitor the throughput of running Exomiser batches.
+    Samples are counted as completed once their machine-readable `-exomiser` output appears in the
+    raw results directory. The status is printed as a single line and written to a JSON status file
+    every refresh interval.
+    Results are looked up by name, only for the samples of running batches not yet known to be complete,
+    rather than by listing the raw results directory, and are recorded to the raw result catalog if given.
+    Only results written since the run started count, as a reused raw results directory can hold
+    the results of an earlier run, and the catalog is only trusted while it is current.
+    Utilisation is the fraction of the run's worker time spent running Exomiser, from the workers
+    the batch runner reports as started and released.
+    """
+
+    def __init__(
+        self,
+        batch_files: List[Path],
+        raw_results_dir: Path,
+        result_suffix: str,
+        status_file: Path,
+        refresh_seconds: int = 30,
+        record_runtimes: Optional[Callable[[Dict[str, float]], None]] = None,
+        catalog: Optional[RawResultCatalog] = None,
+        workers: int = 1,
+    ):
+        self.raw_results_dir = raw_results_dir
+        self.result_suffix = result_suffix
+        self.status_file = status_file
+        self.refresh_seconds = refresh_seconds
+        self.record_runtimes = record_runtimes
+        self.catalog = catalog
+        self.results = catalog.entries() if catalog is not None and catalog.is_current() else {}
+        self._results_lock = threading.Lock()
+        self.batches = {
+            batch_file: BatchProgress(batch_file, batch_file_output_filenames(batch_file))
+            for batch_file in batch_files
+        }
+        self.workers = workers
+        self.busy_workers = 0
+        self._busy_worker_seconds = 0.0
+        self._workers_lock = threading.Lock()
+        self.started_at = time.time()
+        self._workers_changed_at = self.started_at
+        # results are compared by the file system clock they are stamped by
+        self.results_since = file_system_time(raw_results_dir)
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._refresh_periodically, daemon=True)
+
+    def batch_started(self, batch_file: Path) -> None:
+        """Record that a worker has started running a batch file."""
+        self.batches[batch_file].started_at = time.time()
+
+    def batch_finished(self, batch_file: Path) -> None:
+        """Record that a worker has finished running a batch file, and the runtimes of its samples."""
+        batch = self.batches[batch_file]
+        batch.finished_at = time.time()
+        self._check_results([batch], finished=True)
+        if self.record_runtimes is not None:
+            self.record_runtimes(batch.sample_runtimes(self.raw_results_dir, self.result_suffix))
+
+    def worker_started(self) -> None:
+        """Record that a worker has started running a batch file, or a rerun of some of its samples."""
+        self._change_busy_workers(1)
+
+    def worker_released(self) -> None:
+        """Record that a worker has finished running a batch file, or a rerun of some of its samples."""
+        self._change_busy_workers(-1)
+
+    def _change_busy_workers(self, change: int) -> None:
+        with self._workers_lock:
+            now = time.time()
+            self._busy_worker_seconds += self.busy_workers * (now - self._workers_changed_at)
+            self._workers_changed_at = now
+            self.busy_workers += change
+
+    def busy_worker_seconds(self, now: float) -> float:
+        """Return the worker seconds spent running Exomiser so far."""
+        with self._workers_lock:
+            return self._busy_worker_seconds + self.busy_workers * max(
+                now - self._workers_changed_at, 0.0
+            )
+
+    def batch_speculated(self, batch_file: Path) -> None:
+        """Record that the remaining samples of a straggling batch file are being speculatively rerun."""
+        self.batches[batch_file].speculated = True
+
+    def batch_escalated(self, batch_file: Path, escalation: Dict) -> None:
+        """Record that the remaining samples of a batch file that ran out of memory have been queued again."""
+        self.batches[batch_file].escalations.append(escalation)
+
+    def seconds_per_sample(self) -> Optional[float]:
+        """
+        Return the median worker seconds per sample of the batches finished so far, or None if none has finished.
+        The median is not thrown by the stragglers it is used to detect.
+        """
+        now = time.time()
+        finished = [
+            batch.busy_seconds(now) / len(batch.output_filenames)
+            for batch in self.batches.values()
+            if batch.finished_at is not None and batch.output_filenames
+        ]
+        return statistics.median(finished) if finished else None
+
+    def remaining_output_filenames(self, batch_file: Path) -> List[str]:
+        """Return the output file names of the samples of a batch file without a result yet."""
+        self._check_results([self.batches[batch_file]])
+        completed_output_filenames = self._completed_output_filenames()
+        return [
+            output_filename
+            for output_filename in self.batches[batch_file].output_filenames
+            if output_filename not in completed_output_filenames
+        ]
+
+    def _check_results(self, batches: Iterable[BatchProgress], finished: bool = False) -> None:
+        """
+        Stat the results of the samples of batches not yet known to be complete, recording those that have
+        changed to the catalog. The results of finished batches are all checked again, as a speculative run
+        may have replaced them, and their missing results are recorded too.
+        Results of an earlier run are checked again until they are rewritten.
+        """
+        with self._results_lock:
+            changed_entries = []
+            for batch in batches:
+                for output_filename in batch.output_filenames:
+                    raw_result = f"{output_filename}{self.result_suffix}"
+                    known_entry = self.results.get(raw_result)
+                    if (
+                        not finished
+                        and known_entry is not None
+                        and known_entry.state == COMPLETE
+                        and known_entry.mtime >= self.results_since
+                    ):
+                        continue
+                    entry = catalog_raw_result(
+                        self.raw_results_dir, raw_result, known_entry=known_entry
+                    )
+                    if entry == known_entry or (entry.state == MISSING and not finished):
+                        continue
+                    self.results[raw_result] = entry
+                    changed_entries.append(entry)
+            if self.catalog is not None:
+                self.catalog.record(changed_entries)
+
+    def _completed_output_filenames(self) -> set[str]:
+        """Return the output file names of all results written since the run started found so far."""
+        return {
+            raw_result[: -len(self.result_suffix)]
+            for raw_result, entry in self.results.items()
+            if raw_result.endswith(self.result_suffix)
+            and entry.state != MISSING
+            and entry.mtime >= self.results_since
+        }
+
+    def status(self) -> RunStatus:
+        """Compute the current run status."""
+        now = time.time()
+        self._check_results(batch for batch in self.batches.values() if batch.state == "running")
+        completed_output_filenames = self._completed_output_filenames()
+        for batch in self.batches.values():
+            batch.completed = sum(
+                1 for filename in batch.output_filenames if filename in completed_output_filenames
+            )
+        total_samples = sum(len(batch.output_filenames) for batch in self.batches.values())
+        completed_samples = sum(batch.completed for batch in self.batches.values())
+        elapsed_seconds = now - self.started_at
+        samples_per_minute = completed_samples / (elapsed_seconds / 60) if elapsed_seconds else 0.0
+        return RunStatus(
+            started_at=datetime.fromtimestamp(self.started_at, timezone.utc).isoformat(),
+            updated_at=datetime.fromtimestamp(now, timezone.utc).isoformat(),
+            elapsed_seconds=elapsed_seconds,
+            total_samples=total_samples,
+            completed_samples=completed_samples,
+            samples_per_minute=samples_per_minute,
+            eta_seconds=(
+                (total_samples - completed_samples) / samples_per_minute * 60
+                if samples_per_minute
+                else None
+            ),
+            workers=self.workers,
+            busy_workers=self.busy_workers,
+            utilisation=(
+                self.busy_worker_seconds(now) / (self.workers * elapsed_seconds)
+                if elapsed_seconds
+                else 0.0
+            ),
+            batches=[
+                {
+                    "batch_file": str(batch.batch_file),
+                    "state": batch.state,
+                    "completed": batch.completed,
+                    "total": len(batch.output_filenames),
+                    "speculated": batch.speculated,
+                    "escalations": batch.escalations,
+                    "busy_seconds": batch.busy_seconds(now),
+                }
+                for batch in self.batches.values()
+            ],
+        )
+
+    def refresh(self) -> RunStatus:
+        """Print the status line and atomically rewrite the JSON status file."""
+        run_status = self.status()
+        print(run_status.status_line())
+        tmp_status_file = self.status_file.with_suffix(".json.tmp")
+        with open(tmp_status_file, "w") as status_file:
+            json.dump(run_status.__dict__, status_file, indent=2)
+        os.replace(tmp_status_file, self.status_file)
+        return run_status
+
+    def _refresh_periodically(self) -> None:
+        while not self._stop_event.wait(self.refresh_seconds):
+            self.refresh()
+
+    def __enter__(self) -> "RunMonitor":
+        if self.refresh_seconds:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop_event.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self._check_results(
+            (batch for batch in self.batches.values() if batch.finished_at is None), finished=True
+        )
+        if self.catalog is not None:
+            self.catalog.mark_current()
+        self.refresh()
@@ -0,0 +1,74 @@
+import re
+from pathlib import Path
+from typing import List, Optional
+
+OUT_OF_MEMORY_PATTERN = "java.lang.OutOfMemoryError"
+
+# 3: the JVM exiting on -XX:+ExitOnOutOfMemoryError; 137 and -9: killed by the kernel OOM killer
+OUT_OF_MEMORY_EXIT_CODES = {3, 137, -9}
+
+RETRY_DIRECTORY_NAME = ".retries"
+
+_HEAP_SIZE = re.compile(r"^(\d+)([kmgt]?)$", re.IGNORECASE)
+
+_HEAP_UNIT_MEGABYTES = {"k": 1 / 1024, "m": 1, "g": 1024, "t": 1024**2}
+
+
+def heap_megabytes(heap: str) -> float:
+    """Return the size in MB of a JVM heap size, as given to -Xmx (e.g., 4g or 512m)."""
+    match = _HEAP_SIZE.match(heap.strip())
+    if match is None:
+        raise ValueError(f"Invalid JVM heap size: {heap}")
+    size, unit = match.groups()
+    return int(size) * _HEAP_UNIT_MEGABYTES[unit.lower()] if unit else int(size) / 1024**2
+
+
+def format_heap(megabytes: float) -> str:
+    """Return a heap size in MB as a JVM heap size, in whole GB where possible."""
+    return f"{int(megabytes // 1024)}g" if megabytes % 1024 == 0 else f"{int(megabytes)}m"
+
+
+def escalate_heap(heap: Optional[str], max_heap: Optional[str]) -> Optional[str]:
+    """Return double the heap, capped at max_heap, or None if the heap cannot be escalated any further."""
+    if heap is None or max_heap is None or heap_megabytes(heap) >= heap_megabytes(max_heap):
+        return None
+    return format_heap(min(heap_megabytes(heap) * 2, heap_megabytes(max_heap)))
+
+
+def is_out_of_memory(exit_code: Optional[int], logged_out_of_memory: bool) -> bool:
+    """Return whether a batch run died of running out of memory, from its exit code and log."""
+    return logged_out_of_memory or exit_code in OUT_OF_MEMORY_EXIT_CODES
+
+
+def retry_output_filename_groups(output_filenames: List[str], split: bool) -> List[List[str]]:
+    """Return the samples to retry as one batch, or split into two smaller batches."""
+    if not split or len(output_filenames) < 2:
+        return [output_filenames]
+    half = (len(output_filenames) + 1) // 2
+    return [output_filenames[:half], output_filenames[half:]]
+
+
+def write_retry_batch_files(
+    batch_file: Path, output_filename_groups: List[List[str]], retry_prefix: Path
+) -> List[Path]:
+    """
+    Write the commands of a batch file for each group of output file names to a retry batch file
+    named {retry_prefix}-{part}.txt, returning the retry batch files.
+    The commands are unchanged, so their results go to the raw results directory.
+    """
+    commands = {}
+    with open(batch_file) as batch:
+        for line in batch:
+            arguments = line.split()
+            if "--output-filename" in arguments:
+                commands[arguments[arguments.index("--output-filename") + 1]] = line
+    retry_prefix.parent.mkdir(parents=True, exist_ok=True)
+    retry_batch_files = []
+    for part, output_filenames in enumerate(output_filename_groups, start=1):
+        retry_batch_file = retry_prefix.with_name(f"{retry_prefix.name}-{part}.txt")
+        with open(retry_batch_file, "w") as retry_batch:
+            retry_batch.writelines(
+                commands[output_filename] for output_filename in output_filenames
+            )
+        retry_batch_files.append(retry_batch_file)
+    return retry_batch_files
@@ -1,7 +1,10 @@
 import os
 import subprocess
+import threading
 from dataclasses import dataclass
+from functools import partial
 from pathlib import Path
+from typing import Callable, List, Optional, Tuple
 
 import docker
 from packaging import version
@@ -16,8 +19,66 @@ from pheval_exomiser.constants import (
     RAW_RESULTS_TARGET_DIRECTORY_DOCKER,
     VCF_TARGET_DIRECTORY_DOCKER,
 )
-from pheval_exomiser.prepare.create_batch_commands import create_batch_file
+from pheval_exomiser.post_process.raw_result_catalog import RawResultCatalog
+from pheval_exomiser.prepare.create_batch_commands import (
+    batch_file_assembly,
+    batch_file_output_filenames,
+    batch_file_sort_key,
+    create_batch_file,
+)
+from pheval_exomiser.prepare.runtime_history import analysis_key, record_runtimes
 from pheval_exomiser.prepare.tool_specific_configuration_options import ExomiserConfigurations
+from pheval_exomiser.prepare.write_application_properties import application_properties_file_name
+from pheval_exomiser.run.class_data_sharing import (
+    class_data_sharing_jvm_options,
+    create_class_data_sharing_archive,
+)
+from pheval_exomiser.run.exomiser_command import DEFAULT_HEAP, create_local_exomiser_command
+from pheval_exomiser.run.monitor import RUN_STATUS_FILE_NAME, RunMonitor
+from pheval_exomiser.run.oom_recovery import OUT_OF_MEMORY_PATTERN
+from pheval_exomiser.run.speculation import SpeculativeBatchRunner
+from pheval_exomiser.tracing import Span
+
+
+def required_output_format(exomiser_version: str) -> str:
+    """Return the raw output format post-processing consumes for an Exomiser version."""
+    return "PARQUET" if version.parse(exomiser_version) >= version.parse("15.0.0") else "JSON"
+
+
+def batch_output_formats(
+    config: ExomiserConfigurations, exomiser_version: str
+) -> Tuple[List[str], List[str]]:
+    """
+    Return the raw output formats to write for an Exomiser version under the configured output policy,
+    and the configured output formats written for debug samples.
+    """
+    required_format = required_output_format(exomiser_version)
+    configured_output_formats = list(config.output_formats or [])
+    if required_format not in configured_output_formats:
+        configured_output_formats.append(required_format)
+    output_formats = (
+        [required_format] if config.output_policy == "benchmark" else configured_output_formats
+    )
+    return output_formats, configured_output_formats
+
+
+def phenopacket_index_path(input_dir: Path, config: ExomiserConfigurations) -> Optional[Path]:
+    """Return the path of the configured phenopacket metadata index, if any."""
+    return input_dir.joinpath(config.phenopacket_index) if config.phenopacket_index else None
+
+
+def runtime_history_path(input_dir: Path, config: ExomiserConfigurations) -> Optional[Path]:
+    """Return the path of the configured sample runtime history, if any."""
+    return input_dir.joinpath(config.runtime_history) if config.runtime_history else None
+
+
+def analysis_configuration_path(input_dir: Path, config: ExomiserConfigurations) -> Optional[Path]:
+    """Return the path of the configured analysis YAML, or None for a phenotype-only preset."""
+    return (
+        input_dir.joinpath(config.analysis_configuration_file)
+        if config.analysis_configuration_file
+        else None
+    )
 
 
 def prepare_batch_files(
@@ -32,19 +93,10 @@ def prepare_batch_files(
     """Prepare the exomiser batch files"""
     print("...preparing batch files...")
     vcf_dir_name = Path(testdata_dir).joinpath("vcf")
-    if version.parse(exomiser_version) >= version.parse("15.0.0"):
-        if "PARQUET" not in config.output_formats:
-            config.output_formats.append("PARQUET")
-    elif version.parse(exomiser_version) < version.parse("15.0.0"):
-        if "JSON" not in config.output_formats:
-            config.output_formats.append("JSON")
+    output_formats, configured_output_formats = batch_output_formats(config, exomiser_version)
     create_batch_file(
         environment=config.environment,
-        analysis=(
-            input_dir.joinpath(config.analysis_configuration_file)
-            if config.analysis_configuration_file
-            else None
-        ),
+        analysis=analysis_configuration_path(input_dir, config),
         phenopacket_dir=Path(testdata_dir).joinpath("phenopackets"),
         vcf_dir=vcf_dir_name if variant_analysis else None,
         output_dir=tool_input_commands_dir,
@@ -54,8 +106,12 @@ def prepare_batch_files(
         output_options_dir=None,
         results_dir=raw_results_dir,
         variant_analysis=variant_analysis,
-        output_formats=config.output_formats,
+        output_formats=output_formats,
         exomiser_version=exomiser_version,
+        debug_samples=config.debug_samples,
+        debug_output_formats=configured_output_formats,
+        phenopacket_index=phenopacket_index_path(input_dir, config),
+        runtime_history=runtime_history_path(input_dir, config),
     )
 
 
@@ -105,110 +161,349 @@ def mount_docker(
     )
 
 
-def run_exomiser_local(
-    input_dir: Path,
-    testdata_dir: Path,
+def raw_result_suffix(exomiser_version: str) -> str:
+    """Return the suffix of the machine-readable raw result post-processing consumes."""
+    return f".{required_output_format(exomiser_version).lower()}"
+
+
+def create_run_monitor(
+    batch_files: List[Path],
     config: ExomiserConfigurations,
     output_dir: Path,
-    tool_input_commands_dir: Path,
+    raw_results_dir: Path,
     exomiser_version: str,
-) -> None:
-    """Run Exomiser locally."""
-    print("...running exomiser...")
-    os.chdir(output_dir)
-    batch_files = [
-        file
-        for file in all_files(tool_input_commands_dir)
-        if file.name.startswith(Path(testdata_dir).name)
-    ]
+    input_dir: Optional[Path] = None,
+) -> RunMonitor:
+    """
+    Create a monitor writing the run status next to the raw results, recording the sample runtimes
+    of each finished batch to the configured runtime history, and maintaining the raw result catalog.
+    Exomiser < 13.1.0 writes its results elsewhere, which are only moved to the raw results directory
+    after the run, so these are not catalogued. A catalog left by an earlier run is removed when the run
+    does not maintain it, so its results are not left out of post-processing.
+    """
+    history_path = runtime_history_path(input_dir, config) if input_dir else None
+    maintain_catalog = config.raw_result_catalog and version.parse(
+        exomiser_version
+    ) >= version.parse("13.1.0")
+    if not maintain_catalog:
+        RawResultCatalog(raw_results_dir).remove()
+    return RunMonitor(
+        batch_files=batch_files,
+        raw_results_dir=raw_results_dir,
+        result_suffix=raw_result_suffix(exomiser_version),
+        status_file=Path(output_dir).joinpath(RUN_STATUS_FILE_NAME),
+        refresh_seconds=config.status_refresh_seconds,
+        workers=config.exomiser_workers,
+        record_runtimes=(
+            partial(
+                record_runtimes,
+                history_path,
+                exomiser_version,
+                analysis_key(analysis_configuration_path(input_dir, config)),
+            )
+            if history_path
+            else None
+        ),
+        catalog=RawResultCatalog(raw_results_dir) if maintain_catalog else None,
+    )
+
+
+def application_properties_for_batch(input_dir: Path, batch_file: Path) -> str:
+    """
+    Return the application.properties file name to run a batch with -
+    the assembly-specific file if the batch holds a single genome assembly and one has been written.
+    """
+    genome_assembly = batch_file_assembly(batch_file)
+    if (
+        genome_assembly is not None
+        and input_dir.joinpath(application_properties_file_name(genome_assembly)).exists()
+    ):
+        return application_properties_file_name(genome_assembly)
+    return application_properties_file_name()
+
+
+def batch_span_attributes(batch_file: Path, exomiser_version: str) -> dict:
+    """Return the attributes of a batch file recorded on its trace span."""
+    return {
+        "batch_file": batch_file.name,
+        "assembly": batch_file_assembly(batch_file),
+        "samples": len(batch_file_output_filenames(batch_file)),
+        "exomiser_version": exomiser_version,
+    }
+
+
+def find_exomiser_jar(input_dir: Path, exomiser_software_directory: Path) -> Path:
+    """Return the path of the Exomiser jar in an Exomiser software directory of the input directory."""
     exomiser_jar_file = [
         filename
-        for filename in all_files(input_dir.joinpath(config.exomiser_software_directory))
+        for filename in all_files(input_dir.joinpath(exomiser_software_directory))
         if filename.name.endswith(".jar")
     ][0]
-    exomiser_jar_file_path = config.exomiser_software_directory.joinpath(exomiser_jar_file)
-    for file in batch_files:
-        if version.parse(exomiser_version) < version.parse("15.0.0"):
-            subprocess.run(
-                [
-                    "java",
-                    "-Xmx4g",
-                    "-jar",
-                    exomiser_jar_file_path,
-                    "--batch",
-                    file,
-                    f"--spring.config.location={Path(input_dir).joinpath('application.properties')}",
-                ],
-                shell=False,
+    return exomiser_software_directory.joinpath(exomiser_jar_file)
+
+
+def local_jvm_options(
+    input_dir: Path,
+    config: ExomiserConfigurations,
+    exomiser_version: str,
+    exomiser_jar_file_path: Path,
+    properties_dir: Optional[Path] = None,
+) -> List[str]:
+    """
+    Return the extra JVM options to run an Exomiser jar locally with,
+    with the application.properties of properties_dir, by default the input directory.
+    """
+    return (
+        class_data_sharing_jvm_options(
+            create_class_data_sharing_archive(
+                exomiser_version,
+                exomiser_jar_file_path,
+                Path(properties_dir or input_dir).joinpath(application_properties_file_name()),
             )
-        elif version.parse(exomiser_version) >= version.parse("15.0.0"):
-            subprocess.run(
-                [
-                    "java",
-                    "-Xmx4g",
-                    f"-Dspring.config.location={str(Path(input_dir).joinpath('application.properties'))}",
-                    "-jar",
-                    exomiser_jar_file_path,
-                    "batch",
-                    file,
-                ],
-                shell=False,
+        )
+        if config.class_data_sharing
+        else []
+    )
+
+
+class LocalBatchProcess:
+    """
+    A local Exomiser JVM running a batch, printing its output while it is waited on.
+    release is called once it has been waited on, e.g., to free a worker slot shared with other runs.
+    """
+
+    def __init__(self, process: subprocess.Popen, release: Optional[Callable[[], None]] = None):
+        self.process = process
+        self.out_of_memory = False
+        self.release = release
+
+    def wait(self) -> int:
+        try:
+            for line in self.process.stdout:
+                print(line, end="")
+                self.out_of_memory = self.out_of_memory or OUT_OF_MEMORY_PATTERN in line
+            return self.process.wait()
+        finally:
+            if self.release is not None:
+                self.release()
+
+    def kill(self) -> None:
+        self.process.kill()
+
+
+def input_batch_files(tool_input_commands_dir: Path, testdata_dir: Path) -> List[Path]:
+    """Return the batch files of a corpus, longest estimated runtime first."""
+    return sorted(
+        (
+            file
+            for file in all_files(tool_input_commands_dir)
+            if file.name.startswith(Path(testdata_dir).name)
+        ),
+        key=batch_file_sort_key,
+    )
+
+
+def run_local_batch_files(
+    batch_files: List[Path],
+    input_dir: Path,
+    config: ExomiserConfigurations,
+    output_dir: Path,
+    raw_results_dir: Path,
+    exomiser_version: str,
+    properties_dir: Optional[Path] = None,
+    worker_slots: Optional[threading.Semaphore] = None,
+) -> None:
+    """
+    Run batch files locally with an Exomiser version, on up to config.exomiser_workers workers, speculatively
+    rerunning the remaining samples of straggling batches on idle workers and retrying the remaining samples
+    of a batch running out of memory with a larger heap or in smaller batches.
+    Exomiser is run in output_dir, with the application.properties of properties_dir, by default the input
+    directory. With worker_slots, each JVM also holds a slot while it runs, capping the JVMs of concurrent runs.
+    """
+    exomiser_jar_file_path = Path(input_dir).joinpath(
+        find_exomiser_jar(Path(input_dir), config.exomiser_software_directory)
+    )
+    properties_dir = Path(properties_dir or input_dir)
+    jvm_options = local_jvm_options(
+        input_dir, config, exomiser_version, exomiser_jar_file_path, properties_dir
+    )
+    with create_run_monitor(
+        batch_files, config, output_dir, raw_results_dir, exomiser_version, Path(input_dir)
+    ) as run_monitor:
+
+        def launch(file: Path, span: Span, heap: Optional[str]) -> LocalBatchProcess:
+            if worker_slots is not None:
+                worker_slots.acquire()
+            try:
+                process = subprocess.Popen(
+                    create_local_exomiser_command(
+                        exomiser_version,
+                        exomiser_jar_file_path,
+                        file,
+                        properties_dir.joinpath(
+                            application_properties_for_batch(properties_dir, file)
+                        ),
+                        jvm_options,
+                        heap,
+                    ),
+                    shell=False,
+                    cwd=output_dir,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    text=True,
+                    errors="replace",
+                )
+            except Exception:
+                if worker_slots is not None:
+                    worker_slots.release()
+                raise
+            return LocalBatchProcess(
+                process, worker_slots.release if worker_slots is not None else None
             )
+
+        SpeculativeBatchRunner(
+            batch_files=batch_files,
+            launch=launch,
+            span_attributes=partial(batch_span_attributes, exomiser_version=exomiser_version),
+            span_name="exomiser_jvm",
+            workers=config.exomiser_workers,
+            run_monitor=run_monitor,
+            straggler_factor=config.straggler_factor,
+            heap=config.exomiser_heap or DEFAULT_HEAP,
+            max_heap=config.max_exomiser_heap,
+            oom_retries=config.oom_retries,
+        ).run()
     if version.parse(exomiser_version) < version.parse("13.1.0"):
-        os.rename(
-            f"{output_dir}/results",
-            output_dir.joinpath("raw_results"),
-        )
+        os.rename(Path(output_dir).joinpath("results"), raw_results_dir)
 
 
-def create_docker_run_command(batch_file: Path) -> [str]:
+def run_exomiser_local(
+    input_dir: Path,
+    testdata_dir: Path,
+    config: ExomiserConfigurations,
+    output_dir: Path,
+    tool_input_commands_dir: Path,
+    raw_results_dir: Path,
+    exomiser_version: str,
+) -> None:
+    """
+    Run Exomiser locally, running up to config.exomiser_workers batch files at once
+    and speculatively rerunning the remaining samples of straggling batches on idle workers.
+    The remaining samples of a batch running out of memory are retried with a larger heap or in smaller batches.
+    """
+    print("...running exomiser...")
+    run_local_batch_files(
+        input_batch_files(tool_input_commands_dir, testdata_dir),
+        input_dir,
+        config,
+        output_dir,
+        raw_results_dir,
+        exomiser_version,
+    )
+
+
+def create_docker_run_command(
+    batch_file: Path,
+    application_properties: str = application_properties_file_name(),
+    batch_file_directory: str = INPUT_COMMANDS_TARGET_DIRECTORY_DOCKER,
+) -> [str]:
     """Creates docker run command."""
     return [
         "--batch",
-        f"{INPUT_COMMANDS_TARGET_DIRECTORY_DOCKER}" + batch_file.name,
-        f"--spring.config.location={EXOMISER_CONFIG_TARGET_DIRECTORY_DOCKER}application.properties",
+        f"{batch_file_directory}" + batch_file.name,
+        f"--spring.config.location={EXOMISER_CONFIG_TARGET_DIRECTORY_DOCKER}{application_properties}",
     ]
 
 
+def docker_batch_file_directory(batch_file: Path, raw_results_dir: Path) -> str:
+    """
+    Return the directory a batch file is mounted at in the container:
+    speculative and retry batch files are kept in the raw results directory.
+    """
+    if batch_file.is_relative_to(raw_results_dir):
+        return f"{RAW_RESULTS_TARGET_DIRECTORY_DOCKER}{batch_file.parent.relative_to(raw_results_dir)}/"
+    return INPUT_COMMANDS_TARGET_DIRECTORY_DOCKER
+
+
+class DockerBatchProcess:
+    """A docker container running an Exomiser batch, printing its logs while it is waited on."""
+
+    def __init__(self, container):
+        self.container = container
+        self.out_of_memory = False
+
+    def wait(self) -> int:
+        for line in self.container.logs(stream=True):
+            print(line.strip())
+            self.out_of_memory = self.out_of_memory or OUT_OF_MEMORY_PATTERN.encode() in line
+        return self.container.wait()["StatusCode"]
+
+    def kill(self) -> None:
+        try:
+            self.container.kill()
+        except docker.errors.APIError:
+            pass
+
+
 def run_exomiser_docker(
     input_dir: Path,
     testdata_dir: Path,
+    config: ExomiserConfigurations,
+    output_dir: Path,
     tool_input_commands_dir: Path,
     raw_results_dir: Path,
     exomiser_version: str,
     variant_analysis: bool,
 ):
-    """Run Exomiser with docker."""
+    """
+    Run Exomiser with docker, running up to config.exomiser_workers containers at once
+    and speculatively rerunning the remaining samples of straggling batches on idle workers.
+    The remaining samples of a batch running out of memory are retried in smaller batches.
+    """
     print("...running exomiser...")
     client = docker.from_env()
-    batch_files = [
-        file
-        for file in all_files(tool_input_commands_dir)
-        if file.name.startswith(Path(testdata_dir).name)
+    batch_files = input_batch_files(tool_input_commands_dir, testdata_dir)
+    docker_mounts = mount_docker(
+        input_dir, testdata_dir, tool_input_commands_dir, raw_results_dir, variant_analysis
+    )
+    vol = [
+        docker_mounts.vcf_test_data,
+        docker_mounts.phenopacket_test_data,
+        docker_mounts.exomiser_data_dir,
+        docker_mounts.exomiser_yaml,
+        docker_mounts.tool_input_commands_path,
+        docker_mounts.exomiser_application_properties,
+        docker_mounts.raw_results_dir,
     ]
-    for file in batch_files:
-        docker_command = create_docker_run_command(file)
-        docker_mounts = mount_docker(
-            input_dir, testdata_dir, tool_input_commands_dir, raw_results_dir, variant_analysis
-        )
-        vol = [
-            docker_mounts.vcf_test_data,
-            docker_mounts.phenopacket_test_data,
-            docker_mounts.exomiser_data_dir,
-            docker_mounts.exomiser_yaml,
-            docker_mounts.tool_input_commands_path,
-            docker_mounts.exomiser_application_properties,
-            docker_mounts.raw_results_dir,
-        ]
-        container = client.containers.run(
-            f"exomiser/exomiser-cli:{exomiser_version}",
-            " ".join(docker_command),
-            volumes=[x for x in vol if x is not None],
-            detach=True,
-        )
-        for line in container.logs(stream=True):
-            print(line.strip())
-        break
+    with create_run_monitor(
+        batch_files, config, output_dir, raw_results_dir, exomiser_version, Path(input_dir)
+    ) as run_monitor:
+
+        def launch(file: Path, span: Span, heap: Optional[str]) -> DockerBatchProcess:
+            docker_command = create_docker_run_command(
+                file,
+                application_properties_for_batch(Path(input_dir), file),
+                docker_batch_file_directory(file, raw_results_dir),
+            )
+            container = client.containers.run(
+                f"exomiser/exomiser-cli:{exomiser_version}",
+                " ".join(docker_command),
+                volumes=[x for x in vol if x is not None],
+                detach=True,
+            )
+            span.set_attribute("container_id", container.id)
+            return DockerBatchProcess(container)
+
+        SpeculativeBatchRunner(
+            batch_files=batch_files,
+            launch=launch,
+            span_attributes=partial(batch_span_attributes, exomiser_version=exomiser_version),
+            span_name="exomiser_docker",
+            workers=config.exomiser_workers,
+            run_monitor=run_monitor,
+            straggler_factor=config.straggler_factor,
+            oom_retries=config.oom_retries,
+        ).run()
 
 
 def run_exomiser(
@@ -224,12 +519,20 @@ def run_exomiser(
     """Run Exomiser with specified environment."""
     (
         run_exomiser_local(
-            input_dir, testdata_dir, config, output_dir, tool_input_commands_dir, exomiser_version
+            input_dir,
+            testdata_dir,
+            config,
+            output_dir,
+            tool_input_commands_dir,
+            raw_results_dir,
+            exomiser_version,
         )
         if config.environment == "local"
         else run_exomiser_docker(
             input_dir,
             testdata_dir,
+            config,
+            output_dir,
             tool_input_commands_dir,
             raw_results_dir,
             exomiser_version,
@@ -0,0 +1,427 @@
+import json
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+import click
+import polars as pl
+from pheval.utils.file_utils import all_files
+
+from pheval_exomiser.post_process.post_process_results_format import (
+    create_standardised_results,
+    use_parquet_results,
+)
+from pheval_exomiser.prepare.tool_specific_configuration_options import ExomiserConfigurations
+from pheval_exomiser.prepare.write_application_properties import application_properties_file_name
+from pheval_exomiser.run.fake_exomiser import CostModel, write_java_shim
+from pheval_exomiser.run.monitor import RUN_STATUS_FILE_NAME
+from pheval_exomiser.run.run import prepare_batch_files, run_exomiser_local
+
+RUNNER_BENCHMARK_RESULTS_FILE_NAME = "runner_benchmark_results.tsv"
+
+RUNNER_BENCHMARK_RUNTIME_HISTORY_FILE_NAME = "exomiser_runtime_history.sqlite"
+
+FAKE_EXOMISER_SOFTWARE_DIRECTORY = "exomiser-cli-fake"
+
+
+@dataclass
+class RunnerBenchmark:
+    """
+    Wall time of running and post-processing a corpus with the Exomiser stand-in and a number of workers.
+    The tail is the run time beyond the batch time evenly spread over the workers,
+    i.e., the time spent waiting on the last batches with workers idle.
+    """
+
+    workers: int
+    batches: int
+    samples: int
+    run_seconds: float
+    post_process_seconds: float
+    tail_seconds: float = 0.0
+    speedup: float = 1.0
+    efficiency: float = 1.0
+
+
+def benchmark_configurations(
+    exomiser_version: str,
+    max_jobs: int,
+    workers: int,
+    runtime_history: Optional[Path] = None,
+    straggler_factor: float = 2.0,
+) -> ExomiserConfigurations:
+    """
+    Return the runner configuration of a benchmark run, with everything needing Exomiser data disabled.
+    An absolute runtime_history path is shared by every benchmark run.
+    """
+    return ExomiserConfigurations.parse_obj(
+        {
+            "environment": "local",
+            "exomiser_software_directory": FAKE_EXOMISER_SOFTWARE_DIRECTORY,
+            "analysis_configuration_file": None,
+            "max_jobs": max_jobs,
+            "exomiser_workers": workers,
+            "straggler_factor": straggler_factor,
+            "application_properties": {},
+            "output_policy": "benchmark",
+            "status_refresh_seconds": 0,
+            "preflight": False,
+            "runtime_history": runtime_history,
+            "post_process": {
+                "score_name": (
+                    "geneCombinedScore"
+                    if use_parquet_results(exomiser_version)
+                    else "combinedScore"
+                ),
+                "sort_order": "descending",
+            },
+        }
+    )
+
+
+def write_fake_input_dir(input_dir: Path) -> None:
+    """Write an input directory holding an empty stand-in Exomiser jar and application.properties."""
+    software_dir = input_dir.joinpath(FAKE_EXOMISER_SOFTWARE_DIRECTORY)
+    software_dir.mkdir(parents=True, exist_ok=True)
+    software_dir.joinpath(f"{FAKE_EXOMISER_SOFTWARE_DIRECTORY}.jar").touch()
+    input_dir.joinpath(application_properties_file_name()).touch()
+
+
+@contextmanager
+def fake_exomiser_on_path(bin_dir: Path, cost_model: CostModel) -> Iterator[None]:
+    """
+    Put a java executable running the Exomiser stand-in first on the PATH, restoring the PATH after.
+    The stand-in is a shell script, which Windows cannot run in place of java.exe.
+    """
+    if os.name != "posix":
+        raise click.UsageError("The Exomiser runner benchmark can only be run on POSIX systems.")
+    write_java_shim(bin_dir, cost_model)
+    path = os.environ.get("PATH", "")
+    os.environ["PATH"] = f"{bin_dir}{os.pathsep}{path}"
+    try:
+        yield
+    finally:
+        os.environ["PATH"] = path
+
+
+def run_tail_seconds(status_file: Path) -> float:
+    """
+    Return the tail of a finished run from its status file: its elapsed time beyond the busy worker time
+    per worker.
+    """
+    with open(status_file) as status:
+        run_status = json.load(status)
+    return max(run_status["elapsed_seconds"] * (1 - run_status["utilisation"]), 0.0)
+
+
+def run_benchmark(
+    testdata_dir: Path,
+    run_dir: Path,
+    exomiser_version: str,
+    variant_analysis: bool,
+    max_jobs: int,
+    workers: int,
+    post_process: bool,
+    runtime_history: Optional[Path] = None,
+    straggler_factor: float = 2.0,
+) -> RunnerBenchmark:
+    """
+    Prepare batch files for a corpus, run them with run_exomiser_local and a number of workers, and
+    post-process the raw results, timing the run and the post-processing.
+    The stand-in must be first on the PATH. With a runtime history, batches are balanced by the sample
+    runtimes of earlier runs, and the runtimes of this run are recorded to it.
+    """
+    if run_dir.exists():
+        shutil.rmtree(run_dir)
+    input_dir = run_dir.joinpath("input_dir")
+    tool_input_commands_dir = run_dir.joinpath("tool_input_commands")
+    raw_results_dir = run_dir.joinpath("raw_results")
+    for directory in [tool_input_commands_dir, raw_results_dir]:
+        directory.mkdir(parents=True)
+    write_fake_input_dir(input_dir)
+    config = benchmark_configurations(
+        exomiser_version, max_jobs, workers, runtime_history, straggler_factor
+    )
+    prepare_batch_files(
+        input_dir=input_dir,
+        testdata_dir=testdata_dir,
+        config=config,
+        tool_input_commands_dir=tool_input_commands_dir,
+        raw_results_dir=raw_results_dir,
+        variant_analysis=variant_analysis,
+        exomiser_version=exomiser_version,
+    )
+    working_dir = os.getcwd()
+    start = time.perf_counter()
+    try:
+        run_exomiser_local(
+            input_dir=input_dir,
+            testdata_dir=testdata_dir,
+            config=config,
+            output_dir=run_dir,
+            tool_input_commands_dir=tool_input_commands_dir,
+            raw_results_dir=raw_results_dir,
+            exomiser_version=exomiser_version,
+        )
+    finally:
+        os.chdir(working_dir)
+    run_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    if post_process:
+        create_standardised_results(
+            result_dir=raw_results_dir,
+            output_dir=run_dir.joinpath("pheval_results"),
+            phenopacket_dir=testdata_dir.joinpath("phenopackets"),
+            score_name=config.post_process.score_name,
+            sort_order=config.post_process.sort_order,
+            gene_analysis=True,
+            disease_analysis=True,
+            variant_analysis=variant_analysis,
+            exomiser_version=exomiser_version,
+        )
+    return RunnerBenchmark(
+        workers=workers,
+        batches=len(all_files(tool_input_commands_dir)),
+        samples=len(all_files(testdata_dir.joinpath("phenopackets"))),
+        run_seconds=run_seconds,
+        post_process_seconds=time.perf_counter() - start if post_process else 0.0,
+        tail_seconds=run_tail_seconds(run_dir.joinpath(RUN_STATUS_FILE_NAME)),
+    )
+
+
+def parallel_speedup(benchmarks: List[RunnerBenchmark]) -> List[RunnerBenchmark]:
+    """Return the benchmarks with the speedup and efficiency of each run over the first."""
+    baseline_seconds = benchmarks[0].run_seconds * benchmarks[0].workers
+    return [
+        replace(
+            benchmark,
+            speedup=baseline_seconds / benchmark.run_seconds,
+            efficiency=baseline_seconds / benchmark.run_seconds / benchmark.workers,
+        )
+        for benchmark in benchmarks
+    ]
+
+
+def benchmark_runner(
+    testdata_dir: Path,
+    output_dir: Path,
+    exomiser_version: str,
+    variant_analysis: bool,
+    max_jobs: int,
+    max_workers: int,
+    cost_model: CostModel,
+    post_process: bool,
+    runtime_history: bool = False,
+    straggler_factor: float = 2.0,
+) -> List[RunnerBenchmark]:
+    """
+    Run a corpus through the runner with the Exomiser stand-in and 1..max_workers workers,
+    recording the timings and the parallel speedup over one worker to a TSV file in the output directory.
+    With runtime_history, every run records to and batches by a runtime history kept in the output directory
+    across benchmarks, so repeated benchmarks show the effect of runtime-balanced batches on the tail.
+    """
+    benchmarks = []
+    with fake_exomiser_on_path(output_dir.joinpath("bin"), cost_model):
+        for workers in range(1, max_workers + 1):
+            print(f"...benchmarking the runner with {workers} workers...")
+            benchmarks.append(
+                run_benchmark(
+                    testdata_dir=testdata_dir,
+                    run_dir=output_dir.joinpath(f"workers-{workers}"),
+                    exomiser_version=exomiser_version,
+                    variant_analysis=variant_analysis,
+                    max_jobs=max_jobs,
+                    workers=workers,
+                    post_process=post_process,
+                    runtime_history=(
+                        output_dir.joinpath(RUNNER_BENCHMARK_RUNTIME_HISTORY_FILE_NAME)
+                        if runtime_history
+                        else None
+                    ),
+                    straggler_factor=straggler_factor,
+                )
+            )
+    benchmarks = parallel_speedup(benchmarks)
+    pl.DataFrame([asdict(benchmark) for benchmark in benchmarks]).write_csv(
+        output_dir.joinpath(RUNNER_BENCHMARK_RESULTS_FILE_NAME), separator="\t"
+    )
+    return benchmarks
+
+
+@click.command()
+@click.option(
+    "--testdata-dir",
+    "-t",
+    required=True,
+    metavar="DIRECTORY",
+    help="Corpus directory, with a phenopackets directory and, for variant analysis, a vcf directory.",
+    type=Path,
+)
+@click.option(
+    "--output-dir",
+    "-o",
+    required=True,
+    metavar="DIRECTORY",
+    help="Directory to write the benchmark runs and results to.",
+    type=Path,
+)
+@click.option(
+    "--exomiser-version",
+    "-v",
+    default="15.0.0",
+    show_default=True,
+    help="Exomiser version to emulate, which sets the command line and raw result format.",
+)
+@click.option(
+    "--variant-analysis/--no-variant-analysis",
+    default=False,
+    help="Run a variant analysis, with the VCFs of the corpus.",
+)
+@click.option(
+    "--max-jobs",
+    type=int,
+    default=10,
+    show_default=True,
+    help="Number of samples in each batch file.",
+)
+@click.option(
+    "--max-workers",
+    "-w",
+    type=int,
+    default=4,
+    show_default=True,
+    help="Benchmark the runner with 1 up to this many workers.",
+)
+@click.option(
+    "--startup-seconds",
+    type=float,
+    default=1.0,
+    show_default=True,
+    help="Seconds the stand-in takes to start each batch.",
+)
+@click.option(
+    "--sample-seconds",
+    type=float,
+    default=0.1,
+    show_default=True,
+    help="Seconds the stand-in takes for each sample.",
+)
+@click.option(
+    "--seconds-per-vcf-mb",
+    type=float,
+    default=0.0,
+    show_default=True,
+    help="Additional seconds the stand-in takes for each MB of a sample's VCF.",
+)
+@click.option(
+    "--jitter",
+    type=float,
+    default=0.0,
+    show_default=True,
+    help="Random variation of each sample's cost, as a fraction of it.",
+)
+@click.option(
+    "--genes",
+    type=int,
+    default=50,
+    show_default=True,
+    help="Number of synthetic genes in each raw result.",
+)
+@click.option(
+    "--straggler-rate",
+    type=float,
+    default=0.0,
+    show_default=True,
+    help="Fraction of batch runs that are stragglers, as on a degraded node.",
+)
+@click.option(
+    "--straggler-slowdown",
+    type=float,
+    default=10.0,
+    show_default=True,
+    help="How many times slower a straggling batch run is.",
+)
+@click.option(
+    "--heap-mb-per-sample",
+    type=float,
+    default=0.0,
+    show_default=True,
+    help="MB of heap each sample run in a batch retains, so batches outgrowing the -Xmx heap "
+    "run out of memory.",
+)
+@click.option(
+    "--straggler-factor",
+    type=float,
+    default=2.0,
+    show_default=True,
+    help="The runner's straggler_factor: how many times its expected time a batch runs "
+    "before its remaining samples are speculatively rerun (0 disables speculation).",
+)
+@click.option(
+    "--post-process/--no-post-process",
+    default=True,
+    show_default=True,
+    help="Also post-process the raw results of each run.",
+)
+@click.option(
+    "--runtime-history/--no-runtime-history",
+    default=False,
+    show_default=True,
+    help="Balance batches by the sample runtimes recorded by earlier runs, "
+    f"kept in {RUNNER_BENCHMARK_RUNTIME_HISTORY_FILE_NAME} in the output directory.",
+)
+def benchmark_exomiser_runner(
+    testdata_dir: Path,
+    output_dir: Path,
+    exomiser_version: str,
+    variant_analysis: bool,
+    max_jobs: int,
+    max_workers: int,
+    startup_seconds: float,
+    sample_seconds: float,
+    seconds_per_vcf_mb: float,
+    jitter: float,
+    genes: int,
+    straggler_rate: float,
+    straggler_slowdown: float,
+    heap_mb_per_sample: float,
+    straggler_factor: float,
+    post_process: bool,
+    runtime_history: bool,
+):
+    """
+    Benchmark the runner's parallel speedup with an Exomiser stand-in, without Exomiser or its data
+    (POSIX only).
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    benchmarks = benchmark_runner(
+        testdata_dir=testdata_dir.absolute(),
+        output_dir=output_dir.absolute(),
+        exomiser_version=exomiser_version,
+        variant_analysis=variant_analysis,
+        max_jobs=max_jobs,
+        max_workers=max_workers,
+        cost_model=CostModel(
+            startup_seconds=startup_seconds,
+            sample_seconds=sample_seconds,
+            seconds_per_vcf_mb=seconds_per_vcf_mb,
+            jitter=jitter,
+            genes=genes,
+            straggler_rate=straggler_rate,
+            straggler_slowdown=straggler_slowdown,
+            heap_mb_per_sample=heap_mb_per_sample,
+        ),
+        post_process=post_process,
+        runtime_history=runtime_history,
+        straggler_factor=straggler_factor,
+    )
+    for benchmark in benchmarks:
+        print(
+            f"{benchmark.workers} workers: {benchmark.run_seconds:.1f}s run "
+            f"({benchmark.speedup:.2f}x, {benchmark.efficiency:.0%} efficiency, "
+            f"{benchmark.tail_seconds:.1f}s tail), "
+            f"{benchmark.post_process_seconds:.1f}s post-processing"
+        )
@@ -0,0 +1,405 @@
+import itertools
+import os
+import queue
+import shutil
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Protocol
+
+from pheval.utils.logger import get_logger
+
+from pheval_exomiser.post_process.raw_result_catalog import is_complete_raw_result
+from pheval_exomiser.prepare.create_batch_commands import batch_file_output_filenames
+from pheval_exomiser.run.monitor import RunMonitor
+from pheval_exomiser.run.oom_recovery import (
+    RETRY_DIRECTORY_NAME,
+    escalate_heap,
+    is_out_of_memory,
+    retry_output_filename_groups,
+    write_retry_batch_files,
+)
+from pheval_exomiser.tracing import Span, trace_span
+
+logger = get_logger()
+
+SPECULATIVE_DIRECTORY_NAME = ".speculative"
+
+
+class BatchProcess(Protocol):
+    """
+    A running Exomiser batch: a local JVM process or a docker container.
+    out_of_memory is set once its log reports an OutOfMemoryError.
+    """
+
+    out_of_memory: bool
+
+    def wait(self) -> int:
+        """Wait for the batch to finish, returning its exit code."""
+
+    def kill(self) -> None:
+        """Kill the batch."""
+
+
+@dataclass
+class BatchAttempt:
+    """
+    One run of (some of) the samples of a batch file: the original, a speculative duplicate of the remaining
+    samples of a run, racing it, or a retry of the samples a run left when it ran out of memory.
+    Attempts racing each other share a unit, the batch file of the run being duplicated.
+    """
+
+    batch_file: Path
+    attempt_batch_file: Path
+    speculative: bool
+    unit: Optional[Path] = None
+    heap: Optional[str] = None
+    retry: int = 0
+    process: Optional[BatchProcess] = None
+    killed: bool = False
+    done: threading.Event = field(default_factory=threading.Event)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def __post_init__(self):
+        self.unit = self.unit or self.attempt_batch_file
+
+    def kill(self) -> None:
+        """Kill the attempt, now if it has been launched or as soon as it is."""
+        with self.lock:
+            self.killed = True
+            if self.process is not None and not self.done.is_set():
+                self.process.kill()
+
+
+def speculative_batch_file_path(raw_results_dir: Path, batch_file: Path) -> Path:
+    """
+    Return the path of the speculative duplicate of a batch file, next to the directory it writes results to.
+    It is kept in the raw results directory, which Exomiser can also see when run with docker.
+    """
+    return raw_results_dir.joinpath(SPECULATIVE_DIRECTORY_NAME, batch_file.name)
+
+
+def write_speculative_batch_file(
+    batch_file: Path, output_filenames: List[str], speculative_batch_file: Path
+) -> bool:
+    """
+    Write the commands of a batch file for the given output file names to a speculative batch file,
+    with their output directory moved to a directory named after the batch, next to the speculative batch file
+    (as seen by Exomiser, i.e., relative to the output directory of the commands).
+    Return False, writing nothing, if the commands have no output directory (Exomiser < 13.1.0).
+    """
+    speculative_commands = []
+    with open(batch_file) as batch:
+        for line in batch:
+            arguments = line.split()
+            if (
+                "--output-filename" not in arguments
+                or arguments[arguments.index("--output-filename") + 1] not in output_filenames
+            ):
+                continue
+            if "--output-directory" not in arguments:
+                return False
+            output_directory_index = arguments.index("--output-directory") + 1
+            arguments[output_directory_index] = (
+                f"{arguments[output_directory_index].rstrip('/')}/"
+                f"{SPECULATIVE_DIRECTORY_NAME}/{batch_file.stem}"
+            )
+            speculative_commands.append(" ".join(arguments) + "\n")
+    speculative_batch_file.parent.joinpath(batch_file.stem).mkdir(parents=True, exist_ok=True)
+    with open(speculative_batch_file, "w") as speculative_batch:
+        speculative_batch.writelines(speculative_commands)
+    return True
+
+
+def is_current_raw_result(raw_result_path: Path, started_at: float) -> bool:
+    """Return whether a raw result has been written completely since a run started."""
+    try:
+        return raw_result_path.stat().st_mtime >= started_at and is_complete_raw_result(
+            raw_result_path
+        )
+    except OSError:
+        return False
+
+
+def promote_speculative_results(
+    speculative_results_dir: Path, raw_results_dir: Path, result_suffix: str, started_at: float
+) -> int:
+    """
+    Atomically move the results of a winning speculative duplicate into the raw results directory, for the
+    samples the killed original did not finish: a sample whose machine-readable result the original already
+    wrote completely keeps it, as it may have been post-processed or catalogued already, and the duplicate's
+    results for it are dropped. A result left by an earlier run, before the run started at started_at,
+    is replaced. Return the number of files moved.
+    """
+    results = {
+        result: result.name.split("-exomiser", 1)[0] + "-exomiser"
+        for result in speculative_results_dir.iterdir()
+    }
+    finished_output_filenames = {
+        output_filename
+        for output_filename in set(results.values())
+        if is_current_raw_result(
+            raw_results_dir.joinpath(f"{output_filename}{result_suffix}"), started_at
+        )
+    }
+    promoted = 0
+    for result, output_filename in sorted(results.items()):
+        if output_filename in finished_output_filenames:
+            result.unlink()
+            continue
+        os.replace(result, raw_results_dir.joinpath(result.name))
+        promoted += 1
+    return promoted
+
+
+class SpeculativeBatchRunner:
+    """
+    Run batch files on a number of workers. Once no batch files are left to start and a worker is idle,
+    a running batch taking over straggler_factor times its expected time - its samples at the run's
+    seconds per sample so far - is duplicated: its remaining samples are run on the idle worker,
+    writing to a directory of their own. Whichever finishes first is kept and the other is killed;
+    a winning duplicate's results are then moved into the raw results directory for the samples the
+    original had not finished, so no complete result there is ever written twice.
+    A run dying of running out of memory has its remaining samples queued again up to oom_retries times,
+    with double the heap up to max_heap, or, at max_heap, split into two smaller batches.
+    """
+
+    def __init__(
+        self,
+        batch_files: List[Path],
+        launch: Callable[[Path, Span, Optional[str]], BatchProcess],
+        span_attributes: Callable[[Path], dict],
+        span_name: str,
+        workers: int,
+        run_monitor: RunMonitor,
+        straggler_factor: Optional[float],
+        heap: Optional[str] = None,
+        max_heap: Optional[str] = None,
+        oom_retries: int = 0,
+        check_seconds: float = 5.0,
+    ):
+        self.batch_files = batch_files
+        self.launch = launch
+        self.span_attributes = span_attributes
+        self.span_name = span_name
+        self.workers = workers
+        self.run_monitor = run_monitor
+        self.straggler_factor = straggler_factor
+        self.heap = heap
+        self.max_heap = max_heap
+        self.oom_retries = oom_retries
+        self.check_seconds = check_seconds
+        self.pending = deque(
+            BatchAttempt(batch_file, batch_file, False, heap=heap) for batch_file in batch_files
+        )
+        self.attempts: Dict[Path, List[BatchAttempt]] = {}
+        self.outstanding_units = {batch_file: 1 for batch_file in batch_files}
+        self.finished_units: set[Path] = set()
+        self.finished_batches: set[Path] = set()
+        self.unspeculable_batches: set[Path] = set()
+        self.finished_attempts: queue.Queue = queue.Queue()
+        self.running = 0
+        self.retry_batches = itertools.count(1)
+
+    def _run_attempt(self, attempt: BatchAttempt) -> None:
+        exit_code, error = None, None
+        try:
+            with trace_span(
+                self.span_name,
+                **self.span_attributes(attempt.attempt_batch_file),
+                speculative=attempt.speculative,
+                heap=attempt.heap,
+                retry=attempt.retry,
+            ) as span:
+                with attempt.lock:
+                    attempt.process = self.launch(attempt.attempt_batch_file, span, attempt.heap)
+                    if attempt.killed:
+                        attempt.process.kill()
+                exit_code = attempt.process.wait()
+                span.set_attributes(
+                    exit_code=exit_code,
+                    killed=attempt.killed,
+                    out_of_memory=attempt.process.out_of_memory,
+                )
+        except Exception as exception:
+            error = exception
+        finally:
+            attempt.done.set()
+            self.finished_attempts.put((attempt, exit_code, error))
+
+    def _start(self, attempt: BatchAttempt) -> None:
+        self.attempts.setdefault(attempt.batch_file, []).append(attempt)
+        self.running += 1
+        self.run_monitor.worker_started()
+        threading.Thread(target=self._run_attempt, args=(attempt,), daemon=True).start()
+
+    def _straggler(self) -> Optional[Path]:
+        """Return the running batch most overdue past straggler_factor times its expected time, if any."""
+        seconds_per_sample = self.run_monitor.seconds_per_sample()
+        if not self.straggler_factor or seconds_per_sample is None:
+            return None
+        now = time.time()
+        overdue = {}
+        for batch_file, attempts in self.attempts.items():
+            batch = self.run_monitor.batches[batch_file]
+            if (
+                batch_file in self.finished_batches
+                or batch_file in self.unspeculable_batches
+                or len(attempts) > 1
+                or batch.started_at is None
+            ):
+                continue
+            expected_seconds = seconds_per_sample * len(batch.output_filenames)
+            if now - batch.started_at > self.straggler_factor * expected_seconds:
+                overdue[batch_file] = (now - batch.started_at) / expected_seconds
+        return max(overdue, key=overdue.get) if overdue else None
+
+    def _speculate(self, batch_file: Path) -> None:
+        """
+        Start a speculative duplicate of the remaining samples of a batch file,
+        unless it has none or its commands cannot be redirected.
+        """
+        remaining = self.run_monitor.remaining_output_filenames(batch_file)
+        speculative_batch_file = speculative_batch_file_path(
+            self.run_monitor.raw_results_dir, batch_file
+        )
+        if not remaining or not write_speculative_batch_file(
+            batch_file, remaining, speculative_batch_file
+        ):
+            self.unspeculable_batches.add(batch_file)
+            return
+        logger.info(
+            f"{batch_file.name} is straggling, speculatively running its {len(remaining)} "
+            f"remaining samples on an idle worker."
+        )
+        self.run_monitor.batch_speculated(batch_file)
+        self._start(
+            BatchAttempt(batch_file, speculative_batch_file, True, unit=batch_file, heap=self.heap)
+        )
+
+    def _retry_out_of_memory(self, attempt: BatchAttempt) -> None:
+        """
+        Queue the remaining samples of a run that ran out of memory again, with double the heap,
+        or at max_heap split into two batches, unless the run was the last retry allowed.
+        """
+        batch_file = attempt.batch_file
+        attempt_output_filenames = set(batch_file_output_filenames(attempt.attempt_batch_file))
+        remaining = [
+            output_filename
+            for output_filename in self.run_monitor.remaining_output_filenames(batch_file)
+            if output_filename in attempt_output_filenames
+        ]
+        if not remaining:
+            return
+        escalated_heap = escalate_heap(attempt.heap, self.max_heap)
+        if attempt.retry >= self.oom_retries or (escalated_heap is None and len(remaining) < 2):
+            logger.error(
+                f"{attempt.attempt_batch_file.name} ran out of memory with "
+                f"{attempt.heap or 'the default heap'}, leaving {len(remaining)} samples without results."
+            )
+            return
+        retry = attempt.retry + 1
+        heap = escalated_heap or attempt.heap
+        retry_batch_files = write_retry_batch_files(
+            batch_file,
+            retry_output_filename_groups(remaining, split=escalated_heap is None),
+            self.run_monitor.raw_results_dir.joinpath(
+                RETRY_DIRECTORY_NAME, f"{batch_file.stem}-retry-{next(self.retry_batches)}"
+            ),
+        )
+        logger.warning(
+            f"{attempt.attempt_batch_file.name} ran out of memory, retrying its {len(remaining)} "
+            + (
+                f"remaining samples with {heap}."
+                if escalated_heap
+                else f"remaining samples split into {len(retry_batch_files)} batches."
+            )
+        )
+        self.run_monitor.batch_escalated(
+            batch_file,
+            {
+                "retry": retry,
+                "heap": heap,
+                "batches": len(retry_batch_files),
+                "samples": len(remaining),
+            },
+        )
+        self.outstanding_units[batch_file] += len(retry_batch_files)
+        self.pending.extendleft(
+            BatchAttempt(batch_file, retry_batch_file, False, heap=heap, retry=retry)
+            for retry_batch_file in reversed(retry_batch_files)
+        )
+
+    def _finish(
+        self, attempt: BatchAttempt, exit_code: Optional[int], error: Optional[Exception]
+    ) -> None:
+        """
+        Handle a finished attempt, keeping it if it is the first to finish its unit and retrying what it
+        left if it ran out of memory. A batch is finished once all its units are.
+        """
+        self.running -= 1
+        self.run_monitor.worker_released()
+        batch_file = attempt.batch_file
+        if attempt.unit in self.finished_units or attempt.killed:
+            return
+        others = [
+            other
+            for other in self.attempts[batch_file]
+            if other is not attempt and other.unit == attempt.unit and not other.done.is_set()
+        ]
+        failed = error is not None or exit_code != 0
+        if failed and others:
+            logger.warning(
+                f"{attempt.attempt_batch_file.name} failed ({error or f'exit code {exit_code}'}), "
+                f"keeping the other run of {batch_file.name}."
+            )
+            return
+        if error is not None:
+            raise error
+        self.finished_units.add(attempt.unit)
+        for other in others:
+            other.kill()
+            other.done.wait()
+        if attempt.speculative and not failed:
+            promote_speculative_results(
+                attempt.attempt_batch_file.parent.joinpath(batch_file.stem),
+                self.run_monitor.raw_results_dir,
+                self.run_monitor.result_suffix,
+                self.run_monitor.results_since,
+            )
+            logger.info(f"The speculative run of {batch_file.name} finished first.")
+        if failed and is_out_of_memory(exit_code, attempt.process.out_of_memory):
+            self._retry_out_of_memory(attempt)
+        self.outstanding_units[batch_file] -= 1
+        if not self.outstanding_units[batch_file]:
+            self.finished_batches.add(batch_file)
+            self.run_monitor.batch_finished(batch_file)
+
+    def run(self) -> None:
+        """Run every batch file, returning once each has a finished run."""
+        try:
+            while len(self.finished_batches) < len(self.batch_files):
+                while self.pending and self.running < self.workers:
+                    attempt = self.pending.popleft()
+                    if not attempt.retry:
+                        self.run_monitor.batch_started(attempt.batch_file)
+                    self._start(attempt)
+                while not self.pending and self.running < self.workers:
+                    straggler = self._straggler()
+                    if straggler is None:
+                        break
+                    self._speculate(straggler)
+                try:
+                    self._finish(*self.finished_attempts.get(timeout=self.check_seconds))
+                except queue.Empty:
+                    pass
+        finally:
+            for attempts in self.attempts.values():
+                for attempt in attempts:
+                    attempt.kill()
+            for directory_name in [SPECULATIVE_DIRECTORY_NAME, RETRY_DIRECTORY_NAME]:
+                shutil.rmtree(
+                    self.run_monitor.raw_results_dir.joinpath(directory_name), ignore_errors=True
+                )
@@ -0,0 +1,179 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import List
+
+from pheval_exomiser.prepare.create_batch_commands import (
+    apply_debug_output_formats,
+    create_command_arguments,
+    write_batch_files,
+)
+from pheval_exomiser.prepare.runtime_history import analysis_key, read_recorded_runtimes
+from pheval_exomiser.prepare.tool_specific_configuration_options import (
+    ExomiserConfigurations,
+    SweepVersion,
+)
+from pheval_exomiser.prepare.write_application_properties import write_all_application_properties
+from pheval_exomiser.run.run import (
+    analysis_configuration_path,
+    batch_output_formats,
+    input_batch_files,
+    phenopacket_index_path,
+    run_local_batch_files,
+    runtime_history_path,
+)
+
+
+@dataclass
+class SweepRun:
+    """
+    An Exomiser version of a sweep, and the output tree its application.properties, batch files and results
+    are written to.
+    """
+
+    version: str
+    config: ExomiserConfigurations
+    output_dir: Path
+
+    @property
+    def tool_input_commands_dir(self) -> Path:
+        return self.output_dir.joinpath("tool_input_commands")
+
+    @property
+    def raw_results_dir(self) -> Path:
+        return self.output_dir.joinpath("raw_results")
+
+
+def sweep_configuration(
+    config: ExomiserConfigurations, sweep_version: SweepVersion
+) -> ExomiserConfigurations:
+    """
+    Return the configurations for one version of a sweep,
+    with its software directory, score name and application.properties configurations.
+    """
+    return config.model_copy(
+        update={
+            "exomiser_software_directory": sweep_version.exomiser_software_directory,
+            "application_properties": sweep_version.application_properties
+            or config.application_properties,
+            "post_process": config.post_process.model_copy(
+                update={"score_name": sweep_version.score_name or config.post_process.score_name}
+            ),
+        }
+    )
+
+
+def sweep_output_dir(output_dir: Path, exomiser_version: str) -> Path:
+    """Return the output tree of an Exomiser version of a sweep."""
+    return Path(output_dir).joinpath(f"exomiser-{exomiser_version}")
+
+
+def create_sweep_runs(config: ExomiserConfigurations, output_dir: Path) -> List[SweepRun]:
+    """Return the runs of the configured sweep, creating their output trees."""
+    sweep_runs = [
+        SweepRun(
+            version=sweep_version.version,
+            config=sweep_configuration(config, sweep_version),
+            output_dir=sweep_output_dir(output_dir, sweep_version.version),
+        )
+        for sweep_version in config.sweep
+    ]
+    for sweep_run in sweep_runs:
+        sweep_run.tool_input_commands_dir.mkdir(parents=True, exist_ok=True)
+        sweep_run.raw_results_dir.mkdir(parents=True, exist_ok=True)
+    return sweep_runs
+
+
+def prepare_sweep_batch_files(
+    input_dir: Path,
+    testdata_dir: Path,
+    config: ExomiserConfigurations,
+    sweep_runs: List[SweepRun],
+    variant_analysis: bool,
+) -> None:
+    """
+    Prepare the batch files of every version of a sweep.
+    Phenopackets are parsed (and VCFs resolved) once, and the command line arguments
+    are then written out per version, with that version's raw results directory and output formats.
+    """
+    print("...preparing sweep batch files...")
+    command_arguments = create_command_arguments(
+        environment=config.environment,
+        phenopacket_dir=Path(testdata_dir).joinpath("phenopackets"),
+        phenotype_only=variant_analysis,
+        vcf_dir=Path(testdata_dir).joinpath("vcf") if variant_analysis else None,
+        results_dir=None,
+        analysis_yaml=analysis_configuration_path(input_dir, config),
+        phenopacket_index=phenopacket_index_path(input_dir, config),
+    )
+    for sweep_run in sweep_runs:
+        output_formats, configured_output_formats = batch_output_formats(config, sweep_run.version)
+        version_command_arguments = [
+            replace(
+                sample_command_arguments,
+                raw_results_dir=sweep_run.raw_results_dir,
+                output_formats=output_formats,
+            )
+            for sample_command_arguments in command_arguments
+        ]
+        apply_debug_output_formats(
+            version_command_arguments, config.debug_samples, configured_output_formats
+        )
+        write_batch_files(
+            version_command_arguments,
+            variant_analysis,
+            sweep_run.tool_input_commands_dir,
+            Path(testdata_dir).name,
+            config.max_jobs,
+            sweep_run.version,
+            read_recorded_runtimes(
+                runtime_history_path(input_dir, config),
+                sweep_run.version,
+                analysis_key(analysis_configuration_path(input_dir, config)),
+            ),
+        )
+
+
+def check_sweep_environment(config: ExomiserConfigurations) -> None:
+    """Check that a sweep is configured to run in an environment it can run in, before anything is prepared."""
+    if config.environment != "local":
+        raise ValueError("Multi-version sweeps can only be run in the local environment.")
+
+
+def write_sweep_application_properties(input_dir: Path, sweep_runs: List[SweepRun]) -> None:
+    """Write the application.properties files of every version of a sweep to its output tree."""
+    for sweep_run in sweep_runs:
+        write_all_application_properties(input_dir, sweep_run.config, sweep_run.output_dir)
+
+
+def run_exomiser_sweep(
+    input_dir: Path,
+    testdata_dir: Path,
+    config: ExomiserConfigurations,
+    sweep_runs: List[SweepRun],
+) -> None:
+    """
+    Run the batch files of every version of a sweep locally and concurrently, each version as a run of its own
+    with its application.properties, on up to exomiser_workers workers, with speculation and out-of-memory retries.
+    At most sweep_workers Exomiser processes run at once across all versions.
+    """
+    check_sweep_environment(config)
+    print("...running exomiser sweep...")
+    worker_slots = threading.BoundedSemaphore(config.sweep_workers)
+    with ThreadPoolExecutor(max_workers=len(sweep_runs)) as executor:
+        for future in [
+            executor.submit(
+                run_local_batch_files,
+                batch_files=input_batch_files(sweep_run.tool_input_commands_dir, testdata_dir),
+                input_dir=Path(input_dir),
+                config=sweep_run.config,
+                output_dir=sweep_run.output_dir,
+                raw_results_dir=sweep_run.raw_results_dir,
+                exomiser_version=sweep_run.version,
+                properties_dir=sweep_run.output_dir,
+                worker_slots=worker_slots,
+            )
+            for sweep_run in sweep_runs
+        ]:
+            future.result()
@@ -1,14 +1,35 @@
 """Exomiser Runner"""
 
+from contextlib import contextmanager, nullcontext
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Iterator
 
 from pheval.runners.runner import PhEvalRunner
+from pheval.utils.logger import get_logger
 
-from pheval_exomiser.post_process.post_process import post_process_result_format
+from pheval_exomiser.post_process.post_process import (
+    create_pipelined_post_processor,
+    post_process_result_format,
+)
+from pheval_exomiser.post_process.raw_result_storage import compact_raw_results
+from pheval_exomiser.prepare.preflight import validate_application_properties
 from pheval_exomiser.prepare.tool_specific_configuration_options import ExomiserConfigurations
-from pheval_exomiser.prepare.write_application_properties import ExomiserConfigurationFileWriter
+from pheval_exomiser.prepare.write_application_properties import (
+    write_all_application_properties,
+)
+from pheval_exomiser.profiling import profile_command
 from pheval_exomiser.run.run import prepare_batch_files, run_exomiser
+from pheval_exomiser.run.sweep import (
+    check_sweep_environment,
+    create_sweep_runs,
+    prepare_sweep_batch_files,
+    run_exomiser_sweep,
+    write_sweep_application_properties,
+)
+from pheval_exomiser.tracing import TRACE_FILE_NAME, trace_command, trace_span
+
+logger = get_logger()
 
 
 @dataclass
@@ -22,55 +43,141 @@ class ExomiserPhEvalRunner(PhEvalRunner):
     config_file: Path
     version: str
 
+    @contextmanager
+    def stage(self, name: str, config: ExomiserConfigurations) -> Iterator[None]:
+        """Profile and trace a runner stage, as a root span of the run's trace."""
+        logger.info("Exomiser runner stage: %s", name)
+        with (
+            profile_command(name, self.output_dir),
+            trace_command(
+                name,
+                self.output_dir.joinpath(TRACE_FILE_NAME) if config.trace else None,
+                exomiser_version=self.version,
+                environment=config.environment,
+                variant_analysis=self.input_dir_config.variant_analysis,
+                testdata_dir=str(self.testdata_dir),
+            ),
+        ):
+            yield
+
     def prepare(self):
         """prepare"""
-        print("preparing")
-        ExomiserConfigurationFileWriter(
-            input_dir=self.input_dir,
-            configurations=ExomiserConfigurations.parse_obj(
-                self.input_dir_config.tool_specific_configuration_options
-            ),
-        ).write_application_properties()
+        config = ExomiserConfigurations.parse_obj(
+            self.input_dir_config.tool_specific_configuration_options
+        )
+        with self.stage("prepare", config):
+            if config.sweep:
+                check_sweep_environment(config)
+            write_all_application_properties(input_dir=self.input_dir, configurations=config)
+            if config.sweep:
+                write_sweep_application_properties(
+                    self.input_dir, create_sweep_runs(config, self.output_dir)
+                )
 
     def run(self):
         """run"""
-        print("running with exomiser")
         config = ExomiserConfigurations.parse_obj(
             self.input_dir_config.tool_specific_configuration_options
         )
-        prepare_batch_files(
+        with self.stage("run", config):
+            if config.preflight:
+                with trace_span("preflight"):
+                    for properties_dir in (
+                        [
+                            sweep_run.output_dir
+                            for sweep_run in create_sweep_runs(config, self.output_dir)
+                        ]
+                        if config.sweep
+                        else [self.input_dir]
+                    ):
+                        validate_application_properties(properties_dir, config.environment)
+            if config.sweep:
+                self.run_sweep(config)
+                return
+            prepare_batch_files(
+                input_dir=self.input_dir,
+                config=config,
+                testdata_dir=self.testdata_dir,
+                tool_input_commands_dir=self.tool_input_commands_dir,
+                raw_results_dir=self.raw_results_dir,
+                variant_analysis=self.input_dir_config.variant_analysis,
+                exomiser_version=self.version,
+            )
+            with (
+                create_pipelined_post_processor(
+                    config=config,
+                    raw_results_dir=self.raw_results_dir,
+                    output_dir=self.output_dir,
+                    phenopacket_dir=self.testdata_dir.joinpath("phenopackets"),
+                    variant_analysis=self.input_dir_config.variant_analysis,
+                    gene_analysis=self.input_dir_config.gene_analysis,
+                    disease_analysis=self.input_dir_config.disease_analysis,
+                    exomiser_version=self.version,
+                )
+                if config.post_process.pipelined
+                else nullcontext()
+            ):
+                run_exomiser(
+                    input_dir=self.input_dir,
+                    testdata_dir=self.testdata_dir,
+                    config=config,
+                    output_dir=self.output_dir,
+                    tool_input_commands_dir=self.tool_input_commands_dir,
+                    raw_results_dir=self.raw_results_dir,
+                    exomiser_version=self.version,
+                    variant_analysis=self.input_dir_config.variant_analysis,
+                )
+            if config.compact_raw_results:
+                with trace_span("compact_raw_results"):
+                    compact_raw_results(self.raw_results_dir, config.compact_raw_results)
+
+    def run_sweep(self, config: ExomiserConfigurations):
+        """Run every version of a multi-version sweep, sharing one preparation pass."""
+        check_sweep_environment(config)
+        sweep_runs = create_sweep_runs(config, self.output_dir)
+        prepare_sweep_batch_files(
             input_dir=self.input_dir,
-            config=config,
             testdata_dir=self.testdata_dir,
-            tool_input_commands_dir=self.tool_input_commands_dir,
-            raw_results_dir=self.raw_results_dir,
+            config=config,
+            sweep_runs=sweep_runs,
             variant_analysis=self.input_dir_config.variant_analysis,
-            exomiser_version=self.version,
         )
-        run_exomiser(
+        run_exomiser_sweep(
             input_dir=self.input_dir,
             testdata_dir=self.testdata_dir,
             config=config,
-            output_dir=self.output_dir,
-            tool_input_commands_dir=self.tool_input_commands_dir,
-            raw_results_dir=self.raw_results_dir,
-            exomiser_version=self.version,
-            variant_analysis=self.input_dir_config.variant_analysis,
+            sweep_runs=sweep_runs,
         )
+        if config.compact_raw_results:
+            for sweep_run in sweep_runs:
+                compact_raw_results(sweep_run.raw_results_dir, config.compact_raw_results)
 
     def post_process(self):
         """post_process"""
-        print("post processing")
         config = ExomiserConfigurations.parse_obj(
             self.input_dir_config.tool_specific_configuration_options
         )
-        post_process_result_format(
-            config=config,
-            raw_results_dir=self.raw_results_dir,
-            output_dir=self.output_dir,
-            phenopacket_dir=self.testdata_dir.joinpath("phenopackets"),
-            variant_analysis=self.input_dir_config.variant_analysis,
-            gene_analysis=self.input_dir_config.gene_analysis,
-            disease_analysis=self.input_dir_config.disease_analysis,
-            exomiser_version=self.version,
-        )
+        with self.stage("post_process", config):
+            if config.sweep:
+                for sweep_run in create_sweep_runs(config, self.output_dir):
+                    post_process_result_format(
+                        config=sweep_run.config,
+                        raw_results_dir=sweep_run.raw_results_dir,
+                        output_dir=sweep_run.output_dir,
+                        phenopacket_dir=self.testdata_dir.joinpath("phenopackets"),
+                        variant_analysis=self.input_dir_config.variant_analysis,
+                        gene_analysis=self.input_dir_config.gene_analysis,
+                        disease_analysis=self.input_dir_config.disease_analysis,
+                        exomiser_version=sweep_run.version,
+                    )
+                return
+            post_process_result_format(
+                config=config,
+                raw_results_dir=self.raw_results_dir,
+                output_dir=self.output_dir,
+                phenopacket_dir=self.testdata_dir.joinpath("phenopackets"),
+                variant_analysis=self.input_dir_config.variant_analysis,
+                gene_analysis=self.input_dir_config.gene_analysis,
+                disease_analysis=self.input_dir_config.disease_analysis,
+                exomiser_version=self.version,
+            )
@@ -0,0 +1,148 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from pheval_exomiser.profiling import profile_stage
+
+TRACE_FILE_NAME = "exomiser_trace.jsonl"
+
+
+@dataclass
+class Span:
+    """A timed operation, with attributes describing what it operated on."""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str]
+    start_time_unix_nano: int
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    recording: bool = True
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if self.recording and value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any) -> None:
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+
+_NON_RECORDING_SPAN = Span("", "", "", None, 0, recording=False)
+
+
+class Tracer:
+    """
+    Record nested spans to a local JSONL file, one span per line when it ends,
+    with OTLP field names (trace_id, span_id, parent_span_id, start/end_time_unix_nano, attributes),
+    so a trace can be loaded into a trace viewer offline.
+    Spans nest within a thread; spans started in worker threads are roots of the same trace.
+    """
+
+    def __init__(self, trace_file: Path):
+        self.trace_file = Path(trace_file)
+        self.trace_id = os.urandom(16).hex()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self) -> List[Span]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def _export(self, span: Span, end_time_unix_nano: int, status: str) -> None:
+        record = {
+            "trace_id": span.trace_id,
+            "span_id": span.span_id,
+            "parent_span_id": span.parent_span_id,
+            "name": span.name,
+            "start_time_unix_nano": span.start_time_unix_nano,
+            "end_time_unix_nano": end_time_unix_nano,
+            "status": status,
+            "thread": threading.current_thread().name,
+            "attributes": span.attributes,
+        }
+        with self._lock:
+            self.trace_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.trace_file, "a") as trace:
+                trace.write(json.dumps(record, default=str) + "\n")
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """Record a span nested under the span open in the current thread."""
+        stack = self._stack()
+        span = Span(
+            name=name,
+            trace_id=self.trace_id,
+            span_id=os.urandom(8).hex(),
+            parent_span_id=stack[-1].span_id if stack else None,
+            start_time_unix_nano=time.time_ns(),
+        )
+        span.set_attributes(**attributes)
+        stack.append(span)
+        status = "OK"
+        try:
+            yield span
+        except BaseException as error:
+            status = "ERROR"
+            span.set_attribute("exception", repr(error))
+            raise
+        finally:
+            stack.pop()
+            self._export(span, time.time_ns(), status)
+
+
+_tracer: Optional[Tracer] = None
+
+
+def enable_tracing(trace_file: Path) -> Tracer:
+    """Enable tracing to a file, reusing the active tracer (and its trace id) if it writes to the same file."""
+    global _tracer
+    if _tracer is None or _tracer.trace_file != Path(trace_file):
+        _tracer = Tracer(trace_file)
+    return _tracer
+
+
+def disable_tracing() -> None:
+    """Disable tracing; trace_span then only times its stage for profiling."""
+    global _tracer
+    _tracer = None
+
+
+@contextmanager
+def trace_span(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Record a span if tracing is enabled, and time it as a profiled stage of the same name.
+    Attributes with a None value are omitted.
+    """
+    with profile_stage(name):
+        if _tracer is None:
+            yield _NON_RECORDING_SPAN
+        else:
+            with _tracer.span(name, **attributes) as span:
+                yield span
+
+
+@contextmanager
+def trace_command(name: str, trace_file: Optional[Path], **attributes: Any) -> Iterator[Span]:
+    """Record a runner stage or command as a root span, enabling tracing to trace_file if one is given."""
+    if trace_file is not None:
+        enable_tracing(trace_file)
+    if _tracer is None:
+        yield _NON_RECORDING_SPAN
+        return
+    with _tracer.span(name, **attributes) as span:
+        yield span
+
+
+def file_size(path: Path) -> Optional[int]:
+    """Return the size of a file in bytes, or None if it does not exist."""
+    try:
+        return Path(path).stat().st_size
+    except OSError:
+        return None
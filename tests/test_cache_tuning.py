@@ -0,0 +1,175 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from pheval_exomiser.run.cache_tuning import (
+    CacheTrial,
+    apply_cache_setting,
+    cache_settings,
+    peak_rss_mb,
+    recommend_cache_setting,
+    select_sample_commands,
+    tune_cache,
+    wait_for_trial,
+    write_trial_application_properties,
+    write_trial_batch_file,
+)
+from pheval_exomiser.run.runner_benchmark import write_fake_input_dir
+
+
+def cache_trial(cache_type, maximum_size, samples_per_minute, peak_rss_mb, exit_code=0):
+    return CacheTrial(
+        cache_type, maximum_size, 10, 60.0, samples_per_minute, peak_rss_mb, exit_code
+    )
+
+
+class TestCacheTuning(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmp_dir)
+
+    def test_cache_settings(self):
+        self.assertEqual(
+            cache_settings(["none", "caffeine"], [10000, 60000]),
+            [("none", None), ("caffeine", 10000), ("caffeine", 60000)],
+        )
+
+    def test_select_sample_commands(self):
+        batch_file = self.tmp_dir.joinpath("batch.txt")
+        batch_file.write_text("".join(f"--sample patient_{i}.json\n" for i in range(10)))
+        self.assertEqual(
+            select_sample_commands(batch_file, 3),
+            ["--sample patient_0.json\n", "--sample patient_3.json\n", "--sample patient_6.json\n"],
+        )
+
+    def test_write_trial_batch_file(self):
+        batch_file = write_trial_batch_file(
+            ["--sample patient_1.json --output-directory /results --output-filename patient_1\n"],
+            self.tmp_dir,
+        )
+        self.assertEqual(
+            batch_file.read_text(),
+            f"--sample patient_1.json --output-directory {self.tmp_dir} "
+            "--output-filename patient_1\n",
+        )
+
+    def test_write_trial_application_properties(self):
+        application_properties = self.tmp_dir.joinpath("base.properties")
+        application_properties.write_text("exomiser.data-directory=/data\nspring.cache.type=none\n")
+        self.assertEqual(
+            write_trial_application_properties(
+                application_properties, self.tmp_dir, "caffeine", 60000
+            ).read_text(),
+            "exomiser.data-directory=/data\nspring.cache.type=caffeine\n"
+            "spring.cache.caffeine.spec=maximumSize=60000\n",
+        )
+
+    def test_recommend_cache_setting(self):
+        trials = [
+            cache_trial("none", None, 5.0, 2000),
+            cache_trial("caffeine", 60000, 9.0, 3000),
+            cache_trial("caffeine", 200000, 12.0, 6000),
+            cache_trial("caffeine", 500000, 20.0, 2000, exit_code=1),
+        ]
+        self.assertEqual(recommend_cache_setting(trials, 2, 12000), trials[2])
+        self.assertEqual(recommend_cache_setting(trials, 3, 12000), trials[1])
+        self.assertEqual(recommend_cache_setting(trials, 8, 12000), trials[0])
+
+    def test_recommend_cache_setting_without_peak_rss(self):
+        trials = [cache_trial("none", None, 5.0, None), cache_trial("caffeine", 60000, 9.0, None)]
+        self.assertEqual(recommend_cache_setting(trials, 8, 1000), trials[1])
+
+    def test_peak_rss_mb(self):
+        self.assertEqual(peak_rss_mb(2048 if sys.platform != "darwin" else 2 * 1024**2), 2.0)
+
+    def test_wait_for_trial(self):
+        process = subprocess.Popen([sys.executable, "-c", "import sys; sys.exit(3)"])
+        trial_peak_rss_mb = wait_for_trial(process)
+        self.assertEqual(process.returncode, 3)
+        if hasattr(os, "wait4"):
+            self.assertGreater(trial_peak_rss_mb, 0)
+        else:
+            self.assertIsNone(trial_peak_rss_mb)
+
+    def test_apply_cache_setting(self):
+        config_file = self.tmp_dir.joinpath("config.yaml")
+        config_file.write_text(
+            "  application_properties:\n"
+            "    # either none, simple, or caffeine\n"
+            "    cache_type: none\n"
+            "    cache_caffeine_spec:\n"
+        )
+        apply_cache_setting(config_file, cache_trial("caffeine", 60000, 9.0, 3000))
+        self.assertEqual(
+            config_file.read_text(),
+            "  application_properties:\n"
+            "    # either none, simple, or caffeine\n"
+            "    cache_type: caffeine\n"
+            "    cache_caffeine_spec: 60000\n",
+        )
+
+    def test_tune_cache_runs_trials_as_configured(self):
+        write_fake_input_dir(self.tmp_dir)
+        self.tmp_dir.joinpath("config.yaml").write_text(
+            "tool: exomiser\n"
+            "tool_version: 15.0.0\n"
+            "variant_analysis: false\n"
+            "gene_analysis: true\n"
+            "disease_analysis: false\n"
+            "tool_specific_configuration_options:\n"
+            "  environment: local\n"
+            "  exomiser_software_directory: exomiser-cli-fake\n"
+            "  analysis_configuration_file:\n"
+            "  max_jobs: 0\n"
+            "  exomiser_workers: 3\n"
+            "  exomiser_heap: 8g\n"
+            "  class_data_sharing: true\n"
+            "  application_properties: {}\n"
+            "  post_process: {score_name: combinedScore, sort_order: DESCENDING}\n"
+        )
+        batch_file = self.tmp_dir.joinpath("batch.txt")
+        batch_file.write_text("--sample patient_1.json --output-directory results\n")
+        commands = []
+        run_process = subprocess.Popen
+
+        def popen(command, **kwargs):
+            commands.append(command)
+            return run_process([sys.executable, "-c", "pass"])
+
+        with (
+            patch(
+                "pheval_exomiser.run.cache_tuning.local_jvm_options",
+                return_value=["-XX:SharedArchiveFile=exomiser.jsa", "-Xshare:auto"],
+            ),
+            patch("pheval_exomiser.run.cache_tuning.subprocess.Popen", side_effect=popen),
+            patch("pheval_exomiser.run.cache_tuning.recommend_cache_setting") as recommend,
+        ):
+            tune_cache(
+                input_dir=self.tmp_dir,
+                batch_file=batch_file,
+                output_dir=self.tmp_dir.joinpath("trials"),
+                cache_types=["none", "simple"],
+                maximum_sizes=[],
+                sample_size=1,
+                workers=None,
+                memory_budget_mb=1024.0,
+            )
+        self.assertEqual(len(commands), 3)
+        for command in commands:
+            self.assertEqual(
+                command[1:5],
+                [
+                    "-Xmx8g",
+                    "-XX:+ExitOnOutOfMemoryError",
+                    "-XX:SharedArchiveFile=exomiser.jsa",
+                    "-Xshare:auto",
+                ],
+            )
+        self.assertEqual(recommend.call_args.args[1:], (3, 1024.0))
@@ -0,0 +1,60 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import polars as pl
+
+from pheval_exomiser.post_process.consolidate import (
+    consolidate_standardised_results,
+    sample_partition,
+)
+
+
+class TestConsolidateStandardisedResults(unittest.TestCase):
+    def setUp(self) -> None:
+        self.output_dir = Path(tempfile.mkdtemp())
+        self.gene_results_dir = self.output_dir.joinpath("pheval_gene_results")
+        self.gene_results_dir.mkdir()
+        for sample_id, gene_symbol in [("patient_1", "FGD1"), ("patient_2", "RTTN")]:
+            pl.DataFrame(
+                {
+                    "rank": [1],
+                    "score": [0.9],
+                    "gene_symbol": [gene_symbol],
+                    "gene_identifier": ["ENSG"],
+                    "true_positive": [True],
+                }
+            ).write_parquet(self.gene_results_dir.joinpath(f"{sample_id}-gene_result.parquet"))
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.output_dir)
+
+    def test_consolidate_standardised_results(self):
+        consolidate_standardised_results(
+            self.output_dir,
+            gene_analysis=True,
+            disease_analysis=False,
+            variant_analysis=False,
+            dataset_partitions=4,
+        )
+        dataset = pl.read_parquet(
+            self.output_dir.joinpath("pheval_gene_results_dataset"), hive_partitioning=True
+        ).sort("sample_id")
+        self.assertEqual(dataset["sample_id"].to_list(), ["patient_1", "patient_2"])
+        self.assertEqual(dataset["gene_symbol"].to_list(), ["FGD1", "RTTN"])
+        self.assertEqual(
+            dataset["sample_partition"].to_list(),
+            [sample_partition("patient_1", 4), sample_partition("patient_2", 4)],
+        )
+        self.assertEqual(len(list(self.gene_results_dir.iterdir())), 2)
+
+    def test_consolidate_standardised_results_remove_per_file(self):
+        consolidate_standardised_results(
+            self.output_dir,
+            gene_analysis=True,
+            disease_analysis=False,
+            variant_analysis=False,
+            keep_per_file_results=False,
+        )
+        self.assertEqual(list(self.gene_results_dir.iterdir()), [])
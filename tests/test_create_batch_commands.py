@@ -1,7 +1,10 @@
+import shutil
+import tempfile
 import unittest
 from pathlib import Path
 from unittest.mock import patch
 
+from google.protobuf.json_format import MessageToJson
 from phenopackets import (
     Diagnosis,
     File,
@@ -22,6 +25,10 @@ from phenopackets import (
 from pheval_exomiser.prepare.create_batch_commands import (
     CommandCreator,
     ExomiserCommandLineArguments,
+    VcfDirectoryIndex,
+    batch_file_assembly,
+    create_batch_file,
+    group_command_arguments_by_assembly,
 )
 
 interpretations = [
@@ -303,3 +310,136 @@ class TestCommandCreator(unittest.TestCase):
                 output_formats=["JSON", "HTML"],
             ),
         )
+
+
+class TestGroupCommandArgumentsByAssembly(unittest.TestCase):
+    def test_group_command_arguments_by_assembly(self):
+        grch37 = ExomiserCommandLineArguments(
+            sample=Path("/path/to/phenopacket_1.json"), vcf_assembly="GRCh37"
+        )
+        hg19 = ExomiserCommandLineArguments(
+            sample=Path("/path/to/phenopacket_2.json"), vcf_assembly="hg19"
+        )
+        grch38 = ExomiserCommandLineArguments(
+            sample=Path("/path/to/phenopacket_3.json"), vcf_assembly="GRCh38"
+        )
+        self.assertEqual(
+            group_command_arguments_by_assembly([grch37, grch38, hg19]),
+            {"hg19": [grch37, hg19], "hg38": [grch38]},
+        )
+
+
+class TestBatchFileAssembly(unittest.TestCase):
+    def setUp(self) -> None:
+        self.batch_file = Path(tempfile.mkdtemp()).joinpath("RUN-exomiser-batch.txt")
+
+    def tearDown(self) -> None:
+        self.batch_file.unlink()
+        self.batch_file.parent.rmdir()
+
+    def test_batch_file_assembly(self):
+        self.batch_file.write_text(
+            "--analysis a.yml --sample p1.json --vcf p1.vcf --assembly GRCh38\n"
+            "--analysis a.yml --sample p2.json --vcf p2.vcf --assembly hg38\n"
+        )
+        self.assertEqual(batch_file_assembly(self.batch_file), "hg38")
+
+    def test_batch_file_assembly_mixed(self):
+        self.batch_file.write_text(
+            "--analysis a.yml --sample p1.json --vcf p1.vcf --assembly GRCh37\n"
+            "--analysis a.yml --sample p2.json --vcf p2.vcf --assembly GRCh38\n"
+        )
+        self.assertIsNone(batch_file_assembly(self.batch_file))
+
+    def test_batch_file_assembly_phenotype_only(self):
+        self.batch_file.write_text("--sample p1.json --preset phenotype_only\n")
+        self.assertIsNone(batch_file_assembly(self.batch_file))
+
+
+class TestCreateBatchFile(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.phenopacket_dir = self.tmp_dir.joinpath("phenopackets")
+        self.phenopacket_dir.mkdir()
+        for phenopacket_name in ["patient_1", "patient_2"]:
+            self.phenopacket_dir.joinpath(f"{phenopacket_name}.json").write_text(
+                MessageToJson(phenopacket)
+            )
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmp_dir)
+
+    def test_create_batch_file_debug_samples(self):
+        create_batch_file(
+            environment="local",
+            analysis=None,
+            phenopacket_dir=self.phenopacket_dir,
+            vcf_dir=None,
+            output_dir=self.tmp_dir,
+            batch_prefix="RUN",
+            max_jobs=0,
+            variant_analysis=False,
+            results_dir=Path("/path/to/results_dir"),
+            exomiser_version="15.0.0",
+            output_formats=["PARQUET"],
+            debug_samples=["patient_2"],
+            debug_output_formats=["HTML", "PARQUET"],
+        )
+        self.assertEqual(
+            self.tmp_dir.joinpath("RUN-exomiser-batch.txt").read_text().splitlines(),
+            [
+                f"--sample {self.phenopacket_dir.joinpath('patient_1.json')} "
+                "--output-directory /path/to/results_dir --output-filename patient_1-exomiser "
+                "--preset phenotype_only --output-format PARQUET",
+                f"--sample {self.phenopacket_dir.joinpath('patient_2.json')} "
+                "--output-directory /path/to/results_dir --output-filename patient_2-exomiser "
+                "--preset phenotype_only --output-format HTML,PARQUET",
+            ],
+        )
+
+
+class TestVcfDirectoryIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self.vcf_dir = Path(tempfile.mkdtemp())
+        self.vcf_dir.joinpath("test_1.vcf.gz").touch()
+        self.vcf_directory_index = VcfDirectoryIndex.scan(self.vcf_dir)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.vcf_dir)
+
+    def test_scan_missing_directory(self):
+        self.assertFalse(VcfDirectoryIndex.scan(self.vcf_dir.joinpath("missing")).exists)
+
+    def test_resolve_gzipped(self):
+        self.assertEqual(
+            self.vcf_directory_index.resolve(Path("/path/to/phenopacket.json"), "test_1.vcf"),
+            self.vcf_dir.joinpath("test_1.vcf.gz"),
+        )
+        self.assertEqual(self.vcf_directory_index.missing, [])
+
+    def test_resolve_missing(self):
+        self.assertEqual(
+            self.vcf_directory_index.resolve(Path("/path/to/phenopacket.json"), "test_2.vcf"),
+            self.vcf_dir.joinpath("test_2.vcf"),
+        )
+        self.assertEqual(
+            self.vcf_directory_index.missing, [(Path("/path/to/phenopacket.json"), "test_2.vcf")]
+        )
+
+    def test_add_variant_analysis_arguments_with_index(self):
+        command_creator = CommandCreator(
+            environment="local",
+            phenopacket_path=Path("/path/to/phenopacket.json"),
+            phenopacket=phenopacket,
+            variant_analysis=True,
+            output_options_dir_files=None,
+            output_options_file=None,
+            raw_results_dir=Path("/path/to/results_dir"),
+            analysis_yaml=Path("/path/to/exomiser_analysis.yaml"),
+            output_formats=["JSON"],
+            vcf_directory_index=self.vcf_directory_index,
+        )
+        self.assertEqual(
+            command_creator.add_variant_analysis_arguments(self.vcf_dir).vcf_file,
+            self.vcf_dir.joinpath("test_1.vcf.gz"),
+        )
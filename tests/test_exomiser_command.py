@@ -0,0 +1,77 @@
+import unittest
+from pathlib import Path
+
+from pheval_exomiser.run.class_data_sharing import class_data_sharing_jvm_options
+from pheval_exomiser.run.exomiser_command import create_local_exomiser_command
+
+
+class TestCreateLocalExomiserCommand(unittest.TestCase):
+    def test_create_local_exomiser_command_pre_15(self):
+        self.assertEqual(
+            create_local_exomiser_command(
+                "14.0.0",
+                Path("/exomiser/exomiser-cli-14.0.0.jar"),
+                Path("/batch/RUN-exomiser-batch.txt"),
+                Path("/input/application.properties"),
+            ),
+            [
+                "java",
+                "-Xmx4g",
+                "-XX:+ExitOnOutOfMemoryError",
+                "-jar",
+                Path("/exomiser/exomiser-cli-14.0.0.jar"),
+                "--batch",
+                Path("/batch/RUN-exomiser-batch.txt"),
+                "--spring.config.location=/input/application.properties",
+            ],
+        )
+
+    def test_create_local_exomiser_command_without_heap(self):
+        self.assertIn(
+            "-Xmx4g",
+            create_local_exomiser_command(
+                "15.0.0",
+                Path("/exomiser/exomiser-cli-15.0.0.jar"),
+                Path("/batch/RUN-exomiser-batch.txt"),
+                Path("/input/application.properties"),
+                heap=None,
+            ),
+        )
+
+    def test_create_local_exomiser_command_class_data_sharing(self):
+        self.assertEqual(
+            create_local_exomiser_command(
+                "15.0.0",
+                Path("/exomiser/exomiser-cli-15.0.0.jar"),
+                Path("/batch/RUN-exomiser-batch.txt"),
+                Path("/input/application.properties"),
+                class_data_sharing_jvm_options(Path("/exomiser/exomiser-cli-15.0.0.jsa")),
+            ),
+            [
+                "java",
+                "-Xmx4g",
+                "-XX:+ExitOnOutOfMemoryError",
+                "-XX:SharedArchiveFile=/exomiser/exomiser-cli-15.0.0.jsa",
+                "-Xshare:auto",
+                "-Dspring.config.location=/input/application.properties",
+                "-jar",
+                Path("/exomiser/exomiser-cli-15.0.0.jar"),
+                "batch",
+                Path("/batch/RUN-exomiser-batch.txt"),
+            ],
+        )
+
+    def test_create_local_exomiser_command_heap(self):
+        self.assertEqual(
+            create_local_exomiser_command(
+                "15.0.0",
+                Path("/exomiser/exomiser-cli-15.0.0.jar"),
+                Path("/batch/RUN-exomiser-batch.txt"),
+                Path("/input/application.properties"),
+                heap="8g",
+            )[1],
+            "-Xmx8g",
+        )
+
+    def test_class_data_sharing_jvm_options_no_archive(self):
+        self.assertEqual(class_data_sharing_jvm_options(None), [])
@@ -0,0 +1,109 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import polars as pl
+from google.protobuf.json_format import MessageToJson
+
+from pheval_exomiser.post_process.post_process_results_format import (
+    extract_gene_results_from_parquet,
+    extract_variant_results_from_json,
+    extract_variant_results_from_parquet,
+    read_exomiser_result,
+)
+from pheval_exomiser.run.exomiser_command import create_local_exomiser_command
+from pheval_exomiser.run.fake_exomiser import (
+    CostModel,
+    SimulatedOutOfMemoryError,
+    causative_genes,
+    java_heap_megabytes,
+    parse_batch_command,
+    parse_java_arguments,
+    run_batch,
+)
+from tests.test_create_batch_commands import phenopacket
+
+
+class TestFakeExomiser(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.sample = self.tmp_dir.joinpath("patient_1.json")
+        self.sample.write_text(MessageToJson(phenopacket))
+        self.vcf = self.tmp_dir.joinpath("patient_1.vcf")
+        self.vcf.write_text("##fileformat=VCFv4.2\n")
+        self.cost_model = CostModel(startup_seconds=0, sample_seconds=0, genes=5)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmp_dir)
+
+    def write_batch_file(self, output_format: str) -> Path:
+        batch_file = self.tmp_dir.joinpath("batch.txt")
+        batch_file.write_text(
+            f"--sample {self.sample} --vcf {self.vcf} --assembly GRCh37 "
+            f"--output-filename patient_1-exomiser --output-directory {self.tmp_dir} "
+            f"--output-format {output_format}\n"
+        )
+        return batch_file
+
+    def test_parse_java_arguments(self):
+        batch_file = Path("batch.txt")
+        for exomiser_version, legacy_command_line in [("14.0.0", True), ("15.0.0", False)]:
+            arguments = create_local_exomiser_command(
+                exomiser_version, Path("exomiser.jar"), batch_file, Path("application.properties")
+            )
+            self.assertEqual(
+                parse_java_arguments([str(argument) for argument in arguments[1:]]),
+                (batch_file, legacy_command_line),
+            )
+
+    def test_parse_batch_command(self):
+        self.assertEqual(
+            parse_batch_command("--sample patient_1.json --output-filename patient_1-exomiser\n"),
+            {"sample": "patient_1.json", "output-filename": "patient_1-exomiser"},
+        )
+
+    def test_causative_genes(self):
+        self.assertEqual(
+            [gene["symbol"] for gene in causative_genes(self.sample)], ["FGD1", "RTTN"]
+        )
+
+    def test_sample_cost_jitter(self):
+        cost_model = CostModel(sample_seconds=1.0, jitter=0.5)
+        self.assertEqual(
+            cost_model.sample_cost("patient_1", 0), cost_model.sample_cost("patient_1", 0)
+        )
+        self.assertTrue(0.5 <= cost_model.sample_cost("patient_1", 0) <= 1.5)
+
+    def test_run_batch_parquet(self):
+        run_batch(self.write_batch_file("PARQUET,HTML"), False, self.cost_model)
+        raw_result = read_exomiser_result(self.tmp_dir.joinpath("patient_1-exomiser.parquet"), True)
+        self.assertIn(
+            "FGD1",
+            extract_gene_results_from_parquet(raw_result, "geneCombinedScore", True)[
+                "gene_symbol"
+            ].to_list(),
+        )
+        self.assertEqual(
+            extract_variant_results_from_parquet(raw_result, "geneCombinedScore").height, 12
+        )
+
+    def test_run_batch_json(self):
+        run_batch(self.write_batch_file("JSON"), True, self.cost_model)
+        raw_result = read_exomiser_result(self.tmp_dir.joinpath("patient_1-exomiser.json"), False)
+        variant_results = extract_variant_results_from_json(raw_result, "combinedScore")
+        self.assertEqual(variant_results.height, 12)
+        self.assertEqual(variant_results.schema["score"], pl.Float64)
+
+    def test_java_heap_megabytes(self):
+        self.assertEqual(java_heap_megabytes(["-Xmx4g", "-jar", "exomiser.jar"]), 4096)
+        self.assertIsNone(java_heap_megabytes(["-jar", "exomiser.jar"]))
+
+    def test_run_batch_out_of_memory(self):
+        cost_model = CostModel(
+            startup_seconds=0, sample_seconds=0, genes=5, heap_mb_per_sample=5000
+        )
+        with self.assertRaises(SimulatedOutOfMemoryError):
+            run_batch(self.write_batch_file("PARQUET"), False, cost_model, 4096)
+        run_batch(self.write_batch_file("PARQUET"), False, cost_model, 8192)
+        self.assertTrue(self.tmp_dir.joinpath("patient_1-exomiser.parquet").exists())
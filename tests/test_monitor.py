@@ -0,0 +1,96 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from pheval_exomiser.run.monitor import RunMonitor
+
+
+class TestRunMonitor(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.raw_results_dir = self.tmp_dir.joinpath("raw_results")
+        self.raw_results_dir.mkdir()
+        self.batch_file = self.tmp_dir.joinpath("RUN-exomiser-batch.txt")
+        self.batch_file.write_text(
+            "--sample /p/patient_1.json --output-filename patient_1-exomiser --preset phenotype_only\n"
+            "--sample /p/patient_2.json --output-filename patient_2-exomiser --preset phenotype_only\n"
+        )
+        self.run_monitor = RunMonitor(
+            batch_files=[self.batch_file],
+            raw_results_dir=self.raw_results_dir,
+            result_suffix=".parquet",
+            status_file=self.tmp_dir.joinpath("exomiser_run_status.json"),
+            refresh_seconds=0,
+        )
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmp_dir)
+
+    def test_status(self):
+        self.raw_results_dir.joinpath("patient_1-exomiser.parquet").touch()
+        self.raw_results_dir.joinpath("patient_1-exomiser.html").touch()
+        self.run_monitor.batch_started(self.batch_file)
+        run_status = self.run_monitor.status()
+        self.assertEqual(run_status.total_samples, 2)
+        self.assertEqual(run_status.completed_samples, 1)
+        self.assertEqual(run_status.batches[0]["state"], "running")
+        self.assertIsNotNone(run_status.eta_seconds)
+
+    def test_results_of_earlier_run_are_remaining(self):
+        earlier_result = self.raw_results_dir.joinpath("patient_1-exomiser.parquet")
+        earlier_result.touch()
+        os.utime(earlier_result, (1000.0, 1000.0))
+        self.run_monitor.batch_started(self.batch_file)
+        self.assertEqual(self.run_monitor.status().completed_samples, 0)
+        self.assertEqual(
+            self.run_monitor.remaining_output_filenames(self.batch_file),
+            ["patient_1-exomiser", "patient_2-exomiser"],
+        )
+        earlier_result.touch()
+        self.assertEqual(
+            self.run_monitor.remaining_output_filenames(self.batch_file), ["patient_2-exomiser"]
+        )
+
+    def test_status_no_completed_samples(self):
+        run_status = self.run_monitor.status()
+        self.assertEqual(run_status.completed_samples, 0)
+        self.assertEqual(run_status.batches[0]["state"], "pending")
+        self.assertIsNone(run_status.eta_seconds)
+
+    def test_refresh_writes_status_file(self):
+        with self.run_monitor:
+            self.run_monitor.batch_started(self.batch_file)
+            self.raw_results_dir.joinpath("patient_1-exomiser.parquet").touch()
+            self.raw_results_dir.joinpath("patient_2-exomiser.parquet").touch()
+            self.run_monitor.batch_finished(self.batch_file)
+        with open(self.tmp_dir.joinpath("exomiser_run_status.json")) as status_file:
+            run_status = json.load(status_file)
+        self.assertEqual(run_status["completed_samples"], 2)
+        self.assertEqual(run_status["eta_seconds"], 0.0)
+        self.assertEqual(run_status["batches"][0]["state"], "finished")
+
+    def test_worker_utilisation(self):
+        run_monitor = RunMonitor(
+            batch_files=[self.batch_file],
+            raw_results_dir=self.raw_results_dir,
+            result_suffix=".parquet",
+            status_file=self.tmp_dir.joinpath("exomiser_run_status.json"),
+            refresh_seconds=0,
+            workers=2,
+        )
+        run_monitor.started_at -= 10.0
+        run_monitor._workers_changed_at -= 10.0
+        run_monitor.worker_started()
+        run_status = run_monitor.status()
+        self.assertEqual((run_status.busy_workers, run_status.workers), (1, 2))
+        self.assertAlmostEqual(run_status.utilisation, 0.0, places=2)
+        self.assertIn("1/2 workers busy", run_status.status_line())
+        run_monitor.started_at -= 10.0
+        run_monitor._workers_changed_at -= 10.0
+        run_monitor.worker_released()
+        run_status = run_monitor.status()
+        self.assertEqual(run_status.busy_workers, 0)
+        self.assertAlmostEqual(run_status.utilisation, 0.25, places=2)
@@ -0,0 +1,159 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from pheval_exomiser.run.fake_exomiser import parse_batch_command
+from pheval_exomiser.run.monitor import RunMonitor
+from pheval_exomiser.run.oom_recovery import (
+    RETRY_DIRECTORY_NAME,
+    escalate_heap,
+    heap_megabytes,
+    is_out_of_memory,
+    retry_output_filename_groups,
+    write_retry_batch_files,
+)
+from pheval_exomiser.run.speculation import SpeculativeBatchRunner
+
+
+class OutOfMemoryBatchProcess:
+    """Writes the results of the samples of a batch file that fit in its heap, at 3 GB a sample."""
+
+    def __init__(self, batch_file: Path, heap: str):
+        self.batch_file = batch_file
+        self.samples_fitting = int(heap_megabytes(heap) // 3072)
+        self.out_of_memory = False
+
+    def wait(self) -> int:
+        with open(self.batch_file) as batch:
+            commands = batch.readlines()
+        for command in commands[: self.samples_fitting]:
+            options = parse_batch_command(command)
+            Path(options["output-directory"]).joinpath(
+                f"{options['output-filename']}.parquet"
+            ).touch()
+        self.out_of_memory = len(commands) > self.samples_fitting
+        return 1 if self.out_of_memory else 0
+
+    def kill(self) -> None:
+        pass
+
+
+class TestOutOfMemoryRecovery(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.raw_results_dir = self.tmp_dir.joinpath("raw_results")
+        self.raw_results_dir.mkdir()
+        self.batch_file = self.tmp_dir.joinpath("RUN-exomiser-batch-1.txt")
+        self.batch_file.write_text(
+            "".join(
+                f"--sample /p/patient_{sample}.json --output-directory {self.raw_results_dir} "
+                f"--output-filename patient_{sample}-exomiser\n"
+                for sample in range(6)
+            )
+        )
+        self.run_monitor = RunMonitor(
+            batch_files=[self.batch_file],
+            raw_results_dir=self.raw_results_dir,
+            result_suffix=".parquet",
+            status_file=self.tmp_dir.joinpath("exomiser_run_status.json"),
+            refresh_seconds=0,
+        )
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmp_dir)
+
+    def test_heap_megabytes(self):
+        self.assertEqual(heap_megabytes("4g"), 4096)
+        self.assertEqual(heap_megabytes("512M"), 512)
+        with self.assertRaises(ValueError):
+            heap_megabytes("four gigabytes")
+
+    def test_escalate_heap(self):
+        self.assertEqual(escalate_heap("4g", "16g"), "8g")
+        self.assertEqual(escalate_heap("12g", "16g"), "16g")
+        self.assertIsNone(escalate_heap("16g", "16g"))
+        self.assertIsNone(escalate_heap("4g", None))
+
+    def test_is_out_of_memory(self):
+        self.assertTrue(is_out_of_memory(3, False))
+        self.assertTrue(is_out_of_memory(1, True))
+        self.assertFalse(is_out_of_memory(1, False))
+
+    def test_retry_output_filename_groups(self):
+        self.assertEqual(retry_output_filename_groups(["a", "b", "c"], False), [["a", "b", "c"]])
+        self.assertEqual(retry_output_filename_groups(["a", "b", "c"], True), [["a", "b"], ["c"]])
+
+    def test_write_retry_batch_files(self):
+        retry_batch_files = write_retry_batch_files(
+            self.batch_file,
+            [["patient_4-exomiser"], ["patient_5-exomiser"]],
+            self.raw_results_dir.joinpath(RETRY_DIRECTORY_NAME, "RUN-exomiser-batch-1-retry-1"),
+        )
+        self.assertEqual(
+            [retry_batch_file.name for retry_batch_file in retry_batch_files],
+            ["RUN-exomiser-batch-1-retry-1-1.txt", "RUN-exomiser-batch-1-retry-1-2.txt"],
+        )
+        self.assertEqual(
+            parse_batch_command(retry_batch_files[1].read_text())["output-filename"],
+            "patient_5-exomiser",
+        )
+
+    def run_batches(self, max_heap: str, oom_retries: int) -> list:
+        launched = []
+
+        def launch(batch_file, span, heap):
+            launched.append((batch_file.name, heap))
+            return OutOfMemoryBatchProcess(batch_file, heap)
+
+        SpeculativeBatchRunner(
+            batch_files=[self.batch_file],
+            launch=launch,
+            span_attributes=lambda batch_file: {},
+            span_name="exomiser_jvm",
+            workers=1,
+            run_monitor=self.run_monitor,
+            straggler_factor=0,
+            heap="4g",
+            max_heap=max_heap,
+            oom_retries=oom_retries,
+            check_seconds=0.01,
+        ).run()
+        return launched
+
+    def test_out_of_memory_retried_with_larger_heap_then_smaller_batches(self):
+        launched = self.run_batches(max_heap="8g", oom_retries=3)
+        self.assertEqual(
+            launched,
+            [
+                ("RUN-exomiser-batch-1.txt", "4g"),
+                ("RUN-exomiser-batch-1-retry-1-1.txt", "8g"),
+                ("RUN-exomiser-batch-1-retry-2-1.txt", "8g"),
+                ("RUN-exomiser-batch-1-retry-2-2.txt", "8g"),
+            ],
+        )
+        self.assertEqual(self.run_monitor.remaining_output_filenames(self.batch_file), [])
+        self.assertEqual(
+            self.run_monitor.status().batches[0]["escalations"],
+            [
+                {"retry": 1, "heap": "8g", "batches": 1, "samples": 5},
+                {"retry": 2, "heap": "8g", "batches": 2, "samples": 3},
+            ],
+        )
+        self.assertFalse(self.raw_results_dir.joinpath(RETRY_DIRECTORY_NAME).exists())
+
+    def test_samples_with_results_of_earlier_run_retried(self):
+        for sample in range(6):
+            earlier_result = self.raw_results_dir.joinpath(f"patient_{sample}-exomiser.parquet")
+            earlier_result.touch()
+            os.utime(earlier_result, (1000.0, 1000.0))
+        launched = self.run_batches(max_heap="8g", oom_retries=3)
+        self.assertEqual(len(launched), 4)
+        self.assertEqual(self.run_monitor.remaining_output_filenames(self.batch_file), [])
+
+    def test_out_of_memory_retries_are_limited(self):
+        launched = self.run_batches(max_heap="16g", oom_retries=1)
+        self.assertEqual(len(launched), 2)
+        self.assertEqual(len(self.run_monitor.remaining_output_filenames(self.batch_file)), 3)
+        self.assertEqual(self.run_monitor.batches[self.batch_file].state, "finished")
@@ -0,0 +1,80 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from google.protobuf.json_format import MessageToJson
+
+from pheval_exomiser.prepare.create_batch_commands import create_command_arguments
+from pheval_exomiser.prepare.phenopacket_index import PhenopacketIndex
+from tests.test_create_batch_commands import phenopacket
+
+
+class TestPhenopacketIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = Path(tempfile.mkdtemp()).resolve()
+        self.phenopacket_dir = self.tmp_dir.joinpath("phenopackets")
+        self.phenopacket_dir.mkdir()
+        for phenopacket_name in ["patient_1", "patient_2"]:
+            self.phenopacket_dir.joinpath(f"{phenopacket_name}.json").write_text(
+                MessageToJson(phenopacket)
+            )
+        self.index_path = self.tmp_dir.joinpath("phenopacket_index.sqlite")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmp_dir)
+
+    def test_update(self):
+        with PhenopacketIndex(self.index_path) as index:
+            phenopacket_metadata = index.update(self.phenopacket_dir)
+        self.assertEqual(
+            [metadata.path for metadata in phenopacket_metadata],
+            [
+                str(self.phenopacket_dir.joinpath("patient_1.json")),
+                str(self.phenopacket_dir.joinpath("patient_2.json")),
+            ],
+        )
+        self.assertEqual(phenopacket_metadata[0].vcf_uri, phenopacket.files[0].uri)
+        self.assertEqual(phenopacket_metadata[0].vcf_assembly, "GRCh37")
+        self.assertEqual(phenopacket_metadata[0].hpo_count, 5)
+
+    def test_update_unchanged_does_not_reparse(self):
+        with PhenopacketIndex(self.index_path) as index:
+            index.update(self.phenopacket_dir)
+        with (
+            patch(
+                "pheval_exomiser.prepare.phenopacket_index.phenopacket_reader"
+            ) as phenopacket_reader,
+            PhenopacketIndex(self.index_path) as index,
+        ):
+            index.update(self.phenopacket_dir)
+        phenopacket_reader.assert_not_called()
+
+    def test_update_changed_and_removed(self):
+        with PhenopacketIndex(self.index_path) as index:
+            index.update(self.phenopacket_dir)
+        self.phenopacket_dir.joinpath("patient_2.json").unlink()
+        changed_phenopacket = type(phenopacket)()
+        changed_phenopacket.CopyFrom(phenopacket)
+        changed_phenopacket.files[0].uri = "test/path/to/changed.vcf"
+        self.phenopacket_dir.joinpath("patient_1.json").write_text(
+            MessageToJson(changed_phenopacket)
+        )
+        with PhenopacketIndex(self.index_path) as index:
+            phenopacket_metadata = index.update(self.phenopacket_dir)
+        self.assertEqual(len(phenopacket_metadata), 1)
+        self.assertEqual(phenopacket_metadata[0].vcf_uri, "test/path/to/changed.vcf")
+
+    def test_create_command_arguments_from_index(self):
+        arguments = dict(
+            environment="local",
+            phenopacket_dir=self.phenopacket_dir,
+            phenotype_only=True,
+            vcf_dir=self.tmp_dir.joinpath("vcf"),
+            results_dir=Path("/path/to/results_dir"),
+        )
+        self.assertEqual(
+            create_command_arguments(**arguments, phenopacket_index=self.index_path),
+            create_command_arguments(**arguments),
+        )
@@ -0,0 +1,77 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from google.protobuf.json_format import MessageToJson
+from pheval.utils.phenopacket_utils import phenopacket_reader
+
+from pheval_exomiser.post_process.phenopacket_session import PhenopacketSession
+from pheval_exomiser.post_process.post_process_results_format import (
+    create_empty_pheval_results,
+    create_rankings,
+)
+from tests.test_create_batch_commands import phenopacket
+
+
+class TestPhenopacketSession(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.phenopacket_dir = self.tmp_dir.joinpath("phenopackets")
+        self.phenopacket_dir.mkdir()
+        for phenopacket_name in ["patient_1", "patient_2"]:
+            self.phenopacket_dir.joinpath(f"{phenopacket_name}.json").write_text(
+                MessageToJson(phenopacket)
+            )
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmp_dir)
+
+    def test_load_all(self):
+        with patch(
+            "pheval_exomiser.post_process.phenopacket_session.phenopacket_reader",
+            side_effect=phenopacket_reader,
+        ) as mock_reader:
+            phenopacket_session = PhenopacketSession(self.phenopacket_dir).load_all()
+            phenopacket_session.classified_gene("patient_1")
+            phenopacket_session.classified_variant("patient_1")
+        self.assertEqual(mock_reader.call_count, 2)
+
+    def test_load_all_parallel(self):
+        self.assertEqual(
+            PhenopacketSession(self.phenopacket_dir)
+            .load_all(max_workers=2)
+            .classified_gene("patient_2")["gene_symbol"]
+            .to_list(),
+            PhenopacketSession(self.phenopacket_dir)
+            .classified_gene("patient_2")["gene_symbol"]
+            .to_list(),
+        )
+
+    def test_create_empty_pheval_results_parses_once(self):
+        with patch(
+            "pheval_exomiser.post_process.phenopacket_session.phenopacket_reader",
+            side_effect=phenopacket_reader,
+        ) as mock_reader:
+            create_empty_pheval_results(
+                create_rankings(self.tmp_dir.joinpath("output"), "combinedScore", "descending"),
+                self.phenopacket_dir,
+                gene_analysis=True,
+                disease_analysis=True,
+                variant_analysis=True,
+            )
+        self.assertEqual(mock_reader.call_count, 2)
+        for result_type in ["gene", "variant", "disease"]:
+            self.assertEqual(
+                sorted(
+                    result.name
+                    for result in self.tmp_dir.joinpath(
+                        "output", f"pheval_{result_type}_results"
+                    ).iterdir()
+                ),
+                [
+                    f"patient_1-{result_type}_result.parquet",
+                    f"patient_2-{result_type}_result.parquet",
+                ],
+            )
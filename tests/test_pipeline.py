@@ -0,0 +1,145 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import polars as pl
+
+from pheval_exomiser.post_process.pipeline import (
+    PIPELINED_RESULTS_FILE_NAME,
+    PipelinedPostProcessor,
+    is_complete_raw_result,
+    read_pipelined_results,
+)
+from pheval_exomiser.post_process.post_process import post_process_result_format
+from pheval_exomiser.post_process.raw_result_catalog import RawResultCatalog, catalog_raw_result
+from tests.test_sweep import sweep_configurations
+
+
+class TestIsCompleteRawResult(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmp_dir)
+
+    def test_complete_parquet(self):
+        parquet = self.tmp_dir.joinpath("patient_1-exomiser.parquet")
+        pl.DataFrame({"geneSymbol": ["FGD1"]}).write_parquet(parquet)
+        self.assertTrue(is_complete_raw_result(parquet))
+
+    def test_incomplete_parquet(self):
+        parquet = self.tmp_dir.joinpath("patient_1-exomiser.parquet")
+        pl.DataFrame({"geneSymbol": ["FGD1"]}).write_parquet(parquet)
+        parquet.write_bytes(parquet.read_bytes()[:-8])
+        self.assertFalse(is_complete_raw_result(parquet))
+
+    def test_complete_json(self):
+        json_result = self.tmp_dir.joinpath("patient_1-exomiser.json")
+        json_result.write_text('[{"geneSymbol": "FGD1"}]\n')
+        self.assertTrue(is_complete_raw_result(json_result))
+
+    def test_incomplete_json(self):
+        json_result = self.tmp_dir.joinpath("patient_1-exomiser.json")
+        json_result.write_text('[{"geneSymbol": "FGD1"}, {"geneSym')
+        self.assertFalse(is_complete_raw_result(json_result))
+
+
+class TestPipelinedPostProcessor(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.raw_results_dir = self.tmp_dir.joinpath("raw_results")
+        self.raw_results_dir.mkdir()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmp_dir)
+
+    def pipelined_post_processor(self, standardised: list) -> PipelinedPostProcessor:
+        return PipelinedPostProcessor(
+            raw_results_dir=self.raw_results_dir,
+            result_suffix=".json",
+            output_dir=self.tmp_dir,
+            standardise=lambda raw_result_path: standardised.append(raw_result_path.name),
+        )
+
+    def test_pipelined_post_processor(self):
+        standardised = []
+        with self.pipelined_post_processor(standardised):
+            self.raw_results_dir.joinpath("patient_1-exomiser.json").write_text("[]")
+            self.raw_results_dir.joinpath("patient_2-exomiser.json").write_text("[{")
+            self.raw_results_dir.joinpath("patient_3-exomiser.html").write_text("<html>")
+        self.assertEqual(standardised, ["patient_1-exomiser.json"])
+        self.assertEqual(read_pipelined_results(self.tmp_dir), {"patient_1-exomiser.json"})
+
+    def test_results_of_earlier_run_left_to_post_processing(self):
+        standardised = []
+        earlier_result = self.raw_results_dir.joinpath("patient_1-exomiser.json")
+        earlier_result.write_text("[]")
+        os.utime(earlier_result, (1000.0, 1000.0))
+        catalog = RawResultCatalog(self.raw_results_dir)
+        catalog.record([catalog_raw_result(self.raw_results_dir, "patient_1-exomiser.json")])
+        os.utime(catalog.path, (1000.0, 1000.0))
+        with self.pipelined_post_processor(standardised):
+            self.raw_results_dir.joinpath("patient_2-exomiser.json").write_text("[]")
+        self.assertEqual(standardised, ["patient_2-exomiser.json"])
+
+    def test_rewritten_results_submitted_again(self):
+        standardised = []
+        raw_result = self.raw_results_dir.joinpath("patient_1-exomiser.json")
+        with self.pipelined_post_processor(standardised) as pipelined_post_processor:
+            raw_result.write_text("[]")
+            pipelined_post_processor.submit_completed_results()
+            pipelined_post_processor.submit_completed_results()
+            raw_result.write_text('[{"geneSymbol": "FGD1"}]')
+        self.assertEqual(standardised, ["patient_1-exomiser.json", "patient_1-exomiser.json"])
+
+    def test_results_of_earlier_run_cleared(self):
+        self.tmp_dir.joinpath(PIPELINED_RESULTS_FILE_NAME).write_text("patient_1-exomiser.json\n")
+        with PipelinedPostProcessor(
+            raw_results_dir=self.raw_results_dir,
+            result_suffix=".json",
+            output_dir=self.tmp_dir,
+            standardise=lambda raw_result_path: None,
+        ):
+            pass
+        self.assertEqual(read_pipelined_results(self.tmp_dir), set())
+
+    def test_read_pipelined_results_none(self):
+        self.assertEqual(read_pipelined_results(self.tmp_dir), set())
+
+
+class TestPostProcessPipelinedResults(unittest.TestCase):
+    def setUp(self) -> None:
+        self.output_dir = Path(tempfile.mkdtemp())
+        self.output_dir.joinpath(PIPELINED_RESULTS_FILE_NAME).write_text(
+            "patient_1-exomiser.json\n"
+        )
+        self.config = sweep_configurations()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.output_dir)
+
+    def excluded_result_files(self):
+        with patch(
+            "pheval_exomiser.post_process.post_process.create_standardised_results"
+        ) as create_standardised_results:
+            post_process_result_format(
+                self.config,
+                self.output_dir,
+                self.output_dir,
+                self.output_dir,
+                True,
+                True,
+                False,
+                "15.0.0",
+            )
+        return create_standardised_results.call_args.kwargs["exclude_result_files"]
+
+    def test_pipelined_results_excluded_in_pipelined_run(self):
+        self.config.post_process.pipelined = True
+        self.assertEqual(self.excluded_result_files(), {"patient_1-exomiser.json"})
+
+    def test_pipelined_results_ignored_otherwise(self):
+        self.assertIsNone(self.excluded_result_files())
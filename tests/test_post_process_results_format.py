@@ -1,12 +1,27 @@
+import json
+import shutil
+import tempfile
 import unittest
+from pathlib import Path
 
 import polars as pl
+from google.protobuf.json_format import MessageToJson
+from pheval.post_processing.post_processing import SortOrder
 
 from pheval_exomiser.post_process.post_process_results_format import (
+    VARIANT_KEY_COLUMNS,
+    Ranking,
+    compact_variant_results,
+    create_rankings,
+    create_standardised_results,
     extract_disease_results_from_json,
+    extract_disease_results_from_parquet,
     extract_gene_results_from_json,
     extract_variant_results_from_json,
+    extract_variant_results_from_parquet,
+    pheval_result_dtypes,
 )
+from tests.test_create_batch_commands import phenopacket
 
 example_exomiser_result = pl.DataFrame(
     [
@@ -2496,6 +2511,71 @@ class TestExtractVariantResults(unittest.TestCase):
             )
         )
 
+    def test_extract_variant_results_compact_dtypes(self):
+        compact_variant_results = extract_variant_results_from_json(
+            example_exomiser_result, "combinedScore", compact_dtypes=True
+        )
+        self.assertEqual(compact_variant_results["chrom"].dtype, pl.Categorical)
+        self.assertEqual(compact_variant_results["grouping_id"].dtype, pl.UInt32)
+        self.assertEqual(compact_variant_results["grouping_id"].to_list(), [1, 2, 2])
+        self.assertTrue(
+            pheval_result_dtypes(compact_variant_results)
+            .drop("modeOfInheritance")
+            .equals(
+                extract_variant_results_from_json(example_exomiser_result, "combinedScore").drop(
+                    "modeOfInheritance"
+                )
+            )
+        )
+
+    def test_compact_variant_results_null_mode_of_inheritance_grouped_as_dominant(self):
+        variant_results = pl.DataFrame(
+            {
+                "geneSymbol": ["FGD1", "RTTN"],
+                "chrom": ["X", "18"],
+                "start": [54496148, 70253193],
+                "end": [54496148, 70253193],
+                "ref": ["C", "G"],
+                "alt": ["T", "A"],
+                "score": [0.5, 0.5],
+                "modeOfInheritance": [None, None],
+            },
+            schema_overrides={"modeOfInheritance": pl.String},
+        )
+        self.assertEqual(
+            compact_variant_results(variant_results, "modeOfInheritance")["grouping_id"].to_list(),
+            [2, 1],
+        )
+
+    def test_compact_variant_results_written_as_default_grouping(self):
+        exomiser_parquet_result = pl.DataFrame(
+            {
+                "geneSymbol": ["GENE1", "GENE2", "GENE2", "GENE3"],
+                "contigName": ["2", "10", "10", "2"],
+                "start": [9, 100, 200, 100],
+                "end": [9, 100, 200, 100],
+                "ref": ["C", "G", "T", "A"],
+                "alt": ["T", "A", "C", "G"],
+                "combinedScore": [0.5, 0.25, 0.25, 0.5],
+                "moi": ["AUTOSOMAL_DOMINANT", "AUTOSOMAL_RECESSIVE", "AUTOSOMAL_RECESSIVE", None],
+                "isContributingVariant": [True, True, True, True],
+            },
+            schema_overrides={"moi": pl.String},
+        )
+        self.assertTrue(
+            pheval_result_dtypes(
+                extract_variant_results_from_parquet(
+                    exomiser_parquet_result, "combinedScore", compact_dtypes=True
+                )
+            )
+            .drop("moi")
+            .equals(
+                extract_variant_results_from_parquet(
+                    exomiser_parquet_result, "combinedScore"
+                ).select(VARIANT_KEY_COLUMNS + ["score", "grouping_id"])
+            )
+        )
+
 
 class TestExtractDiseaseResults(unittest.TestCase):
     def test_extract_disease_results(self):
@@ -2509,3 +2589,198 @@ class TestExtractDiseaseResults(unittest.TestCase):
                 )
             )
         )
+
+    def test_extract_disease_results_from_parquet(self):
+        fgd1_disease_matches = [
+            {"diseaseId": "ORPHA:25", "score": 0.9},
+            {"diseaseId": "OMIM:231670", "score": 0.8},
+        ]
+        exomiser_parquet_result = pl.DataFrame(
+            [
+                {
+                    "geneSymbol": "FGD1",
+                    "ensemblGeneId": "ENSG00000102302",
+                    "diseaseMatches": fgd1_disease_matches,
+                },
+                {
+                    "geneSymbol": "FGD1",
+                    "ensemblGeneId": "ENSG00000102302",
+                    "diseaseMatches": fgd1_disease_matches,
+                },
+                {
+                    "geneSymbol": "RTTN",
+                    "ensemblGeneId": "ENSG00000176225",
+                    "diseaseMatches": [
+                        {"diseaseId": "OMIM:231670", "score": 0.85},
+                        {"diseaseId": "OMIM:614833", "score": 0.4},
+                    ],
+                },
+            ]
+        )
+        self.assertEqual(
+            extract_disease_results_from_parquet(exomiser_parquet_result).rows(),
+            [("ORPHA:25", 0.9), ("OMIM:231670", 0.85), ("OMIM:614833", 0.4)],
+        )
+
+
+class TestCreateRankings(unittest.TestCase):
+    def test_create_rankings(self):
+        self.assertEqual(
+            create_rankings(
+                Path("/output"), "combinedScore", "DESCENDING", [("pValue", "ascending")]
+            ),
+            [
+                Ranking("combinedScore", SortOrder.DESCENDING, Path("/output")),
+                Ranking("pValue", SortOrder.ASCENDING, Path("/output/pValue_ascending")),
+            ],
+        )
+
+
+class TestCreateStandardisedResults(unittest.TestCase):
+    def setUp(self) -> None:
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.results_dir = self.test_dir.joinpath("raw_results")
+        self.results_dir.mkdir()
+        self.results_dir.joinpath("patient_1-exomiser.json").write_text(
+            json.dumps(
+                [
+                    {
+                        "geneSymbol": "FGD1",
+                        "geneIdentifier": {"geneId": "ENSG00000102302"},
+                        "combinedScore": 0.9,
+                        "pValue": 0.2,
+                    },
+                    {
+                        "geneSymbol": "RTTN",
+                        "geneIdentifier": {"geneId": "ENSG00000176225"},
+                        "combinedScore": 0.1,
+                        "pValue": 0.01,
+                    },
+                ]
+            )
+        )
+        self.phenopacket_dir = self.test_dir.joinpath("phenopackets")
+        self.phenopacket_dir.mkdir()
+        self.phenopacket_dir.joinpath("patient_1.json").write_text(MessageToJson(phenopacket))
+        self.output_dir = self.test_dir.joinpath("output")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def test_create_standardised_results_additional_rankings(self):
+        create_standardised_results(
+            result_dir=self.results_dir,
+            output_dir=self.output_dir,
+            phenopacket_dir=self.phenopacket_dir,
+            score_name="combinedScore",
+            sort_order="descending",
+            gene_analysis=True,
+            disease_analysis=False,
+            variant_analysis=False,
+            exomiser_version="14.0.0",
+            additional_rankings=[("pValue", "ascending")],
+        )
+        self.assertEqual(
+            pl.read_parquet(
+                self.output_dir.joinpath("pheval_gene_results", "patient_1-gene_result.parquet")
+            )["gene_symbol"].to_list(),
+            ["FGD1", "RTTN"],
+        )
+        self.assertEqual(
+            pl.read_parquet(
+                self.output_dir.joinpath(
+                    "pValue_ascending", "pheval_gene_results", "patient_1-gene_result.parquet"
+                )
+            )["gene_symbol"].to_list(),
+            ["RTTN", "FGD1"],
+        )
+
+    def test_create_standardised_results_vectorised_engine_ties(self):
+        for sample in ["patient_1", "patient_2", "patient_3"]:
+            self.results_dir.joinpath(f"{sample}-exomiser.json").write_text(
+                json.dumps(
+                    [
+                        {
+                            "geneSymbol": f"GENE{gene}",
+                            "geneIdentifier": {"geneId": f"ENSG{gene:011d}"},
+                            "combinedScore": (gene * 7 % 5) / 10,
+                            "pValue": (gene * 3 % 4) / 100,
+                        }
+                        for gene in range(200)
+                    ]
+                    + [
+                        {
+                            "geneSymbol": "FGD1",
+                            "geneIdentifier": {"geneId": "ENSG00000102302"},
+                            "combinedScore": 0.2,
+                            "pValue": 0.01,
+                        }
+                    ]
+                )
+            )
+            self.phenopacket_dir.joinpath(f"{sample}.json").write_text(MessageToJson(phenopacket))
+        for engine in ["per_file", "vectorised"]:
+            create_standardised_results(
+                result_dir=self.results_dir,
+                output_dir=self.output_dir.joinpath(engine),
+                phenopacket_dir=self.phenopacket_dir,
+                score_name="combinedScore",
+                sort_order="descending",
+                gene_analysis=True,
+                disease_analysis=False,
+                variant_analysis=False,
+                exomiser_version="14.0.0",
+                additional_rankings=[("pValue", "ascending")],
+                engine=engine,
+            )
+        for ranking_dir in [Path(), Path("pValue_ascending")]:
+            for sample in ["patient_1", "patient_2", "patient_3"]:
+                result_file = ranking_dir.joinpath(
+                    "pheval_gene_results", f"{sample}-gene_result.parquet"
+                )
+                self.assertTrue(
+                    pl.read_parquet(self.output_dir.joinpath("vectorised", result_file)).equals(
+                        pl.read_parquet(self.output_dir.joinpath("per_file", result_file))
+                    )
+                )
+
+    def test_create_standardised_results_vectorised_engine(self):
+        self.results_dir.joinpath("patient_2-exomiser.json").write_text(
+            json.dumps(
+                [
+                    {
+                        "geneSymbol": "RTTN",
+                        "geneIdentifier": {"geneId": "ENSG00000176225"},
+                        "combinedScore": 0.5,
+                        "pValue": 0.01,
+                    },
+                    {
+                        "geneSymbol": "FGD1",
+                        "geneIdentifier": {"geneId": "ENSG00000102302"},
+                        "combinedScore": 0.5,
+                        "pValue": 0.2,
+                    },
+                ]
+            )
+        )
+        self.phenopacket_dir.joinpath("patient_2.json").write_text(MessageToJson(phenopacket))
+        for engine in ["per_file", "vectorised"]:
+            create_standardised_results(
+                result_dir=self.results_dir,
+                output_dir=self.output_dir.joinpath(engine),
+                phenopacket_dir=self.phenopacket_dir,
+                score_name="combinedScore",
+                sort_order="descending",
+                gene_analysis=True,
+                disease_analysis=False,
+                variant_analysis=False,
+                exomiser_version="14.0.0",
+                engine=engine,
+            )
+        for sample in ["patient_1", "patient_2"]:
+            result_file = Path("pheval_gene_results", f"{sample}-gene_result.parquet")
+            self.assertTrue(
+                pl.read_parquet(self.output_dir.joinpath("vectorised", result_file)).equals(
+                    pl.read_parquet(self.output_dir.joinpath("per_file", result_file))
+                )
+            )
@@ -0,0 +1,97 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from pheval_exomiser.prepare.preflight import (
+    PreflightProblem,
+    PreflightValidationError,
+    preflight_application_properties,
+    resolve_placeholders,
+    validate_application_properties,
+)
+from pheval_exomiser.prepare.tool_specific_configuration_options import (
+    ApplicationProperties,
+    ExomiserConfigurations,
+    PostProcessing,
+)
+from pheval_exomiser.prepare.write_application_properties import (
+    ExomiserConfigurationFileWriter,
+    write_assembly_application_properties,
+)
+
+
+class TestResolvePlaceholders(unittest.TestCase):
+    def test_resolve_placeholders(self):
+        self.assertEqual(
+            resolve_placeholders(
+                "${exomiser.data-directory}/cadd/${cadd.version}/hg19/InDels.tsv.gz",
+                {"exomiser.data-directory": "/data", "cadd.version": "1.4"},
+            ),
+            "/data/cadd/1.4/hg19/InDels.tsv.gz",
+        )
+
+    def test_resolve_unknown_placeholder(self):
+        self.assertEqual(
+            resolve_placeholders("${remm.version}/ReMM.tsv.gz", {}), "${remm.version}/ReMM.tsv.gz"
+        )
+
+
+class TestPreflight(unittest.TestCase):
+    def setUp(self) -> None:
+        self.input_dir = Path(tempfile.mkdtemp())
+        configurations = ExomiserConfigurations(
+            environment="local",
+            exomiser_software_directory="exomiser-cli-15.0.0",
+            analysis_configuration_file=None,
+            max_jobs=0,
+            application_properties=ApplicationProperties(
+                cadd_version="1.4",
+                hg19_data_version="2512",
+                hg19_local_frequency_path="local_frequency_test_hg19.tsv.gz",
+                phenotype_data_version="2512",
+            ),
+            post_process=PostProcessing(score_name="geneCombinedScore", sort_order="descending"),
+        )
+        ExomiserConfigurationFileWriter(
+            input_dir=self.input_dir, configurations=configurations
+        ).write_application_properties()
+        write_assembly_application_properties(self.input_dir, configurations)
+        self.input_dir.joinpath("2512_hg19").mkdir()
+        self.input_dir.joinpath("2512_phenotype").mkdir()
+        self.input_dir.joinpath("local").mkdir()
+        self.input_dir.joinpath("local", "local_frequency_test_hg19.tsv.gz").touch()
+        self.cadd_dir = self.input_dir.joinpath("cadd", "1.4", "hg19")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.input_dir)
+
+    def test_preflight_application_properties(self):
+        self.assertEqual(
+            preflight_application_properties(self.input_dir.joinpath("application.properties")),
+            [
+                PreflightProblem(
+                    "application.properties",
+                    "exomiser.hg19.cadd-in-del-path",
+                    str(self.cadd_dir.joinpath("InDels.tsv.gz")),
+                    "does not exist",
+                ),
+                PreflightProblem(
+                    "application.properties",
+                    "exomiser.hg19.cadd-snv-path",
+                    str(self.cadd_dir.joinpath("whole_genome_SNVs.tsv.gz")),
+                    "does not exist",
+                ),
+            ],
+        )
+
+    def test_validate_application_properties(self):
+        with self.assertRaises(PreflightValidationError) as error:
+            validate_application_properties(self.input_dir, "local")
+        self.assertEqual(len(error.exception.problems), 2)
+
+    def test_validate_application_properties_passes(self):
+        self.cadd_dir.mkdir(parents=True)
+        self.cadd_dir.joinpath("whole_genome_SNVs.tsv.gz").touch()
+        self.cadd_dir.joinpath("InDels.tsv.gz").touch()
+        validate_application_properties(self.input_dir, "local")
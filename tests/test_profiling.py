@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import polars as pl
+
+from pheval_exomiser.profiling import (
+    PROFILE_DUMP_DIR_NAME,
+    PROFILE_ENVIRONMENT_VARIABLE,
+    PROFILE_SUMMARY_FILE_NAME,
+    StageProfiler,
+    disable_profiling,
+    profile_command,
+    profile_mode,
+    profile_stage,
+)
+
+
+class TestProfileMode(unittest.TestCase):
+    def test_profile_mode_option(self):
+        self.assertEqual(profile_mode("cprofile"), "cprofile")
+
+    def test_profile_mode_environment(self):
+        with patch.dict(os.environ, {PROFILE_ENVIRONMENT_VARIABLE: "1"}):
+            self.assertEqual(profile_mode(), "timers")
+        with patch.dict(os.environ, {PROFILE_ENVIRONMENT_VARIABLE: "0"}):
+            self.assertIsNone(profile_mode())
+
+    def test_profile_mode_unknown(self):
+        with self.assertRaises(ValueError):
+            profile_mode("perf")
+
+
+class TestStageProfiler(unittest.TestCase):
+    def setUp(self) -> None:
+        self.output_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.output_dir)
+
+    def test_nested_stages(self):
+        profiler = StageProfiler("timers", self.output_dir)
+        with profiler.stage("post_process"):
+            for _ in range(3):
+                with profiler.stage("extraction"):
+                    pass
+        self.assertEqual(list(profiler.timings), ["post_process/extraction", "post_process"])
+        self.assertEqual(profiler.timings["post_process/extraction"].calls, 3)
+
+    def test_write_summary(self):
+        profiler = StageProfiler("timers", self.output_dir)
+        with profiler.stage("run"):
+            pass
+        summary = pl.read_csv(profiler.write_summary(), separator="\t")
+        self.assertEqual(summary["stage"].to_list(), ["run"])
+        self.assertEqual(summary["calls"].to_list(), [1])
+
+
+class TestProfileCommand(unittest.TestCase):
+    def setUp(self) -> None:
+        self.output_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self) -> None:
+        disable_profiling()
+        shutil.rmtree(self.output_dir)
+
+    def test_profile_command_disabled(self):
+        with patch.dict(os.environ, {PROFILE_ENVIRONMENT_VARIABLE: ""}):
+            with profile_command("run", self.output_dir):
+                with profile_stage("exomiser_jvm"):
+                    pass
+        self.assertFalse(self.output_dir.joinpath(PROFILE_SUMMARY_FILE_NAME).exists())
+
+    def test_profile_command_cprofile(self):
+        with profile_command("prepare", self.output_dir, "cprofile"):
+            with profile_stage("batch_writing"):
+                pass
+        with profile_command("run", self.output_dir, "cprofile"):
+            pass
+        summary = pl.read_csv(self.output_dir.joinpath(PROFILE_SUMMARY_FILE_NAME), separator="\t")
+        self.assertEqual(summary["stage"].to_list(), ["prepare/batch_writing", "prepare", "run"])
+        self.assertTrue(self.output_dir.joinpath(PROFILE_DUMP_DIR_NAME, "prepare.prof").exists())
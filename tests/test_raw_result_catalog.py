@@ -0,0 +1,213 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import polars as pl
+
+from pheval_exomiser.post_process.raw_result_catalog import (
+    COMPLETE,
+    INCOMPLETE,
+    MISSING,
+    RAW_RESULT_CATALOG_FILE_NAME,
+    RawResultCatalog,
+    RawResultEntry,
+    catalog_raw_result,
+    read_raw_result_catalog,
+)
+from pheval_exomiser.post_process.raw_result_storage import (
+    catalog_raw_results,
+    compact_raw_results,
+    raw_result_files,
+)
+from pheval_exomiser.run.monitor import RunMonitor
+from pheval_exomiser.run.run import create_run_monitor
+from tests.test_sweep import sweep_configurations
+
+
+class TestRawResultCatalog(unittest.TestCase):
+    def setUp(self) -> None:
+        self.raw_results_dir = Path(tempfile.mkdtemp())
+        self.parquet_result = self.raw_results_dir.joinpath("patient_1-exomiser.parquet")
+        pl.DataFrame({"geneSymbol": ["FGD1", "RTTN"]}).write_parquet(self.parquet_result)
+        self.catalog = RawResultCatalog(self.raw_results_dir)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.raw_results_dir)
+
+    def test_catalog_raw_result(self):
+        entry = catalog_raw_result(self.raw_results_dir, "patient_1-exomiser.parquet")
+        self.assertEqual(
+            (entry.path, entry.sample_id, entry.size, entry.rows, entry.state),
+            (
+                "patient_1-exomiser.parquet",
+                "patient_1",
+                self.parquet_result.stat().st_size,
+                2,
+                COMPLETE,
+            ),
+        )
+        self.raw_results_dir.joinpath("patient_2-exomiser.parquet").write_bytes(b"PAR1")
+        self.assertEqual(
+            catalog_raw_result(self.raw_results_dir, "patient_2-exomiser.parquet").state,
+            INCOMPLETE,
+        )
+        self.assertEqual(
+            catalog_raw_result(self.raw_results_dir, "patient_3-exomiser.parquet").state, MISSING
+        )
+
+    def test_later_entries_supersede_earlier_and_partial_lines_are_skipped(self):
+        self.catalog.record(
+            [
+                RawResultEntry("a.json", "a.json", "a", 10, 1.0, None, INCOMPLETE),
+                RawResultEntry("b.json", "b.json", "b", 10, 1.0, None, COMPLETE),
+            ]
+        )
+        self.catalog.record([RawResultEntry("a.json", "a.json.gz", "a", 5, 2.0, None, COMPLETE)])
+        with open(self.catalog.path, "a") as catalog:
+            catalog.write("c.json\tc.json\tc")
+        self.assertEqual(
+            read_raw_result_catalog(self.raw_results_dir),
+            {
+                "a.json": RawResultEntry("a.json", "a.json.gz", "a", 5, 2.0, None, COMPLETE),
+                "b.json": RawResultEntry("b.json", "b.json", "b", 10, 1.0, None, COMPLETE),
+            },
+        )
+
+    def test_raw_result_files_from_catalog(self):
+        self.assertIsNone(read_raw_result_catalog(self.raw_results_dir))
+        self.raw_results_dir.joinpath("patient_2-exomiser.parquet").write_bytes(b"PAR1")
+        self.catalog.record(
+            [
+                catalog_raw_result(self.raw_results_dir, "patient_1-exomiser.parquet"),
+                catalog_raw_result(self.raw_results_dir, "patient_2-exomiser.parquet"),
+            ]
+        )
+        os.utime(self.raw_results_dir, (1000.0, 1000.0))
+        self.assertEqual(raw_result_files(self.raw_results_dir, True), [self.parquet_result])
+
+    def test_raw_result_files_listed_once_directory_changed_since_catalog(self):
+        self.catalog.record(
+            [catalog_raw_result(self.raw_results_dir, "patient_1-exomiser.parquet")]
+        )
+        added_result = self.raw_results_dir.joinpath("patient_2-exomiser.parquet")
+        added_result.touch()
+        os.utime(self.catalog.path, (1000.0, 1000.0))
+        self.assertIsNone(read_raw_result_catalog(self.raw_results_dir))
+        self.assertEqual(
+            raw_result_files(self.raw_results_dir, True), [self.parquet_result, added_result]
+        )
+
+    def test_catalog_raw_results_and_compaction(self):
+        self.raw_results_dir.joinpath("patient_2-exomiser.json").write_text('[{"score": 1}]')
+        self.raw_results_dir.joinpath("patient_2-exomiser.html").write_text("<html>")
+        self.assertEqual(
+            [entry.path for entry in catalog_raw_results(self.raw_results_dir)],
+            ["patient_1-exomiser.parquet", "patient_2-exomiser.json"],
+        )
+        compact_raw_results(self.raw_results_dir)
+        self.assertEqual(
+            raw_result_files(self.raw_results_dir, False),
+            [self.raw_results_dir.joinpath("patient_2-exomiser.json.gz")],
+        )
+
+
+class TestRunMonitorCatalog(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.raw_results_dir = self.tmp_dir.joinpath("raw_results")
+        self.raw_results_dir.mkdir()
+        self.batch_file = self.tmp_dir.joinpath("RUN-exomiser-batch.txt")
+        self.batch_file.write_text(
+            "--sample /p/patient_1.json --output-filename patient_1-exomiser\n"
+            "--sample /p/patient_2.json --output-filename patient_2-exomiser\n"
+        )
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmp_dir)
+
+    def run_monitor(self) -> RunMonitor:
+        return RunMonitor(
+            batch_files=[self.batch_file],
+            raw_results_dir=self.raw_results_dir,
+            result_suffix=".parquet",
+            status_file=self.tmp_dir.joinpath("exomiser_run_status.json"),
+            refresh_seconds=0,
+            catalog=RawResultCatalog(self.raw_results_dir),
+        )
+
+    def test_results_catalogued_as_produced(self):
+        run_monitor = self.run_monitor()
+        run_monitor.batch_started(self.batch_file)
+        run_monitor.status()
+        self.assertFalse(self.raw_results_dir.joinpath(RAW_RESULT_CATALOG_FILE_NAME).exists())
+        pl.DataFrame({"geneSymbol": ["FGD1"]}).write_parquet(
+            self.raw_results_dir.joinpath("patient_1-exomiser.parquet")
+        )
+        self.assertEqual(run_monitor.status().completed_samples, 1)
+        run_monitor.batch_finished(self.batch_file)
+        catalog = read_raw_result_catalog(self.raw_results_dir)
+        self.assertEqual(
+            {raw_result: (entry.rows, entry.state) for raw_result, entry in catalog.items()},
+            {
+                "patient_1-exomiser.parquet": (1, COMPLETE),
+                "patient_2-exomiser.parquet": (None, MISSING),
+            },
+        )
+        with open(self.raw_results_dir.joinpath(RAW_RESULT_CATALOG_FILE_NAME)) as catalog_file:
+            self.assertEqual(len(catalog_file.readlines()), 3)
+
+    def catalogue_patient_1(self, mtime: float) -> None:
+        RawResultCatalog(self.raw_results_dir).record(
+            [
+                RawResultEntry(
+                    "patient_1-exomiser.parquet",
+                    "patient_1-exomiser.parquet",
+                    "patient_1",
+                    100,
+                    mtime,
+                    3,
+                    COMPLETE,
+                )
+            ]
+        )
+
+    def test_catalogued_results_are_not_checked_again(self):
+        self.catalogue_patient_1(time.time() + 3600)
+        run_monitor = self.run_monitor()
+        run_monitor.batch_started(self.batch_file)
+        self.assertEqual(
+            run_monitor.remaining_output_filenames(self.batch_file), ["patient_2-exomiser"]
+        )
+
+    def test_catalogued_results_of_earlier_run_are_remaining(self):
+        self.catalogue_patient_1(1.0)
+        run_monitor = self.run_monitor()
+        run_monitor.batch_started(self.batch_file)
+        self.assertEqual(
+            run_monitor.remaining_output_filenames(self.batch_file),
+            ["patient_1-exomiser", "patient_2-exomiser"],
+        )
+
+    def test_catalog_not_current_is_not_trusted(self):
+        self.catalogue_patient_1(time.time() + 3600)
+        os.utime(self.raw_results_dir.joinpath(RAW_RESULT_CATALOG_FILE_NAME), (1000.0, 1000.0))
+        self.assertEqual(self.run_monitor().results, {})
+
+    def test_catalog_of_earlier_run_removed_when_not_maintained(self):
+        config = sweep_configurations()
+        RawResultCatalog(self.raw_results_dir).record(
+            [catalog_raw_result(self.raw_results_dir, "patient_1-exomiser.parquet")]
+        )
+        run_monitor = create_run_monitor(
+            [self.batch_file], config, self.tmp_dir, self.raw_results_dir, "13.0.0"
+        )
+        self.assertIsNone(run_monitor.catalog)
+        self.assertFalse(self.raw_results_dir.joinpath(RAW_RESULT_CATALOG_FILE_NAME).exists())
+        self.assertIsNotNone(
+            create_run_monitor(
+                [self.batch_file], config, self.tmp_dir, self.raw_results_dir, "15.0.0"
+            ).catalog
+        )
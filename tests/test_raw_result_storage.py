@@ -0,0 +1,111 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from pheval_exomiser.post_process.post_process_results_format import (
+    trim_exomiser_result_filename,
+)
+from pheval_exomiser.post_process.raw_result_storage import (
+    COMPACTION_MANIFEST_FILE_NAME,
+    compact_raw_results,
+    convert_raw_results_to_ipc,
+    raw_result_files,
+    read_ipc_result,
+    read_json_result,
+)
+
+
+class TestCompactRawResults(unittest.TestCase):
+    def setUp(self) -> None:
+        self.raw_results_dir = Path(tempfile.mkdtemp())
+        self.json_result = self.raw_results_dir.joinpath("patient_1-exomiser.json")
+        self.json_result.write_text(
+            '[{"geneSymbol": "FGD1", "combinedScore": 0.9}, '
+            '{"geneSymbol": "RTTN", "combinedScore": 0.1}]'
+        )
+        self.parquet_result = self.raw_results_dir.joinpath("patient_1-exomiser.parquet")
+        pl.DataFrame(
+            {"geneSymbol": ["FGD1"] * 1000, "geneCombinedScore": [0.9] * 1000}
+        ).write_parquet(self.parquet_result, compression="uncompressed")
+        self.raw_results_dir.joinpath("patient_1-exomiser.html").write_text("<html>")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.raw_results_dir)
+
+    def test_compact_raw_results(self):
+        expected_json = pl.read_json(self.json_result)
+        expected_parquet = pl.read_parquet(self.parquet_result)
+        compact_raw_results(self.raw_results_dir)
+        compressed_json = self.raw_results_dir.joinpath("patient_1-exomiser.json.gz")
+        self.assertFalse(self.json_result.exists())
+        self.assertEqual(raw_result_files(self.raw_results_dir, False), [compressed_json])
+        self.assertEqual(raw_result_files(self.raw_results_dir, True), [self.parquet_result])
+        assert_frame_equal(read_json_result(compressed_json), expected_json)
+        assert_frame_equal(pl.read_parquet(self.parquet_result), expected_parquet)
+        manifest = pl.read_csv(
+            self.raw_results_dir.joinpath(COMPACTION_MANIFEST_FILE_NAME), separator="\t"
+        )
+        self.assertEqual(
+            manifest["compacted_file"].to_list(),
+            ["patient_1-exomiser.json.gz", "patient_1-exomiser.parquet"],
+        )
+
+    def test_trim_compressed_exomiser_result_filename(self):
+        self.assertEqual(
+            trim_exomiser_result_filename(Path("/results/patient_1-exomiser.json.gz")),
+            Path("patient_1.json"),
+        )
+
+
+class TestConvertRawResultsToIpc(unittest.TestCase):
+    def setUp(self) -> None:
+        self.raw_results_dir = Path(tempfile.mkdtemp())
+        self.json_result = self.raw_results_dir.joinpath("patient_1-exomiser.json")
+        self.json_result.write_text(
+            '[{"geneSymbol": "FGD1", "combinedScore": 0.9}, '
+            '{"geneSymbol": "RTTN", "combinedScore": 0.1}]'
+        )
+        self.parquet_result = self.raw_results_dir.joinpath("patient_2-exomiser.parquet")
+        pl.DataFrame({"geneSymbol": ["FGD1"], "geneCombinedScore": [0.9]}).write_parquet(
+            self.parquet_result
+        )
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.raw_results_dir)
+
+    def test_convert_raw_results_to_ipc(self):
+        expected_json = read_json_result(self.json_result)
+        converted_paths = convert_raw_results_to_ipc(self.raw_results_dir)
+        json_ipc = self.raw_results_dir.joinpath("patient_1-exomiser.json.arrow")
+        parquet_ipc = self.raw_results_dir.joinpath("patient_2-exomiser.parquet.arrow")
+        self.assertEqual(converted_paths, [parquet_ipc, json_ipc])
+        self.assertTrue(self.json_result.exists())
+        self.assertEqual(raw_result_files(self.raw_results_dir, False), [json_ipc])
+        self.assertEqual(raw_result_files(self.raw_results_dir, True), [parquet_ipc])
+        assert_frame_equal(read_ipc_result(json_ipc), expected_json)
+        self.assertEqual(
+            trim_exomiser_result_filename(json_ipc),
+            Path("patient_1.json"),
+        )
+        self.assertEqual(convert_raw_results_to_ipc(self.raw_results_dir), [])
+
+    def test_rewritten_original_replaces_stale_ipc(self):
+        convert_raw_results_to_ipc(self.raw_results_dir)
+        parquet_ipc = self.raw_results_dir.joinpath("patient_2-exomiser.parquet.arrow")
+        os.utime(parquet_ipc, (1000.0, 1000.0))
+        rerun_result = pl.DataFrame({"geneSymbol": ["RTTN"], "geneCombinedScore": [0.5]})
+        rerun_result.write_parquet(self.parquet_result)
+        self.assertEqual(raw_result_files(self.raw_results_dir, True), [self.parquet_result])
+        self.assertEqual(convert_raw_results_to_ipc(self.raw_results_dir), [parquet_ipc])
+        self.assertEqual(raw_result_files(self.raw_results_dir, True), [parquet_ipc])
+        assert_frame_equal(read_ipc_result(parquet_ipc), rerun_result)
+
+    def test_convert_raw_results_to_ipc_remove_original(self):
+        convert_raw_results_to_ipc(self.raw_results_dir, remove_original=True)
+        self.assertFalse(self.json_result.exists())
+        self.assertFalse(self.parquet_result.exists())
@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from google.protobuf.json_format import MessageToJson
+
+from pheval_exomiser.run.fake_exomiser import CostModel
+from pheval_exomiser.run.runner_benchmark import (
+    RUNNER_BENCHMARK_RESULTS_FILE_NAME,
+    RunnerBenchmark,
+    benchmark_runner,
+    parallel_speedup,
+)
+from tests.test_create_batch_commands import phenopacket
+
+
+class TestRunnerBenchmark(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.testdata_dir = self.tmp_dir.joinpath("corpus")
+        self.testdata_dir.joinpath("phenopackets").mkdir(parents=True)
+        for sample in range(2):
+            self.testdata_dir.joinpath("phenopackets", f"patient_{sample}.json").write_text(
+                MessageToJson(phenopacket)
+            )
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmp_dir)
+
+    def test_parallel_speedup(self):
+        benchmarks = parallel_speedup(
+            [RunnerBenchmark(1, 4, 40, 40.0, 1.0), RunnerBenchmark(2, 4, 40, 25.0, 1.0)]
+        )
+        self.assertEqual(
+            [(benchmark.speedup, benchmark.efficiency) for benchmark in benchmarks],
+            [(1.0, 1.0), (1.6, 0.8)],
+        )
+
+    @unittest.skipUnless(os.name == "posix", "the java stand-in is a shell script")
+    def test_benchmark_runner(self):
+        output_dir = self.tmp_dir.joinpath("output")
+        benchmarks = benchmark_runner(
+            testdata_dir=self.testdata_dir,
+            output_dir=output_dir,
+            exomiser_version="15.0.0",
+            variant_analysis=False,
+            max_jobs=1,
+            max_workers=2,
+            cost_model=CostModel(startup_seconds=0, sample_seconds=0, genes=5),
+            post_process=True,
+        )
+        self.assertEqual(
+            [(benchmark.workers, benchmark.batches, benchmark.samples) for benchmark in benchmarks],
+            [(1, 2, 2), (2, 2, 2)],
+        )
+        self.assertTrue(
+            output_dir.joinpath(
+                "workers-2",
+                "pheval_results",
+                "pheval_gene_results",
+                "patient_1-gene_result.parquet",
+            ).exists()
+        )
+        self.assertTrue(output_dir.joinpath(RUNNER_BENCHMARK_RESULTS_FILE_NAME).exists())
@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from pheval_exomiser.prepare.create_batch_commands import batch_file_sort_key
+from pheval_exomiser.prepare.runtime_history import (
+    PHENOTYPE_ONLY_ANALYSIS,
+    RuntimeHistory,
+    analysis_key,
+    balance_batches,
+    estimate_runtimes,
+    read_recorded_runtimes,
+)
+from pheval_exomiser.run.monitor import BatchProgress
+
+
+class TestRuntimeHistory(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.history_path = self.tmp_dir.joinpath("runtime_history.sqlite")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmp_dir)
+
+    def test_record_averages_runs(self):
+        with RuntimeHistory(self.history_path) as history:
+            history.record({"patient_1": 10.0, "patient_2": 4.0}, "15.0.0", "analysis")
+            history.record({"patient_1": 20.0}, "15.0.0", "analysis")
+            history.record({"patient_1": 1.0}, "14.0.0", "analysis")
+        self.assertEqual(
+            read_recorded_runtimes(self.history_path, "15.0.0", "analysis"),
+            {"patient_1": 15.0, "patient_2": 4.0},
+        )
+        self.assertEqual(read_recorded_runtimes(self.history_path, "15.0.0", "other"), {})
+        self.assertIsNone(read_recorded_runtimes(None, "15.0.0", "analysis"))
+
+    def test_analysis_key(self):
+        analysis = self.tmp_dir.joinpath("analysis.yml")
+        analysis.write_text("analysis: {}\n")
+        self.assertEqual(analysis_key(None), PHENOTYPE_ONLY_ANALYSIS)
+        self.assertEqual(analysis_key(analysis), analysis_key(analysis))
+        self.assertEqual(len(analysis_key(analysis)), 64)
+
+    def test_estimate_runtimes_falls_back_to_input_size(self):
+        self.assertEqual(
+            estimate_runtimes(["patient_1", "patient_2"], [100, 300], {"patient_1": 2.0}),
+            [2.0, 6.0],
+        )
+        self.assertEqual(estimate_runtimes(["patient_1", "patient_2"], [100, 300], {}), [100, 300])
+
+    def test_balance_batches(self):
+        batches = balance_batches(["a", "b", "c", "d", "e", "f"], [9, 1, 5, 4, 3, 2], 3)
+        self.assertEqual(batches, [["a", "e", "b"], ["c", "d", "f"]])
+
+    def test_balance_batches_single_batch(self):
+        self.assertEqual(balance_batches(["a", "b", "c"], [1, 3, 2], 0), [["b", "c", "a"]])
+        self.assertEqual(balance_batches([], [], 2), [])
+
+    def test_batch_file_sort_key(self):
+        batch_files = [Path(f"corpus-exomiser-batch-{number}.txt") for number in [10, 2, 1]]
+        self.assertEqual(
+            [batch_file.name for batch_file in sorted(batch_files, key=batch_file_sort_key)],
+            [
+                "corpus-exomiser-batch-1.txt",
+                "corpus-exomiser-batch-2.txt",
+                "corpus-exomiser-batch-10.txt",
+            ],
+        )
+
+    def test_sample_runtimes_from_result_times(self):
+        batch = BatchProgress(
+            Path("batch.txt"),
+            [
+                "patient_1-exomiser",
+                "patient_2-exomiser",
+                "patient_3-exomiser",
+                "patient_4-exomiser",
+            ],
+            started_at=1000.0,
+        )
+        for output_filename, modified_at in [
+            ("patient_1-exomiser", 1010.0),
+            ("patient_2-exomiser", 1013.0),
+            ("patient_3-exomiser", 1020.0),
+        ]:
+            result = self.tmp_dir.joinpath(f"{output_filename}.parquet")
+            result.touch()
+            os.utime(result, (modified_at, modified_at))
+        self.assertEqual(
+            batch.sample_runtimes(self.tmp_dir, ".parquet"), {"patient_2": 3.0, "patient_3": 7.0}
+        )
@@ -0,0 +1,203 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+import polars as pl
+
+from pheval_exomiser.run.fake_exomiser import parse_batch_command
+from pheval_exomiser.run.monitor import RunMonitor
+from pheval_exomiser.run.speculation import (
+    SPECULATIVE_DIRECTORY_NAME,
+    SpeculativeBatchRunner,
+    promote_speculative_results,
+    write_speculative_batch_file,
+)
+
+
+class FakeBatchProcess:
+    """Writes the results of a batch file at once, or only once released if it is a straggler."""
+
+    def __init__(self, batch_file: Path, straggler: bool):
+        self.batch_file = batch_file
+        self.released = threading.Event()
+        if not straggler:
+            self.released.set()
+        self.killed = False
+        self.out_of_memory = False
+
+    def wait(self) -> int:
+        self.released.wait()
+        if self.killed:
+            return -9
+        with open(self.batch_file) as batch:
+            for command in batch:
+                options = parse_batch_command(command)
+                Path(options["output-directory"]).joinpath(
+                    f"{options['output-filename']}.parquet"
+                ).write_text(str(self.batch_file))
+        return 0
+
+    def kill(self) -> None:
+        self.killed = True
+        self.released.set()
+
+
+class TestSpeculation(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.raw_results_dir = self.tmp_dir.joinpath("raw_results")
+        self.raw_results_dir.mkdir()
+        self.batch_files = []
+        for batch_number in [1, 2]:
+            batch_file = self.tmp_dir.joinpath(f"RUN-exomiser-batch-{batch_number}.txt")
+            batch_file.write_text(
+                "".join(
+                    f"--sample /p/patient_{batch_number}{sample}.json "
+                    f"--output-directory {self.raw_results_dir} "
+                    f"--output-filename patient_{batch_number}{sample}-exomiser\n"
+                    for sample in range(2)
+                )
+            )
+            self.batch_files.append(batch_file)
+        self.run_monitor = RunMonitor(
+            batch_files=self.batch_files,
+            raw_results_dir=self.raw_results_dir,
+            result_suffix=".parquet",
+            status_file=self.tmp_dir.joinpath("exomiser_run_status.json"),
+            refresh_seconds=0,
+        )
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmp_dir)
+
+    def test_write_speculative_batch_file(self):
+        speculative_batch_file = self.raw_results_dir.joinpath(
+            SPECULATIVE_DIRECTORY_NAME, self.batch_files[0].name
+        )
+        self.assertTrue(
+            write_speculative_batch_file(
+                self.batch_files[0], ["patient_11-exomiser"], speculative_batch_file
+            )
+        )
+        self.assertEqual(
+            parse_batch_command(speculative_batch_file.read_text()),
+            {
+                "sample": "/p/patient_11.json",
+                "output-directory": f"{self.raw_results_dir}/{SPECULATIVE_DIRECTORY_NAME}/"
+                f"{self.batch_files[0].stem}",
+                "output-filename": "patient_11-exomiser",
+            },
+        )
+
+    def test_write_speculative_batch_file_without_output_directory(self):
+        batch_file = self.tmp_dir.joinpath("legacy.txt")
+        batch_file.write_text("--sample /p/patient_1.json --output-filename patient_1-exomiser\n")
+        self.assertFalse(
+            write_speculative_batch_file(
+                batch_file, ["patient_1-exomiser"], self.tmp_dir.joinpath("speculative.txt")
+            )
+        )
+
+    def test_promote_speculative_results(self):
+        speculative_results_dir = self.tmp_dir.joinpath("speculative")
+        speculative_results_dir.mkdir()
+        speculative_results_dir.joinpath("patient_1-exomiser.parquet").write_text("duplicate")
+        self.raw_results_dir.joinpath("patient_1-exomiser.parquet").write_text("partial")
+        self.assertEqual(
+            promote_speculative_results(
+                speculative_results_dir, self.raw_results_dir, ".parquet", 0.0
+            ),
+            1,
+        )
+        self.assertEqual(
+            self.raw_results_dir.joinpath("patient_1-exomiser.parquet").read_text(), "duplicate"
+        )
+
+    def test_promote_speculative_results_keeps_complete_results(self):
+        speculative_results_dir = self.tmp_dir.joinpath("speculative")
+        speculative_results_dir.mkdir()
+        for result in ["patient_1-exomiser.parquet", "patient_1-exomiser.variants.tsv"]:
+            speculative_results_dir.joinpath(result).write_text("duplicate")
+        speculative_results_dir.joinpath("patient_2-exomiser.parquet").write_text("duplicate")
+        complete_result = self.raw_results_dir.joinpath("patient_1-exomiser.parquet")
+        pl.DataFrame({"geneSymbol": ["FGD1"]}).write_parquet(complete_result)
+        original_bytes = complete_result.read_bytes()
+        self.assertEqual(
+            promote_speculative_results(
+                speculative_results_dir, self.raw_results_dir, ".parquet", 0.0
+            ),
+            1,
+        )
+        self.assertEqual(complete_result.read_bytes(), original_bytes)
+        self.assertFalse(self.raw_results_dir.joinpath("patient_1-exomiser.variants.tsv").exists())
+        self.assertEqual(
+            self.raw_results_dir.joinpath("patient_2-exomiser.parquet").read_text(), "duplicate"
+        )
+        self.assertEqual(list(speculative_results_dir.iterdir()), [])
+
+    def test_promote_speculative_results_replaces_results_of_earlier_run(self):
+        speculative_results_dir = self.tmp_dir.joinpath("speculative")
+        speculative_results_dir.mkdir()
+        speculative_results_dir.joinpath("patient_1-exomiser.parquet").write_text("duplicate")
+        earlier_result = self.raw_results_dir.joinpath("patient_1-exomiser.parquet")
+        pl.DataFrame({"geneSymbol": ["FGD1"]}).write_parquet(earlier_result)
+        os.utime(earlier_result, (1000.0, 1000.0))
+        self.assertEqual(
+            promote_speculative_results(
+                speculative_results_dir, self.raw_results_dir, ".parquet", 2000.0
+            ),
+            1,
+        )
+        self.assertEqual(earlier_result.read_text(), "duplicate")
+
+    def test_straggler_is_speculatively_rerun(self):
+        processes = []
+
+        def launch(batch_file, span, heap):
+            processes.append(
+                FakeBatchProcess(batch_file, straggler=batch_file == self.batch_files[1])
+            )
+            return processes[-1]
+
+        SpeculativeBatchRunner(
+            batch_files=self.batch_files,
+            launch=launch,
+            span_attributes=lambda batch_file: {"batch_file": batch_file.name},
+            span_name="exomiser_jvm",
+            workers=2,
+            run_monitor=self.run_monitor,
+            straggler_factor=0.001,
+            check_seconds=0.01,
+        ).run()
+        self.assertEqual(len(processes), 3)
+        self.assertTrue(processes[1].killed)
+        self.assertEqual(
+            self.raw_results_dir.joinpath("patient_21-exomiser.parquet").read_text(),
+            str(processes[2].batch_file),
+        )
+        self.assertEqual(self.run_monitor.remaining_output_filenames(self.batch_files[1]), [])
+        self.assertTrue(self.run_monitor.batches[self.batch_files[1]].speculated)
+        self.assertFalse(self.raw_results_dir.joinpath(SPECULATIVE_DIRECTORY_NAME).exists())
+
+    def test_no_speculation_when_disabled(self):
+        processes = []
+
+        def launch(batch_file, span, heap):
+            processes.append(FakeBatchProcess(batch_file, straggler=False))
+            return processes[-1]
+
+        SpeculativeBatchRunner(
+            batch_files=self.batch_files,
+            launch=launch,
+            span_attributes=lambda batch_file: {},
+            span_name="exomiser_jvm",
+            workers=1,
+            run_monitor=self.run_monitor,
+            straggler_factor=0,
+            check_seconds=0.01,
+        ).run()
+        self.assertEqual(len(processes), 2)
+        self.assertEqual(len(list(self.raw_results_dir.iterdir())), 4)
@@ -0,0 +1,172 @@
+import os
+import shutil
+import tempfile
+import unittest
+from dataclasses import replace
+from pathlib import Path
+
+from google.protobuf.json_format import MessageToJson
+
+from pheval_exomiser.prepare.tool_specific_configuration_options import ExomiserConfigurations
+from pheval_exomiser.prepare.write_application_properties import application_properties_file_name
+from pheval_exomiser.run.fake_exomiser import CostModel
+from pheval_exomiser.run.runner_benchmark import fake_exomiser_on_path, write_fake_input_dir
+from pheval_exomiser.run.sweep import (
+    check_sweep_environment,
+    create_sweep_runs,
+    prepare_sweep_batch_files,
+    run_exomiser_sweep,
+    write_sweep_application_properties,
+)
+from tests.test_create_batch_commands import phenopacket
+
+
+def sweep_configurations() -> ExomiserConfigurations:
+    return ExomiserConfigurations.parse_obj(
+        {
+            "environment": "local",
+            "exomiser_software_directory": "exomiser-cli-15.0.0",
+            "analysis_configuration_file": None,
+            "max_jobs": 0,
+            "application_properties": {},
+            "output_formats": ["HTML"],
+            "post_process": {"score_name": "geneCombinedScore", "sort_order": "DESCENDING"},
+            "sweep": [
+                {
+                    "version": "14.0.0",
+                    "exomiser_software_directory": "exomiser-cli-14.0.0",
+                    "score_name": "combinedScore",
+                },
+                {
+                    "version": "15.0.0",
+                    "exomiser_software_directory": "exomiser-cli-15.0.0",
+                    "application_properties": {"phenotype_data_version": "2402"},
+                },
+            ],
+        }
+    )
+
+
+class TestSweep(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.testdata_dir = self.tmp_dir.joinpath("testdata")
+        self.phenopacket_dir = self.testdata_dir.joinpath("phenopackets")
+        self.phenopacket_dir.mkdir(parents=True)
+        self.phenopacket_dir.joinpath("patient_1.json").write_text(MessageToJson(phenopacket))
+        self.output_dir = self.tmp_dir.joinpath("output")
+        self.sweep_runs = create_sweep_runs(sweep_configurations(), self.output_dir)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmp_dir)
+
+    def test_create_sweep_runs(self):
+        self.assertEqual(
+            [
+                (
+                    sweep_run.output_dir,
+                    sweep_run.config.exomiser_software_directory,
+                    sweep_run.config.post_process.score_name,
+                )
+                for sweep_run in self.sweep_runs
+            ],
+            [
+                (
+                    self.output_dir.joinpath("exomiser-14.0.0"),
+                    Path("exomiser-cli-14.0.0"),
+                    "combinedScore",
+                ),
+                (
+                    self.output_dir.joinpath("exomiser-15.0.0"),
+                    Path("exomiser-cli-15.0.0"),
+                    "geneCombinedScore",
+                ),
+            ],
+        )
+
+    def test_prepare_sweep_batch_files(self):
+        prepare_sweep_batch_files(
+            input_dir=self.tmp_dir,
+            testdata_dir=self.testdata_dir,
+            config=sweep_configurations(),
+            sweep_runs=self.sweep_runs,
+            variant_analysis=False,
+        )
+        sample = self.phenopacket_dir.joinpath("patient_1.json")
+        self.assertEqual(
+            [
+                sweep_run.tool_input_commands_dir.joinpath("testdata-exomiser-batch.txt")
+                .read_text()
+                .splitlines()
+                for sweep_run in self.sweep_runs
+            ],
+            [
+                [
+                    f"--sample {sample} --output-directory {self.sweep_runs[0].raw_results_dir} "
+                    "--output-filename patient_1-exomiser --preset phenotype-only "
+                    "--output-format HTML,JSON"
+                ],
+                [
+                    f"--sample {sample} --output-directory {self.sweep_runs[1].raw_results_dir} "
+                    "--output-filename patient_1-exomiser --preset phenotype_only "
+                    "--output-format HTML,PARQUET"
+                ],
+            ],
+        )
+
+    def test_check_sweep_environment(self):
+        with self.assertRaises(ValueError):
+            check_sweep_environment(
+                sweep_configurations().model_copy(update={"environment": "docker"})
+            )
+
+    def test_write_sweep_application_properties(self):
+        write_sweep_application_properties(self.tmp_dir, self.sweep_runs)
+        self.assertEqual(
+            [
+                "exomiser.phenotype.data-version=2402"
+                in sweep_run.output_dir.joinpath(application_properties_file_name()).read_text()
+                for sweep_run in self.sweep_runs
+            ],
+            [False, True],
+        )
+        self.assertFalse(self.tmp_dir.joinpath(application_properties_file_name()).exists())
+
+    @unittest.skipUnless(os.name == "posix", "the Exomiser stand-in is a shell script")
+    def test_run_exomiser_sweep(self):
+        config = sweep_configurations().model_copy(
+            update={
+                "exomiser_software_directory": Path("exomiser-cli-fake"),
+                "sweep_workers": 1,
+                "exomiser_workers": 2,
+            }
+        )
+        sweep_runs = [
+            replace(
+                sweep_run,
+                config=sweep_run.config.model_copy(
+                    update={"exomiser_software_directory": Path("exomiser-cli-fake")}
+                ),
+            )
+            for sweep_run in self.sweep_runs
+        ]
+        write_fake_input_dir(self.tmp_dir)
+        prepare_sweep_batch_files(
+            input_dir=self.tmp_dir,
+            testdata_dir=self.testdata_dir,
+            config=config,
+            sweep_runs=sweep_runs,
+            variant_analysis=False,
+        )
+        write_sweep_application_properties(self.tmp_dir, sweep_runs)
+        with fake_exomiser_on_path(
+            self.tmp_dir.joinpath("bin"), CostModel(startup_seconds=0.0, sample_seconds=0.0)
+        ):
+            run_exomiser_sweep(self.tmp_dir, self.testdata_dir, config, sweep_runs)
+        self.assertEqual(
+            [
+                sorted(path.name for path in sweep_run.raw_results_dir.glob("patient_1-exomiser*"))
+                for sweep_run in sweep_runs
+            ],
+            [["patient_1-exomiser.json"], ["patient_1-exomiser.parquet"]],
+        )
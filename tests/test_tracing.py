@@ -0,0 +1,82 @@
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from pheval_exomiser.tracing import (
+    TRACE_FILE_NAME,
+    disable_tracing,
+    file_size,
+    trace_command,
+    trace_span,
+)
+
+
+def read_spans(trace_file: Path) -> dict:
+    with open(trace_file) as trace:
+        return {span["name"]: span for span in map(json.loads, trace)}
+
+
+class TestTracing(unittest.TestCase):
+    def setUp(self) -> None:
+        self.output_dir = Path(tempfile.mkdtemp())
+        self.trace_file = self.output_dir.joinpath(TRACE_FILE_NAME)
+
+    def tearDown(self) -> None:
+        disable_tracing()
+        shutil.rmtree(self.output_dir)
+
+    def test_trace_disabled(self):
+        with trace_command("run", None):
+            with trace_span("sample", sample_id="sample-1") as span:
+                span.set_attribute("raw_result_rows", 10)
+        self.assertEqual(span.attributes, {})
+        self.assertFalse(self.trace_file.exists())
+
+    def test_nested_spans(self):
+        with trace_command("post_process", self.trace_file, exomiser_version="14.0.0"):
+            with trace_span("sample", sample_id="sample-1", raw_result_bytes=None) as span:
+                span.set_attribute("raw_result_rows", 10)
+                with trace_span("extraction", result_type="gene"):
+                    pass
+        spans = read_spans(self.trace_file)
+        self.assertEqual(list(spans), ["extraction", "sample", "post_process"])
+        self.assertIsNone(spans["post_process"]["parent_span_id"])
+        self.assertEqual(spans["sample"]["parent_span_id"], spans["post_process"]["span_id"])
+        self.assertEqual(spans["extraction"]["parent_span_id"], spans["sample"]["span_id"])
+        self.assertEqual(
+            {span["trace_id"] for span in spans.values()}, {spans["sample"]["trace_id"]}
+        )
+        self.assertEqual(
+            spans["sample"]["attributes"], {"sample_id": "sample-1", "raw_result_rows": 10}
+        )
+        self.assertLessEqual(
+            spans["sample"]["start_time_unix_nano"], spans["sample"]["end_time_unix_nano"]
+        )
+        self.assertEqual(spans["post_process"]["status"], "OK")
+
+    def test_runner_stages_share_trace(self):
+        with trace_command("prepare", self.trace_file):
+            pass
+        with trace_command("run", self.trace_file):
+            pass
+        spans = read_spans(self.trace_file)
+        self.assertEqual(spans["prepare"]["trace_id"], spans["run"]["trace_id"])
+
+    def test_span_error(self):
+        with self.assertRaises(ValueError):
+            with trace_command("post_process", self.trace_file):
+                with trace_span("read_raw_result"):
+                    raise ValueError("corrupt result")
+        spans = read_spans(self.trace_file)
+        self.assertEqual(spans["read_raw_result"]["status"], "ERROR")
+        self.assertEqual(
+            spans["read_raw_result"]["attributes"]["exception"], "ValueError('corrupt result')"
+        )
+        self.assertEqual(spans["post_process"]["status"], "ERROR")
+
+
+class TestFileSize(unittest.TestCase):
+    def test_file_size_missing(self):
+        self.assertIsNone(file_size(Path("missing-result.parquet")))
@@ -0,0 +1,75 @@
+import unittest
+
+import polars as pl
+from pheval.post_processing.post_processing import SortOrder, _rank_results
+
+from pheval_exomiser.post_process.vectorised_ranking import (
+    SAMPLE_ID,
+    pheval_sample_order,
+    rank_results_by_sample,
+)
+
+
+class TestRankResultsBySample(unittest.TestCase):
+    def setUp(self) -> None:
+        self.results = pl.DataFrame(
+            {
+                SAMPLE_ID: ["patient_1", "patient_2", "patient_1", "patient_2", "patient_1"],
+                "gene_symbol": ["A", "B", "C", "D", "E"],
+                "score": [0.5, 0.9, 0.7, 0.1, 0.5],
+            }
+        )
+
+    def test_rank_results_by_sample_descending(self):
+        ranked_results = rank_results_by_sample(self.results, SortOrder.DESCENDING)
+        self.assertEqual(
+            ranked_results.select([SAMPLE_ID, "gene_symbol", "rank"]).rows(),
+            [
+                ("patient_1", "C", 1),
+                ("patient_1", "A", 3),
+                ("patient_1", "E", 3),
+                ("patient_2", "B", 1),
+                ("patient_2", "D", 2),
+            ],
+        )
+
+    def test_rank_results_by_sample_ascending(self):
+        ranked_results = rank_results_by_sample(self.results, SortOrder.ASCENDING)
+        self.assertEqual(
+            ranked_results.select([SAMPLE_ID, "gene_symbol", "rank"]).rows(),
+            [
+                ("patient_1", "A", 2),
+                ("patient_1", "E", 2),
+                ("patient_1", "C", 3),
+                ("patient_2", "D", 1),
+                ("patient_2", "B", 2),
+            ],
+        )
+
+    def test_rank_results_by_sample_grouping_id(self):
+        ranked_results = rank_results_by_sample(
+            self.results.with_columns(pl.Series("grouping_id", ["g1", "g2", "g3", "g4", "g1"])),
+            SortOrder.DESCENDING,
+        )
+        self.assertEqual(
+            ranked_results.filter(pl.col(SAMPLE_ID) == "patient_1")["rank"].to_list(), [1, 2, 2]
+        )
+
+
+class TestPhevalSampleOrder(unittest.TestCase):
+    def test_flagged_tied_scores_ranked_in_pheval_order(self):
+        results = pl.DataFrame(
+            {"gene_symbol": ["A", "B", "C", "D", "E"], "score": [0.1, 0.5, 0.5, 0.5, 0.9]}
+        ).with_columns(pl.col("score").set_sorted())
+        for sort_order in [SortOrder.DESCENDING, SortOrder.ASCENDING]:
+            self.assertEqual(
+                rank_results_by_sample(
+                    pheval_sample_order(results, sort_order).with_columns(
+                        pl.lit("patient_1").alias(SAMPLE_ID)
+                    ),
+                    sort_order,
+                )
+                .select(["gene_symbol", "rank"])
+                .rows(),
+                _rank_results(results, sort_order).select(["gene_symbol", "rank"]).rows(),
+            )
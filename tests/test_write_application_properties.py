@@ -8,7 +8,10 @@ from pheval_exomiser.prepare.tool_specific_configuration_options import (
     ExomiserConfigurations,
     PostProcessing,
 )
-from pheval_exomiser.prepare.write_application_properties import ExomiserConfigurationFileWriter
+from pheval_exomiser.prepare.write_application_properties import (
+    ExomiserConfigurationFileWriter,
+    write_assembly_application_properties,
+)
 
 
 class TestExomiserConfigurationFileWriter(unittest.TestCase):
@@ -428,3 +431,59 @@ class TestExomiserConfigurationFileWriter(unittest.TestCase):
                 "remm.version=0.3.1.post1\n",
             ],
         )
+
+    def test_write_application_properties_single_assembly(self):
+        self.application_properties_settings.application_properties.close()
+        ExomiserConfigurationFileWriter(
+            input_dir=Path(self.input_dir),
+            configurations=self.application_properties_settings.configurations,
+            genome_assembly="hg38",
+        ).write_application_properties()
+        with open(Path(self.input_dir).joinpath("application-hg38.properties"), "r") as config:
+            contents = config.readlines()
+        self.assertEqual(
+            contents,
+            [
+                "spring.cache.caffeine.spec=maximumSize=60000\n",
+                "spring.cache.type=caffeine\n",
+                "cadd.version=1.4\n",
+                f"exomiser.data-directory={self.input_dir}\n",
+                "exomiser.hg38.cadd-in-del-path=${exomiser.data-directory}/cadd/${cadd.version}/hg38/InDels.tsv.gz\n",
+                "exomiser.hg38.cadd-snv-path="
+                "${exomiser.data-directory}/cadd/${cadd.version}/hg38/whole_genome_SNVs.tsv.gz\n",
+                "exomiser.hg38.data-version=2302\n",
+                "exomiser.hg38.local-frequency-path="
+                "${exomiser.data-directory}/local/local_frequency_test_hg38.tsv.gz\n",
+                "exomiser.hg38.remm-path=${exomiser.data-directory}/remm/ReMM.v${remm.version}.hg38.tsv.gz\n",
+                "exomiser.phenotype.data-version=2302\n",
+                "exomiser.hg38.variant-white-list-path=2302_hg38_clinvar_whitelist.tsv.gz\n",
+                "remm.version=0.3.1.post1\n",
+            ],
+        )
+
+    def test_write_assembly_application_properties(self):
+        self.application_properties_settings.application_properties.close()
+        self.application_properties_settings.configurations.application_properties.hg19_data_version = (
+            None
+        )
+        write_assembly_application_properties(
+            Path(self.input_dir), self.application_properties_settings.configurations
+        )
+        self.assertFalse(Path(self.input_dir).joinpath("application-hg19.properties").exists())
+        self.assertTrue(Path(self.input_dir).joinpath("application-hg38.properties").exists())
+
+    def test_write_assembly_application_properties_removes_unconfigured_assembly(self):
+        self.application_properties_settings.application_properties.close()
+        write_assembly_application_properties(
+            Path(self.input_dir), self.application_properties_settings.configurations
+        )
+        self.application_properties_settings.configurations.application_properties.hg19_data_version = (
+            None
+        )
+        write_assembly_application_properties(
+            Path(self.input_dir), self.application_properties_settings.configurations
+        )
+        self.assertEqual(
+            sorted(path.name for path in Path(self.input_dir).glob("application-*.properties")),
+            ["application-hg38.properties"],
+        )